@@ -0,0 +1,329 @@
+import streamlit as st
+import math
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+import storage
+import telemetry
+
+# EWMA 설정 (1초 간격이면 약 5분), z-score 경보 기준, 통계가 안정될 때까지 필요한 측정값 수
+EWMA_ALPHA = 2 / (300 + 1)
+Z_LIMIT = 5.0
+WARMUP_SAMPLES = 300
+
+# 이동 최소/최대 구간 (측정값 수), 구간 안의 변화 폭이 이 비율보다 작으면 값이 멈춘 것으로 판단
+WINDOW = 600
+FLAT_TOLERANCE = 1e-6
+
+# 경보 종류
+ALERT_KINDS = {"band": "운전 범위 벗어남", "zscore": "급격한 변화", "flat": "값 변화 없음 (센서 고착 의심)"}
+
+# 신호 이름에 들어 있는 단어와 관련 Troubleshooting 표 (앞에서부터 먼저 맞는 것 사용)
+SECTION_KEYWORDS = (
+    ("salinity", "PPM 값이 평소 값보다 높음"),
+    ("ppm", "PPM 값이 평소 값보다 높음"),
+    ("diff.pressure", "<Different Pressure Transmitter>"),
+    ("water level", "<Different Pressure Transmitter>"),
+    ("comb. air", "<Burner>"),
+    ("flue gas", "<Burner>"),
+    ("burner", "<Burner>"),
+    ("steam", "<Safety Valve>-작동상태 관련 문제"),
+    ("oil", "<Fuel Oil Pump>"),
+    ("m.g.o", "<Fuel Oil Pump>"),
+)
+
+# 한 번에 표시할 경보 수
+ALERT_LIMIT = 100
+
+# 규칙이 없는 신호에 설정값을 상한(음수이면 하한)으로 하는 기본 규칙 추가 (신호를 등록한 트랜잭션 안에서 호출)
+def add_default_rules(conn):
+    signals = conn.execute('''
+        SELECT s.id, s.name, s.setpoint FROM signals s
+        LEFT JOIN anomaly_rules r ON r.signal_id = s.id WHERE r.signal_id IS NULL
+    ''').fetchall()
+    conn.executemany("INSERT INTO anomaly_rules (signal_id, low, high, z_limit, section) VALUES (?, ?, ?, ?, ?)",
+                     [(signal, setpoint if setpoint is not None and setpoint < 0 else None,
+                       setpoint if setpoint is not None and setpoint >= 0 else None, Z_LIMIT, default_section(name))
+                      for signal, name, setpoint in signals])
+
+# 신호 이름으로 관련 Troubleshooting 표 찾기
+def default_section(name):
+    name = name.lower()
+    return next((section for keyword, section in SECTION_KEYWORDS if keyword in name), None)
+
+# 신호별 규칙 {신호 id: (하한, 상한, z-score 기준, 관련 표)}
+def load_rules():
+    rows = storage.query(telemetry.DB_PATH, "SELECT signal_id, low, high, z_limit, section FROM anomaly_rules")
+    return {row[0]: row[1:] for row in rows}
+
+# 신호 하나의 감지 상태 (EWMA 평균과 분산, 최근 측정값, 이동 최소/최대, 진행 중인 경보)
+class DetectorState:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.last_t = None
+        self.tail = deque(maxlen=WINDOW)
+        self.lows = deque()   # (번호, 값), 값이 커지는 순서
+        self.highs = deque()  # (번호, 값), 값이 작아지는 순서
+        self.active = {kind: False for kind in ALERT_KINDS}
+        self.lock = threading.Lock()
+
+    # 측정값 하나 처리 (측정값마다 O(1)), 새로 시작된 경보 [(종류, 점수)] 반환
+    def update(self, x, rule):
+        low, high, z_limit, _ = rule
+        z = 0.0
+        if self.count >= WARMUP_SAMPLES and self.var > 0:
+            z = (x - self.mean) / math.sqrt(self.var)
+        if self.count == 0:
+            self.mean = x
+        diff = x - self.mean
+        self.mean += EWMA_ALPHA * diff
+        self.var = (1 - EWMA_ALPHA) * (self.var + EWMA_ALPHA * diff * diff)
+
+        index = self.count
+        while self.lows and self.lows[-1][1] >= x:
+            self.lows.pop()
+        while self.highs and self.highs[-1][1] <= x:
+            self.highs.pop()
+        self.lows.append((index, x))
+        self.highs.append((index, x))
+        while self.lows[0][0] <= index - WINDOW:
+            self.lows.popleft()
+        while self.highs[0][0] <= index - WINDOW:
+            self.highs.popleft()
+        self.tail.append(x)
+        self.count += 1
+
+        spread = self.highs[0][1] - self.lows[0][1]
+        conditions = {
+            "band": (high is not None and x > high) or (low is not None and x < low),
+            "zscore": abs(z) > (z_limit or Z_LIMIT),
+            "flat": self.count >= WINDOW and spread <= FLAT_TOLERANCE * max(abs(self.mean), 1.0),
+        }
+        started = []
+        for kind, on in conditions.items():
+            if on and not self.active[kind]:
+                started.append((kind, abs(z) if kind == "zscore" else spread if kind == "flat" else x))
+            self.active[kind] = on
+        return started
+
+    # 여러 측정값을 배열 단위로 처리 (update를 반복한 것과 같은 결과), 새로 시작된 경보 [(위치, 종류, 점수)] 반환
+    def update_batch(self, x, rule):
+        low, high, z_limit, _ = rule
+        x = np.asarray(x, dtype=np.float64)
+        n = len(x)
+        if n == 0:
+            return []
+        if self.count == 0:
+            self.mean = float(x[0])
+
+        means = ewma(x, EWMA_ALPHA, self.mean)
+        previous_means = np.concatenate([[self.mean], means[:-1]])
+        diff = x - previous_means
+        variances = ewma((1 - EWMA_ALPHA) * diff * diff, EWMA_ALPHA, self.var)
+        previous_vars = np.concatenate([[self.var], variances[:-1]])
+        counts = self.count + np.arange(n)
+        z = np.zeros(n)
+        ready = (counts >= WARMUP_SAMPLES) & (previous_vars > 0)
+        z[ready] = diff[ready] / np.sqrt(previous_vars[ready])
+
+        # 이동 최소/최대 (이전 측정값을 앞에 붙여 구간을 이어서 계산)
+        history = np.concatenate([np.fromiter(self.tail, dtype=np.float64, count=len(self.tail)), x])
+        window = min(WINDOW, len(history))
+        spread = (rolling_extreme(history, window, np.maximum) - rolling_extreme(history, window, np.minimum))[-n:]
+        full = counts + 1 >= WINDOW
+        tolerance = FLAT_TOLERANCE * np.maximum(np.abs(means), 1.0)
+
+        conditions = {
+            "band": ((x > high) if high is not None else np.zeros(n, bool)) | ((x < low) if low is not None else np.zeros(n, bool)),
+            "zscore": np.abs(z) > (z_limit or Z_LIMIT),
+            "flat": full & (spread <= tolerance),
+        }
+        scores = {"band": x, "zscore": np.abs(z), "flat": spread}
+        started = []
+        for kind, on in conditions.items():
+            previous = np.concatenate([[self.active[kind]], on[:-1]])
+            for position in np.flatnonzero(on & ~previous):
+                started.append((int(position), kind, float(scores[kind][position])))
+            self.active[kind] = bool(on[-1])
+
+        # 다음 측정값을 위해 상태 갱신 (이동 최소/최대는 최근 구간으로 다시 만듦)
+        self.mean, self.var = float(means[-1]), float(variances[-1])
+        self.count += n
+        self.tail.extend(x[-WINDOW:].tolist())
+        self.lows.clear()
+        self.highs.clear()
+        first = self.count - len(self.tail)
+        for offset, value in enumerate(self.tail):
+            index = first + offset
+            while self.lows and self.lows[-1][1] >= value:
+                self.lows.pop()
+            while self.highs and self.highs[-1][1] <= value:
+                self.highs.pop()
+            self.lows.append((index, value))
+            self.highs.append((index, value))
+        return sorted(started)
+
+# EWMA 배열 계산 (y[k] = (1 - a) * y[k-1] + a * x[k]) 을 구간별 닫힌 식으로 계산
+# 구간 길이는 (1 - a)^-L 이 너무 커지지 않도록 제한
+def ewma(values, alpha, initial):
+    decay = 1 - alpha
+    block = max(1, min(8192, int(6 * math.log(10) / -math.log(decay)))) if 0 < decay < 1 else len(values)
+    result = np.empty(len(values))
+    powers = decay ** np.arange(1, block + 1)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        p = powers[:len(chunk)]
+        result[start:start + len(chunk)] = p * (initial + alpha * np.cumsum(chunk / p))
+        initial = result[start + len(chunk) - 1]
+    return result
+
+# 이동 최소/최대 (van Herk/Gil-Werman, 구간 크기와 관계없이 측정값마다 상수 시간)
+# 결과의 k번째 값은 values[k - window + 1 .. k]의 최소/최대 (앞부분은 있는 값까지만 사용)
+def rolling_extreme(values, window, function):
+    n = len(values)
+    identity = np.inf if function is np.minimum else -np.inf
+    padded = np.concatenate([np.full(window - 1, identity), values])
+    size = -(-len(padded) // window) * window
+    padded = np.concatenate([padded, np.full(size - len(padded), identity)])
+    blocks = padded.reshape(-1, window)
+    prefix = function.accumulate(blocks, axis=1).ravel()
+    suffix = function.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return function(suffix[:n], prefix[window - 1:window - 1 + n])
+
+# 모든 신호의 감지 상태 (모든 세션이 공유)
+@st.cache_resource
+def get_states():
+    return {}
+
+# 신호의 감지 상태 (처음이면 마지막 저장일의 측정값으로 통계를 미리 계산, 경보는 만들지 않음)
+def detector_state(signal, before):
+    states = get_states()
+    if signal not in states:
+        state = DetectorState()
+        days = [day for day in telemetry.stored_days(signal) if day <= before // telemetry.SECONDS_PER_DAY]
+        if days:
+            samples = telemetry.read_day(signal, days[-1])
+            samples = samples[samples["t"] < before]
+            state.update_batch(samples["v"], (None, None, None, None))
+            state.active = {kind: False for kind in ALERT_KINDS}
+            state.last_t = int(samples["t"][-1]) if len(samples) else None
+        states.setdefault(signal, state)
+    return states[signal]
+
+# 경보 저장
+def save_alerts(alerts):
+    if alerts:
+        storage.executemany(telemetry.DB_PATH, "INSERT INTO anomaly_alerts (signal_id, t, kind, value, score, section) VALUES (?, ?, ?, ?, ?, ?)",
+                            alerts)
+
+# 새 측정값 감지 (telemetry.append_samples에서 저장 전에 호출)
+# 적은 수는 측정값마다 update, 많으면 update_batch로 처리. 이미 지난 시각의 측정값은 되채우기(backfill)로 처리
+def observe(signal, t, v):
+    if len(t) == 0:
+        return
+    rule = load_rules().get(signal, (None, None, Z_LIMIT, None))
+    state = detector_state(signal, int(t[0]))
+    with state.lock:
+        if state.last_t is not None:
+            newer = t > state.last_t
+            t, v = t[newer], v[newer]
+        if len(t) == 0:
+            return
+        values = np.asarray(v, dtype=np.float64)
+        if len(t) <= 16:
+            started = [(position, kind, score) for position, x in enumerate(values.tolist())
+                       for kind, score in state.update(x, rule)]
+        else:
+            started = state.update_batch(values, rule)
+        state.last_t = int(t[-1])
+    save_alerts([(signal, int(t[position]), kind, float(values[position]), score, rule[3]) for position, kind, score in started])
+
+# 저장된 측정값 전체를 다시 검사 (하루 단위 배열 처리, 기존 경보는 지우고 다시 만듦)
+def backfill(signal):
+    rule = load_rules().get(signal, (None, None, Z_LIMIT, None))
+    state = DetectorState()
+    alerts = []
+    for day in telemetry.stored_days(signal):
+        samples = telemetry.read_day(signal, day)
+        if len(samples) == 0:
+            continue
+        values = samples["v"].astype(np.float64)
+        for position, kind, score in state.update_batch(values, rule):
+            alerts.append((signal, int(samples["t"][position]), kind, float(values[position]), score, rule[3]))
+        state.last_t = int(samples["t"][-1])
+
+    with storage.transaction(telemetry.DB_PATH) as conn:
+        conn.execute("DELETE FROM anomaly_alerts WHERE signal_id = ?", (signal,))
+        conn.executemany("INSERT INTO anomaly_alerts (signal_id, t, kind, value, score, section) VALUES (?, ?, ?, ?, ?, ?)", alerts)
+    get_states()[signal] = state
+    return state.count, len(alerts)
+
+# 경보 목록 조회 (최근 순)
+def recent_alerts(signals=None, start=None, end=None, limit=ALERT_LIMIT):
+    conditions, params = [], []
+    if signals:
+        conditions.append(f"a.signal_id IN ({', '.join('?' for _ in signals)})")
+        params.extend(signals)
+    if start is not None:
+        conditions.append("a.t >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("a.t < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = storage.query(telemetry.DB_PATH, f'''
+        SELECT a.t, s.name, a.kind, a.value, a.score, a.section, a.signal_id
+        FROM anomaly_alerts a JOIN signals s ON s.id = a.signal_id
+        {where} ORDER BY a.t DESC LIMIT ?
+    ''', (*params, limit))
+    return pd.DataFrame(rows, columns=["t", "name", "kind", "value", "score", "section", "signal_id"])
+
+# 관련 Troubleshooting 표 표시
+def show_section(name):
+    import troubleshooting  # 경보를 펼칠 때만 불러옴
+
+    section = next((row for row in troubleshooting.list_sections() if row[1] == name), None)
+    if section is None:
+        st.caption(f"'{name}' 표가 없습니다.")
+        return
+    st.dataframe(troubleshooting.section_frame(section[0]), hide_index=True, use_container_width=True)
+
+# 경보 화면 (경보 목록과 관련 Troubleshooting 표)
+def show_alerts(alerts):
+    st.subheader(f"이상 감지 ({len(alerts)}건)")
+    if alerts.empty:
+        st.caption("선택한 기간에 경보가 없습니다.")
+        return
+    table = pd.DataFrame({
+        "시각": pd.to_datetime(alerts["t"], unit="s"),
+        "신호": alerts["name"],
+        "종류": alerts["kind"].map(ALERT_KINDS),
+        "값": alerts["value"].round(3),
+        "관련 Troubleshooting": alerts["section"],
+    })
+    st.dataframe(table, hide_index=True, use_container_width=True)
+    for section in alerts["section"].dropna().unique():
+        with st.expander(f"Troubleshooting: {section}"):
+            show_section(section)
+
+# 관리자용 규칙 편집과 되채우기
+def admin_panel():
+    with st.sidebar.expander("이상 감지 설정", expanded=False):
+        rules = storage.query(telemetry.DB_PATH, '''
+            SELECT r.signal_id, s.name, r.low, r.high, r.z_limit, r.section
+            FROM anomaly_rules r JOIN signals s ON s.id = r.signal_id ORDER BY r.signal_id
+        ''')
+        df = pd.DataFrame(rules, columns=["signal_id", "신호", "하한", "상한", "z-score", "Troubleshooting"]).set_index("signal_id")
+        edited = st.data_editor(df, disabled=["신호"], hide_index=True, key="anomaly_rules")
+        if st.button("규칙 저장"):
+            storage.executemany(telemetry.DB_PATH, "UPDATE anomaly_rules SET low = ?, high = ?, z_limit = ?, section = ? WHERE signal_id = ?",
+                                [(*(None if pd.isna(value) else value for value in row[1:]), signal)
+                                 for signal, row in zip(edited.index, edited.itertuples(index=False, name=None))])
+            st.success("규칙을 저장했습니다.")
+        if st.button("저장된 측정값 다시 검사"):
+            with st.spinner("검사 중..."):
+                totals = [backfill(row[0]) for row in rules]
+            st.success(f"측정값 {sum(count for count, _ in totals):,}개, 경보 {sum(alerts for _, alerts in totals):,}건")
@@ -0,0 +1,328 @@
+import argparse
+import base64
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# 성능 측정 스크립트 (브라우저 없이 페이지의 데이터 처리 부분만 실행)
+# 사용법: python bench.py [--manuals 5 --pages 50 --tables 20 --rows 50 --parts 5000] [--save-baseline]
+# 합성 데이터베이스를 임시 폴더에 만들고, 측정 항목마다 별도 프로세스에서 실행해 최대 메모리(RSS)를 따로 잼
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(ROOT, "bench_baseline.json")
+
+# 합성 데이터 크기 기본값
+DEFAULT_SIZES = {"manuals": 5, "pages": 50, "tables": 20, "rows": 50, "parts": 5000}
+
+# 측정 항목별 반복 횟수 기본값
+DEFAULT_REPEAT = 20
+
+# 기준 결과보다 이 비율 이상 느리면 느려진 것으로 판단 (p50 기준)
+REGRESSION_RATIO = 1.2
+
+# 합성 데이터 파일 이름
+DOCX_NAME = "troubleshooting.docx"
+XLSX_NAME = "inventory.xlsx"
+
+# 표를 브라우저로 보낼 때의 크기 (st.dataframe과 같은 Arrow 변환)
+def frame_bytes(df):
+    from streamlit import dataframe_util
+
+    return len(dataframe_util.convert_pandas_df_to_arrow_bytes(df))
+
+# 합성 PDF (페이지마다 점검 내용 문장 여러 줄)
+def make_pdf(pages, seed):
+    import fitz
+
+    document = fitz.open()
+    for page_no in range(pages):
+        page = document.new_page()
+        lines = [f"Manual {seed} page {page_no + 1}: Safety valve lifting pressure check line {line}" for line in range(40)]
+        page.insert_text((50, 50), "\n".join(lines), fontsize=9)
+    data = document.tobytes(deflate=True)
+    document.close()
+    return data
+
+# 합성 Troubleshooting Word 파일 (첫 행은 표 이름, 둘째 행은 헤더)
+def make_docx(tables, rows):
+    from docx import Document
+
+    document = Document()
+    for table_no in range(tables):
+        table = document.add_table(rows=rows + 2, cols=4)
+        title = table.rows[0].cells[0].merge(table.rows[0].cells[-1])
+        title.text = f"<Equipment {table_no}>"
+        for cell, header in zip(table.rows[1].cells, ("현상", "원인", "조치", "비고")):
+            cell.text = header
+        for row_no, row in enumerate(table.rows[2:]):
+            for col_no, cell in enumerate(row.cells):
+                cell.text = f"{table_no}-{row_no}-{col_no} flame failure burner"
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+# 병합 칸이 있는 Word 파일 (Word 표 읽기 결과 비교용)
+# 가로/세로 병합, 중복 헤더, 여러 문단과 탭/줄바꿈, 하이퍼링크, 행 앞 빈 열, 칸 안의 표, 데이터 행이 없는 표를 포함
+def make_merged_docx(rows):
+    from docx import Document
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    document = Document()
+    table = document.add_table(rows=rows + 2, cols=5)
+    table.rows[0].cells[0].merge(table.rows[0].cells[-1]).text = " <Merged equipment> "
+    for cell, header in zip(table.rows[1].cells, ("현상", "원인", "원인", "조치", "원인")):
+        cell.text = header
+    for row_no, row in enumerate(table.rows[2:]):
+        for col_no, cell in enumerate(row.cells):
+            cell.text = f"{row_no}-{col_no} flame"
+    for first in range(2, rows + 2, 3):  # 세 행씩 세로 병합
+        table.cell(first, 0).merge(table.cell(min(first + 2, rows + 1), 0)).text = f"merged {first}"
+    table.cell(3, 2).merge(table.cell(4, 3))  # 가로와 세로 병합
+    cell = table.cell(2, 4)
+    cell.text = "first line"
+    run = cell.add_paragraph().add_run("tab")
+    run.add_tab()
+    run.add_break()
+    run.add_text("after break")
+    cell.paragraphs[-1]._p.append(parse_xml(
+        f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99"><w:r><w:t xml:space="preserve"> link </w:t></w:r></w:hyperlink>'))
+    cell.add_table(rows=2, cols=2).cell(0, 0).text = "nested"
+    table.rows[-1]._tr.get_or_add_trPr().append(parse_xml(f'<w:gridBefore {nsdecls("w")} w:val="1"/>'))
+    table.rows[-1]._tr.remove(table.rows[-1]._tr.tc_lst[-1])
+
+    document.add_table(rows=2, cols=2).cell(0, 0).text = "<No data>"
+    document.add_table(rows=3, cols=2).cell(0, 0).text = "<Second>"
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+# 합성 재고 엑셀 파일
+def make_xlsx(parts):
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "Part Name": [f"Part {i}" for i in range(parts)],
+        "Part Number": [f"P-{i:06d}" for i in range(parts)],
+        "Available Quantity": [i % 17 for i in range(parts)],
+        "Required Quantity": [i % 11 for i in range(parts)],
+    })
+    output = io.BytesIO()
+    df.to_excel(output, index=False)
+    return output.getvalue()
+
+# 측정용 폴더에 합성 데이터베이스 생성 (현재 폴더 기준, 예전 데이터베이스 파일은 가져오지 않음)
+def generate(sizes):
+    import migrations
+    import boiler_manual
+    import troubleshooting
+    import inventory_management
+
+    migrations.LEGACY_FILES = ()
+    migrations.migrate()
+    for seed in range(sizes["manuals"]):
+        boiler_manual.save_pdf_to_db(f"manual_{seed}.pdf", make_pdf(sizes["pages"], seed))
+
+    docx_data = make_docx(sizes["tables"], sizes["rows"])
+    with open(DOCX_NAME, "wb") as f:
+        f.write(docx_data)
+    troubleshooting.import_tables(troubleshooting.read_word_table(io.BytesIO(docx_data)))
+
+    xlsx_data = make_xlsx(sizes["parts"])
+    with open(XLSX_NAME, "wb") as f:
+        f.write(xlsx_data)
+    inventory_management.insert_data(XLSX_NAME, xlsx_data)
+
+# 측정 항목 준비 함수: 반복 실행할 함수를 반환하고, 그 함수는 브라우저로 보낼 바이트 수를 반환
+
+# Word 파일 읽기
+def case_troubleshooting_read(sizes):
+    import troubleshooting
+
+    with open(DOCX_NAME, "rb") as f:
+        data = f.read()
+
+    def run():
+        troubleshooting.read_word_table(io.BytesIO(data))
+        return 0
+    return run
+
+# Word 파일 읽기 (본문 XML 직접 읽기), 먼저 python-docx로 읽은 결과와 같은지 확인
+def case_troubleshooting_stream(sizes):
+    import troubleshooting
+    import word_tables
+
+    with open(DOCX_NAME, "rb") as f:
+        data = f.read()
+    for name, sample in ((DOCX_NAME, data), ("병합 칸 표", make_merged_docx(sizes["rows"]))):
+        if list(word_tables.iter_tables(io.BytesIO(sample))) != troubleshooting.read_word_table(io.BytesIO(sample)):
+            raise AssertionError(f"Word 표 읽기 결과가 python-docx와 다릅니다: {name}")
+
+    def run():
+        list(word_tables.iter_tables(io.BytesIO(data)))
+        return 0
+    return run
+
+# 표 저장과 검색 색인 (예전 insert_data)
+def case_troubleshooting_import(sizes):
+    import troubleshooting
+
+    with open(DOCX_NAME, "rb") as f:
+        tables = troubleshooting.read_word_table(io.BytesIO(f.read()))
+
+    def run():
+        troubleshooting.import_tables(tables)
+        return 0
+    return run
+
+# 모든 표를 넓은 형태로 조회 (캐시 없이)
+def case_troubleshooting_view(sizes):
+    import troubleshooting
+
+    def run():
+        troubleshooting.materialized_frame.clear()
+        return sum(frame_bytes(troubleshooting.section_frame(section_id)) for section_id, _ in troubleshooting.list_sections())
+    return run
+
+# 재고 엑셀 읽기
+def case_inventory_parse(sizes):
+    import inventory_management
+
+    with open(XLSX_NAME, "rb") as f:
+        data = f.read()
+
+    def run():
+        inventory_management.parse_excel(io.BytesIO(data))
+        return 0
+    return run
+
+# 재고 파일 목록과 항목 조회
+def case_inventory_view(sizes):
+    import inventory_management
+
+    def run():
+        return sum(frame_bytes(inventory_management.load_items(file_id)) for file_id, _ in inventory_management.view_data())
+    return run
+
+# 메뉴얼 PDF 읽기와 base64 변환 (PDF 서버를 쓸 수 없을 때 브라우저로 보내는 형태)
+def case_manual_load(sizes):
+    import boiler_manual
+
+    def run():
+        sent = 0
+        for file_id, _ in boiler_manual.load_pdf_list_from_db():
+            sent += len(base64.b64encode(boiler_manual.load_pdf_data_from_db(file_id)))
+        return sent
+    return run
+
+# 측정 항목 (이름 -> 준비 함수)
+CASES = {
+    "troubleshooting.read_word_table": case_troubleshooting_read,
+    "word_tables.iter_tables": case_troubleshooting_stream,
+    "troubleshooting.import_tables": case_troubleshooting_import,
+    "troubleshooting.section_frame": case_troubleshooting_view,
+    "inventory_management.parse_excel": case_inventory_parse,
+    "inventory_management.view_data+load_items": case_inventory_view,
+    "boiler_manual.load_pdf_data_from_db+base64": case_manual_load,
+}
+
+# 백분위수 (가장 가까운 순위)
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+# 측정 항목 하나 실행 (별도 프로세스 안에서 실행, 결과는 JSON 한 줄로 출력)
+def run_case(name, sizes, repeat):
+    run = CASES[name](sizes)
+    run()  # 모듈 로딩과 첫 연결은 측정에서 제외
+    timings, sent = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sent = run()
+        timings.append((time.perf_counter() - start) * 1000)
+    result = {
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "bytes_sent": sent,
+    }
+    print(json.dumps(result))
+
+# 이 스크립트를 측정용 폴더에서 별도 프로세스로 실행
+def run_child(data_dir, *args):
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), *args], cwd=data_dir,
+                               capture_output=True, text=True, env={**os.environ, "PYTHONPATH": ROOT})
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit {completed.returncode}")
+    return completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else ""
+
+# 기준 결과와 비교해서 표 출력, 느려진 항목 목록 반환
+def report(results, baseline):
+    regressions = []
+    print(f"{'항목':<45} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'보낸 KB':>9}  기준 대비")
+    for name, result in results.items():
+        line = (f"{name:<45} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                f"{result['peak_rss_mb']:>8.0f} {result['bytes_sent'] / 1024:>9.0f}")
+        reference = (baseline or {}).get("results", {}).get(name)
+        if reference:
+            ratio = result["p50_ms"] / reference["p50_ms"] if reference["p50_ms"] else 1.0
+            line += f"  x{ratio:.2f}"
+            if ratio > REGRESSION_RATIO:
+                line += " 느려짐"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="페이지 데이터 처리 성능 측정")
+    for key, value in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{key}", type=int, default=value)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--case", action="append", choices=list(CASES), help="측정할 항목 (여러 번 지정 가능, 기본값은 전체)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="비교할 기준 결과 파일")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 결과로 저장")
+    parser.add_argument("--generate", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = {key: getattr(args, key) for key in DEFAULT_SIZES}
+
+    # 별도 프로세스 안에서 실행되는 경우
+    if args.generate:
+        generate(sizes)
+        return 0
+    if args.run_case:
+        run_case(args.run_case, sizes, args.repeat)
+        return 0
+
+    size_args = [f"--{key}={value}" for key, value in sizes.items()]
+    with tempfile.TemporaryDirectory(prefix="blr_bench_") as data_dir:
+        start = time.perf_counter()
+        run_child(data_dir, "--generate", *size_args)
+        print(f"합성 데이터 생성: {time.perf_counter() - start:.1f}초 {sizes}")
+        results = {}
+        for name in args.case or CASES:
+            results[name] = json.loads(run_child(data_dir, f"--run-case={name}", f"--repeat={args.repeat}", *size_args))
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("sizes") != sizes:
+            print(f"기준 결과의 데이터 크기가 다릅니다: {baseline.get('sizes')}")
+            baseline = None
+    regressions = report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"sizes": sizes, "repeat": args.repeat, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"기준 결과 저장: {args.baseline}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import os
+import io
+import mmap
+import shutil
+import zlib
+import lzma
+import hashlib
+import storage
+import metrics
+
+# 업로드한 파일 원본 저장소 (모든 페이지가 공유)
+# 내용의 SHA-256을 키로 한 번만 저장하고, 페이지 테이블(pdf_files 등)에는 해시만 보관
+# blobs: 해시, 원본 크기, 저장 방식, 참조 수, 데이터 (디스크에 둔 파일은 NULL)
+DB_PATH = storage.DB_PATH
+
+# 큰 파일은 데이터베이스 밖에 압축하지 않고 저장 (필요한 부분만 메모리 매핑으로 읽음)
+BLOB_DIR = os.path.join(storage.DB_DIR, "blobs")
+LARGE_BLOB_SIZE = 1024 * 1024
+
+# 압축 방식 (zlib: 빠름, lzma: 더 작지만 느림), 줄어드는 크기가 이 비율보다 작으면 압축하지 않음
+# 압축은 조금씩 넣을 수 있는 압축기로 하고, 풀 때는 한 번에 풂
+CODEC = "zlib"
+MIN_SAVING = 0.1
+CODECS = {
+    "zlib": (lambda: zlib.compressobj(6), zlib.decompress),
+    "lzma": (lzma.LZMACompressor, lzma.decompress),
+}
+
+# 저장 방식 이름 (압축하지 않은 데이터, 디스크 파일)
+RAW = "raw"
+FILE = "file"
+
+# blr_app/blobs 폴더가 없으면 생성
+if not os.path.exists(BLOB_DIR):
+    os.makedirs(BLOB_DIR)
+
+# 내용 해시 (파일 객체는 처음부터 조금씩 읽음)
+def content_digest(source):
+    source.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(storage.BLOB_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+# 디스크에 저장한 파일 경로 (해시 앞 두 글자로 폴더를 나눔)
+def blob_path(digest):
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+# 압축한 데이터 (압축 효과가 작으면 None, 원본보다 작은 크기까지만 메모리에 모음)
+def compress(source, size):
+    source.seek(0)
+    compressor = CODECS[CODEC][0]()
+    limit = size * (1 - MIN_SAVING)
+    chunks, length = [], 0
+    for chunk in iter(lambda: source.read(storage.BLOB_CHUNK_SIZE), b""):
+        chunks.append(compressor.compress(chunk))
+        length += len(chunks[-1])
+        if length > limit:
+            return None
+    chunks.append(compressor.flush())
+    length += len(chunks[-1])
+    return b"".join(chunks) if length <= limit else None
+
+# 큰 파일을 디스크에 저장 (다른 프로그램이 반쯤 쓴 파일을 읽지 않도록 바꿔치기)
+def write_file(digest, source):
+    path = blob_path(digest)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    source.seek(0)
+    with open(temp_path, "wb") as f:
+        shutil.copyfileobj(source, f, storage.BLOB_CHUNK_SIZE)
+    os.replace(temp_path, path)
+
+# 압축하지 않은 원본을 SQLite BLOB에 조금씩 기록 (빈 BLOB을 먼저 만들고 채움)
+def write_raw(conn, blob_id, source):
+    source.seek(0)
+    with conn.blobopen("blobs", "data", blob_id) as blob:
+        for chunk in iter(lambda: source.read(storage.BLOB_CHUNK_SIZE), b""):
+            blob.write(chunk)
+
+# 원본 저장 후 해시 반환 (같은 내용이 이미 있으면 참조 수만 늘림, 호출한 쪽의 트랜잭션 안에서 실행)
+# source: bytes 또는 읽기용 파일 객체 (업로드 임시 파일 등은 전체를 메모리에 올리지 않고 조금씩 읽음)
+# 트랜잭션이 되돌려져도 디스크에 쓴 파일은 남지만 같은 내용을 다시 저장할 때 그대로 사용함
+def put(conn, source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    digest = content_digest(source)
+    if conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE digest = ?", (digest,)).rowcount:
+        return digest
+    size = source.seek(0, io.SEEK_END)
+    with metrics.timer("blob write") as t:
+        if size >= LARGE_BLOB_SIZE:
+            write_file(digest, source)
+            conn.execute("INSERT INTO blobs (digest, size, codec, refcount, data) VALUES (?, ?, ?, 1, NULL)", (digest, size, FILE))
+        else:
+            compressed = compress(source, size)
+            if compressed is not None:
+                conn.execute("INSERT INTO blobs (digest, size, codec, refcount, data) VALUES (?, ?, ?, 1, ?)",
+                             (digest, size, CODEC, compressed))
+            else:
+                blob_id = conn.execute("INSERT INTO blobs (digest, size, codec, refcount, data) VALUES (?, ?, ?, 1, zeroblob(?))",
+                                       (digest, size, RAW, size)).lastrowid
+                write_raw(conn, blob_id, source)
+        t.size = size
+    return digest
+
+# 참조 하나 해제 (참조가 없어진 원본은 collect()에서 삭제)
+def release(conn, digest):
+    if digest is not None:
+        conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE digest = ?", (digest,))
+
+# 참조가 없는 원본 삭제 (삭제와 파일 제거를 같은 쓰기 잠금 안에서 처리해 동시에 저장하는 같은 내용을 지우지 않음)
+def collect(db_path=DB_PATH):
+    with storage.transaction(db_path) as conn:
+        removed = conn.execute("DELETE FROM blobs WHERE refcount <= 0 RETURNING digest, codec").fetchall()
+        for digest, codec in removed:
+            if codec == FILE:
+                try:
+                    os.remove(blob_path(digest))
+                except FileNotFoundError:
+                    pass
+    return len(removed)
+
+# 원본 정보 (id, 원본 크기, 저장 방식), 없으면 None
+def blob_info(digest, db_path=DB_PATH):
+    return storage.query_one(db_path, "SELECT id, size, codec FROM blobs WHERE digest = ?", (digest,))
+
+# 디스크에 저장한 원본의 경로 (데이터베이스 안에 있으면 None, 파일 경로로 바로 열 수 있는 경우에 사용)
+def local_path(digest, db_path=DB_PATH):
+    info = blob_info(digest, db_path)
+    return blob_path(digest) if info and info[2] == FILE else None
+
+# 원본 전체 읽기 (없으면 None)
+def read(digest, db_path=DB_PATH):
+    row = storage.query_one(db_path, "SELECT codec, data FROM blobs WHERE digest = ?", (digest,))
+    if row is None:
+        return None
+    codec, data = row
+    with metrics.timer("blob read") as t:
+        if codec == FILE:
+            with open(blob_path(digest), "rb") as f:
+                data = f.read()
+        elif codec != RAW:
+            data = CODECS[codec][1](data)
+        t.size = len(data)
+    return data
+
+# 원본의 start부터 end까지(포함)를 조금씩 읽는 반복자, 원본이 없으면 None (응답 헤더를 보내기 전에 확인)
+def iter_range(digest, start, end, chunk_size=storage.BLOB_CHUNK_SIZE, db_path=DB_PATH):
+    info = blob_info(digest, db_path)
+    if info is None:
+        return None
+    return range_chunks(digest, info, start, end, chunk_size, db_path)
+
+# 데이터베이스에 압축하지 않고 저장한 원본의 일부 읽기 (조각마다 연결을 빌리고 바로 반환)
+def read_raw_chunk(blob_id, offset, length, db_path=DB_PATH):
+    with storage.connection(db_path) as conn, conn.blobopen("blobs", "data", blob_id, readonly=True) as blob:
+        blob.seek(offset)
+        return blob.read(length)
+
+# iter_range의 조각 읽기
+# 디스크 파일은 메모리 매핑, 압축하지 않은 데이터는 SQLite BLOB 단위 읽기로 필요한 부분만 읽음 (압축된 작은 데이터는 풀어서 나눔)
+# 조각을 넘겨받은 쪽이 네트워크로 보내는 동안에는 풀의 연결을 붙잡지 않음
+def range_chunks(digest, info, start, end, chunk_size, db_path):
+    blob_id, size, codec = info
+    end = min(end, size - 1)
+    if codec == FILE:
+        with open(blob_path(digest), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(start, end + 1, chunk_size):
+                yield mapped[offset:min(offset + chunk_size, end + 1)]
+    elif codec == RAW:
+        for offset in range(start, end + 1, chunk_size):
+            yield read_raw_chunk(blob_id, offset, min(chunk_size, end + 1 - offset), db_path)
+    else:
+        data = read(digest, db_path)
+        for offset in range(start, end + 1, chunk_size):
+            yield data[offset:min(offset + chunk_size, end + 1)]
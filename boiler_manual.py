@@ -1,123 +1,126 @@
 import streamlit as st
-import sqlite3
-import base64
-
-# 데이터베이스 경로 설정
-DB_PATH = "/tmp/pdf_files.db"
-
-# 데이터베이스 초기화
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS pdf_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            file_name TEXT,
-            file_data BLOB
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# PDF 저장
-def save_pdf_to_db(file_name, file_data):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO pdf_files (file_name, file_data) VALUES (?, ?)", (file_name, file_data))
-    conn.commit()
-    conn.close()
+import storage
+import blobs
+import pdf_server
+import pdf_render
+import search
+import ingest
+
+# 데이터베이스 경로 설정 (테이블은 migrations.py에서 생성)
+DB_PATH = storage.DB_PATH
+
+# PDF 서버에 저장 위치 등록
+pdf_server.register_source("manual", DB_PATH, "pdf_files")
+
+# PDF 저장 (원본은 공유 저장소에 한 번만 저장하고 해시로 참조)
+def save_pdf_to_db(file_name, file_data, pages=None):
+    with storage.transaction(DB_PATH) as conn:
+        file_id = conn.execute("INSERT INTO pdf_files (file_name, digest) VALUES (?, ?)",
+                               (file_name, blobs.put(conn, file_data))).lastrowid
+    search.index_pdf("manual", file_id, file_name, file_data, pages)
+    return file_id
+
+# 업로드 작업 저장 (ingest 작업 스레드에서 실행, pages는 미리 추출한 페이지 텍스트)
+def store_upload(file_name, file_data, pages):
+    save_pdf_to_db(file_name, file_data, pages)
+    return f"{len(pages)}쪽"
 
 # PDF 목록 불러오기
 def load_pdf_list_from_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, file_name FROM pdf_files")
-    pdf_files = c.fetchall()
-    conn.close()
-    return pdf_files
+    return storage.query(DB_PATH, "SELECT id, file_name FROM pdf_files")
+
+# PDF 목록 (pdf_files 테이블 버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_pdf_list(version):
+    return load_pdf_list_from_db()
+
+# 현재 PDF 목록 (다른 세션에서 올리거나 지운 파일도 바로 반영)
+def pdf_list():
+    return cached_pdf_list(storage.table_version(DB_PATH, "pdf_files"))
 
 # PDF 삭제
 def delete_pdf_from_db(file_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM pdf_files WHERE id = ?", (file_id,))
-    conn.commit()
-    conn.close()
+    with storage.transaction(DB_PATH) as conn:
+        row = conn.execute("DELETE FROM pdf_files WHERE id = ? RETURNING digest", (file_id,)).fetchone()
+        if row:
+            blobs.release(conn, row[0])
+    blobs.collect()
+    search.remove_document("manual", file_id)
 
 # PDF 데이터 불러오기
 def load_pdf_data_from_db(file_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT file_data FROM pdf_files WHERE id = ?", (file_id,))
-    result = c.fetchone()
-    conn.close()
+    result = storage.query_one(DB_PATH, "SELECT digest FROM pdf_files WHERE id = ?", (file_id,))
+    if result:
+        return blobs.read(result[0])
+    else:
+        return None
+
+# PDF 크기 조회 (데이터를 읽지 않고 파일이 있는지 확인)
+def load_pdf_size_from_db(file_id):
+    result = storage.query_one(DB_PATH, "SELECT b.size FROM pdf_files f JOIN blobs b ON b.digest = f.digest WHERE f.id = ?", (file_id,))
     if result:
         return result[0]
     else:
         return None
 
-# PDF 보기
-def show_pdf(file_data):
-    base64_pdf = base64.b64encode(file_data).decode('utf-8')
-    pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="700" height="1000"></iframe>'
-    st.markdown(pdf_display, unsafe_allow_html=True)
+# PDF 보기 (브라우저 뷰어 또는 페이지 이미지)
+def show_pdf(file_id, view_mode="브라우저 뷰어"):
+    if view_mode == "페이지 이미지":
+        pdf_render.show_viewer("manual", file_id, key="manual")
+    else:
+        pdf_server.show_pdf("manual", file_id)
 
 # PDF 앱
 def app():
     st.title("보일러 메뉴얼 관리")
 
-    # 데이터베이스 초기화
-    init_db()
-
-    # 상태 초기화
-    if "pdf_files" not in st.session_state:
-        st.session_state.pdf_files = load_pdf_list_from_db()
+    # 모든 세션이 공유하는 PDF 목록
+    pdf_files = pdf_list()
 
     # 관리자 모드
-    is_admin = st.sidebar.checkbox("관리자 모드 활성화")
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
 
     # PDF 업로드
     if is_admin:
         st.sidebar.header("PDF 파일 업로드")
         uploaded_file = st.sidebar.file_uploader("PDF 파일을 업로드하세요", type="pdf")
-        if uploaded_file:
-            file_name = uploaded_file.name
-            file_data = uploaded_file.read()
-            save_pdf_to_db(file_name, file_data)
-            st.sidebar.success(f"'{file_name}' 파일이 업로드되었습니다!")
-            # 상태 업데이트
-            st.session_state.pdf_files = load_pdf_list_from_db()
+        # 업로드한 파일은 백그라운드에서 저장하고 색인
+        if ingest.submit_upload("manual", uploaded_file):
+            st.sidebar.success(f"'{uploaded_file.name}' 파일을 저장하는 중입니다.")
+        with st.sidebar:
+            # 저장이 끝나면 페이지를 다시 그리고, 바뀐 버전으로 목록을 다시 불러옴
+            ingest.show_jobs(["manual"])
 
     # PDF 삭제
     st.sidebar.header("PDF 파일 삭제")
-    if st.session_state.pdf_files:
+    if pdf_files:
         file_to_delete = st.sidebar.selectbox(
             "삭제할 파일을 선택하세요",
-            st.session_state.pdf_files,
+            pdf_files,
             format_func=lambda x: x[1]
         )
         if file_to_delete:
             if st.sidebar.button("삭제"):
                 delete_pdf_from_db(file_to_delete[0])
                 st.sidebar.success(f"'{file_to_delete[1]}' 파일이 삭제되었습니다!")
-                # 상태 업데이트
-                st.session_state.pdf_files = load_pdf_list_from_db()
+                # 삭제한 파일을 목록에서 바로 제외
+                pdf_files = pdf_list()
     else:
         st.sidebar.write("삭제할 PDF 파일이 없습니다.")
 
     # PDF 목록
     st.sidebar.header("PDF 파일 목록")
-    if st.session_state.pdf_files:
+    if pdf_files:
         selected_file = st.sidebar.selectbox(
             "PDF 파일을 선택하세요",
-            st.session_state.pdf_files,
+            pdf_files,
             format_func=lambda x: x[1]
         )
+        view_mode = st.sidebar.radio("보기 방식", ("브라우저 뷰어", "페이지 이미지"))
         if selected_file:
-            pdf_data = load_pdf_data_from_db(selected_file[0])
-            if pdf_data:
+            if load_pdf_size_from_db(selected_file[0]):
                 st.subheader(f"'{selected_file[1]}' 보기")
-                show_pdf(pdf_data)
+                show_pdf(selected_file[0], view_mode)
             else:
                 st.error("PDF 데이터를 불러오는 데 실패했습니다. 파일이 손상되었거나 삭제되었을 수 있습니다.")
     else:
@@ -1,173 +1,277 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
-import os
+import storage
+import blobs
+import metrics
 import fitz  # PyMuPDF for PDF handling
-import base64
 import io
+import json
+import pdf_server
+import table_changes
+import pdf_render
+import pdf_tables
+import inspection_records
+import search
+import ingest
+import file_list
 from datetime import datetime
 
-# 데이터베이스 파일 경로 설정
-DB_DIR = "blr_app"
-DB_PATH = os.path.join(DB_DIR, "boiler_operations.db")
-
-# blr_app 폴더가 없으면 생성
-if not os.path.exists(DB_DIR):
-    os.makedirs(DB_DIR)
-
-# 데이터베이스 연결 함수
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    return conn
-
-# 테이블 생성 함수
-def create_tables():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS inspection_items
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  file_name TEXT,
-                  file_data BLOB)''')
-    c.execute('''CREATE TABLE IF NOT EXISTS inspection_notes
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  file_name TEXT,
-                  file_data BLOB)''')
-    conn.commit()
-    conn.close()
+# 데이터베이스 파일 경로 설정 (테이블은 migrations.py에서 생성)
+DB_PATH = storage.DB_PATH
+
+# PDF 서버에 저장 위치 등록
+pdf_server.register_source("inspection", DB_PATH, "inspection_items")
+
+# 테이블별 검색 대상 이름
+SEARCH_SOURCES = {"inspection_items": "inspection", "inspection_notes": "notes"}
+
+# 파일 목록 조회
+def list_files(table_name):
+    return storage.query(DB_PATH, f"SELECT id, file_name FROM {table_name}")
+
+# 파일 목록에 표시할 파일별 개수 (점검사항은 쪽 수, 점검항목은 행 수)
+COUNT_QUERIES = {
+    "inspection_items": "SELECT COUNT(*) FROM inspection_item_pages p WHERE p.file_id = f.id",
+    "inspection_notes": "SELECT COUNT(*) FROM inspection_note_rows r WHERE r.note_id = f.id",
+}
+
+# 파일 목록이 읽는 테이블 (이 테이블들의 변경 버전이 목록 캐시의 키)
+LIST_TABLES = {
+    "inspection_items": ("inspection_items", "inspection_item_pages"),
+    "inspection_notes": ("inspection_notes", "inspection_note_rows"),
+}
+
+# 파일 목록의 변경 버전
+def list_versions(table_name):
+    return storage.table_versions(DB_PATH, LIST_TABLES[table_name])
+
+# 파일 수 (버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=8, show_spinner=False)
+def file_count(table_name, versions):
+    return storage.query_one(DB_PATH, f"SELECT COUNT(*) FROM {table_name}")[0]
+
+# 파일 목록 한 페이지 (id, 이름, 크기, 올린 시각, 개수), 최근 파일부터
+# 원본은 읽지 않고 원본 저장소의 크기만 함께 조회, 버전이 바뀔 때까지 모든 세션이 같은 결과를 사용
+@st.cache_data(max_entries=32, show_spinner=False)
+def file_page(table_name, limit, offset, versions):
+    return storage.query(DB_PATH, f'''
+        SELECT f.id, f.file_name, b.size, f.uploaded_at, ({COUNT_QUERIES[table_name]})
+        FROM {table_name} f LEFT JOIN blobs b ON b.digest = f.digest
+        ORDER BY f.id DESC LIMIT ? OFFSET ?
+    ''', (limit, offset))
+
+# 파일 데이터 조회
+def load_file_data(table_name, file_id):
+    return blobs.read(storage.query_one(DB_PATH, f"SELECT digest FROM {table_name} WHERE id = ?", (file_id,))[0])
+
+# 파일 검색 색인 갱신
+def index_file(table_name, file_id, file_name, file_data, pages=None):
+    if table_name == "inspection_items":
+        search.index_pdf(SEARCH_SOURCES[table_name], file_id, file_name, file_data, pages)
+    else:
+        search.index_frames(SEARCH_SOURCES[table_name], file_id, file_name, [load_note_frame(file_id)])
+
+# 파일 저장
+def insert_file(table_name, file_name, file_data, pages=None):
+    with storage.transaction(DB_PATH) as conn:
+        file_id = conn.execute(f"INSERT INTO {table_name} (file_name, digest, uploaded_at) VALUES (?, ?, ?)",
+                               (file_name, blobs.put(conn, file_data), datetime.now().isoformat(timespec="seconds"))).lastrowid
+    index_file(table_name, file_id, file_name, file_data, pages)
+    return file_id
+
+# 점검사항 업로드 작업 저장 (ingest 작업 스레드에서 실행, parsed는 미리 추출한 페이지 텍스트와 표)
+def store_inspection_upload(file_name, file_data, parsed):
+    with storage.transaction(DB_PATH) as conn:
+        file_id = conn.execute("INSERT INTO inspection_items (file_name, digest, uploaded_at) VALUES (?, ?, ?)",
+                               (file_name, blobs.put(conn, file_data), datetime.now().isoformat(timespec="seconds"))).lastrowid
+        pdf_tables.store_tables(conn, file_id, parsed["digests"], parsed["tables"], file_data)
+    index_file("inspection_items", file_id, file_name, file_data, parsed["pages"])
+    return f"{len(parsed['pages'])}쪽 (표를 새로 추출한 페이지 {len(parsed['tables'])}쪽)"
+
+# 표를 아직 추출하지 않은 점검사항 파일은 처음 한 번만 추출 (예전에 저장된 파일)
+def ensure_tables(file_id):
+    if storage.query_one(DB_PATH, "SELECT 1 FROM inspection_item_pages WHERE file_id = ? LIMIT 1", (file_id,)) is None:
+        file = io.BytesIO(load_file_data("inspection_items", file_id))
+        parsed = pdf_tables.parse_pdf(file, pdf_tables.stored_digests())
+        with storage.transaction(DB_PATH) as conn:
+            pdf_tables.store_tables(conn, file_id, parsed["digests"], parsed["tables"], file)
+
+# 파일 삭제
+def delete_file(table_name, file_id):
+    with storage.transaction(DB_PATH) as conn:
+        row = conn.execute(f"DELETE FROM {table_name} WHERE id = ? RETURNING digest", (file_id,)).fetchone()
+        if row:
+            blobs.release(conn, row[0])
+        if table_name == "inspection_notes":
+            row_ids = [row[0] for row in conn.execute("SELECT id FROM inspection_note_rows WHERE note_id = ?", (file_id,))]
+            inspection_records.delete_rows(conn, row_ids)
+            conn.execute("DELETE FROM inspection_note_rows WHERE note_id = ?", (file_id,))
+        else:
+            pdf_tables.delete_tables(conn, file_id)
+    blobs.collect()
+    search.remove_document(SEARCH_SOURCES[table_name], file_id)
+
+# 점검항목 엑셀 읽기 (점검한 날짜는 엑셀이 아니라 점검 기록으로 저장, file: 파일 경로 또는 읽기용 파일 객체)
+@metrics.timed("parse excel notes")
+def parse_note_excel(file):
+    return pd.read_excel(file)
+
+# 행 하나를 JSON 한 줄로 변환
+def row_json(values):
+    return json.dumps([table_changes.sql_value(value) for value in values], ensure_ascii=False, default=str)
+
+# 점검항목 행 데이터 저장 (열 이름과 행마다 JSON 한 줄)
+def store_note_rows(conn, note_id, df):
+    conn.execute("UPDATE inspection_notes SET columns = ? WHERE id = ?",
+                 (json.dumps([str(column) for column in df.columns], ensure_ascii=False), note_id))
+    conn.execute("DELETE FROM inspection_note_rows WHERE note_id = ?", (note_id,))
+    conn.executemany("INSERT INTO inspection_note_rows (note_id, row_no, data) VALUES (?, ?, ?)",
+                     [(note_id, row_no, row_json(row)) for row_no, row in enumerate(df.itertuples(index=False))])
+
+# 점검항목 엑셀 저장 (업로드할 때 한 번만 읽음)
+def insert_note(file_name, file_data, df=None):
+    if df is None:
+        df = parse_note_excel(io.BytesIO(file_data))
+    with storage.transaction(DB_PATH) as conn:
+        note_id = conn.execute("INSERT INTO inspection_notes (file_name, digest, uploaded_at) VALUES (?, ?, ?)",
+                               (file_name, blobs.put(conn, file_data), datetime.now().isoformat(timespec="seconds"))).lastrowid
+        store_note_rows(conn, note_id, df)
+    search.index_frames(SEARCH_SOURCES["inspection_notes"], note_id, file_name, [df])
+    return note_id
+
+# 점검항목 업로드 작업 저장 (ingest 작업 스레드에서 실행, df는 미리 읽은 엑셀)
+def store_note_upload(file_name, file_data, df):
+    insert_note(file_name, file_data, df)
+    return f"{len(df)}행"
+
+# 점검항목 행 데이터 (점검항목 테이블 버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_note_frame(note_id, versions):
+    return load_note_frame(note_id)
+
+# 현재 점검항목 행 데이터 (다른 세션에서 저장한 변경도 바로 반영)
+def note_frame(note_id):
+    return cached_note_frame(note_id, list_versions("inspection_notes"))
+
+# 점검항목 행 데이터 조회 (index는 행 id, 예전에 저장된 파일은 처음 한 번만 엑셀을 읽어서 변환)
+def load_note_frame(note_id):
+    columns = storage.query_one(DB_PATH, "SELECT columns FROM inspection_notes WHERE id = ?", (note_id,))[0]
+    if columns is None:
+        df = parse_note_excel(io.BytesIO(load_file_data("inspection_notes", note_id)))
+        with storage.transaction(DB_PATH) as conn:
+            store_note_rows(conn, note_id, df)
+        columns = json.dumps([str(column) for column in df.columns], ensure_ascii=False)
+    rows = storage.query(DB_PATH, "SELECT id, data FROM inspection_note_rows WHERE note_id = ? ORDER BY row_no", (note_id,))
+    return pd.DataFrame([json.loads(row[1]) for row in rows], columns=json.loads(columns), index=[row[0] for row in rows])
+
+# 점검항목 수정 내용 저장 (바뀐 행만 한 번의 트랜잭션으로 반영)
+# df: 불러온 표 (index가 행 id), 수정한 행은 불러온 행에 바뀐 칸만 덮어써서 저장
+def save_note_changes(note_id, file_name, df, edited_df, changes):
+    with storage.transaction(DB_PATH) as conn:
+        conn.executemany("UPDATE inspection_note_rows SET data = ? WHERE id = ?",
+                         [(row_json(pd.Series({**df.loc[key].to_dict(), **values}, dtype=object).reindex(df.columns)), key)
+                          for key, values in changes.updated.items()])
+        conn.executemany("DELETE FROM inspection_note_rows WHERE id = ?", [(key,) for key in changes.deleted])
+        inspection_records.delete_rows(conn, changes.deleted)
+        next_row_no = conn.execute("SELECT COALESCE(MAX(row_no), -1) + 1 FROM inspection_note_rows WHERE note_id = ?", (note_id,)).fetchone()[0]
+        conn.executemany("INSERT INTO inspection_note_rows (note_id, row_no, data) VALUES (?, ?, ?)",
+                         [(note_id, next_row_no + offset, row_json(pd.Series(values, dtype=object).reindex(edited_df.columns)))
+                          for offset, values in enumerate(changes.added)])
+    search.index_frames(SEARCH_SOURCES["inspection_notes"], note_id, file_name, [edited_df])
+
+# 점검항목을 엑셀 파일로 내보내기
+def export_note_excel(note_id):
+    output = io.BytesIO()
+    load_note_frame(note_id).to_excel(output, index=False, engine='openpyxl')
+    return output.getvalue()
 
 # 점검사항 페이지: PDF 파일 업로드 및 보기
 def inspection_items_page(is_admin):
     st.title("점검사항")
-    create_tables()
-
-    # 저장된 PDF 보기
-    conn = get_connection()
-    c = conn.cursor()
-    try:
-        c.execute("SELECT id, file_name FROM inspection_items")
-        rows = c.fetchall()
-    except sqlite3.OperationalError:
-        # 테이블이 올바르지 않은 경우 테이블을 재생성
-        c.execute("DROP TABLE IF EXISTS inspection_items")
-        c.execute('''CREATE TABLE inspection_items
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      file_name TEXT,
-                      file_data BLOB)''')
-        conn.commit()
-        rows = []
-    conn.close()
-
-    if rows:
-        for row in rows:
-           
-            conn = get_connection()
-            c = conn.cursor()
-            c.execute("SELECT file_data FROM inspection_items WHERE id = ?", (row[0],))
-            file_data = c.fetchone()[0]
-            conn.close()
-
-            if isinstance(file_data, bytes):
-                base64_pdf = base64.b64encode(file_data).decode('utf-8')
-                pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="700" height="1000" type="application/pdf"></iframe>'
-                st.markdown(pdf_display, unsafe_allow_html=True)
-                st.download_button(label="PDF 다운로드", data=file_data, file_name=row[1])
+
+    # 저장된 PDF 목록 (펼친 파일만 원본을 읽어서 표시)
+    versions = list_versions("inspection_items")
+    total = file_count("inspection_items", versions)
+
+    if total:
+        view_mode = st.radio("보기 방식", ("브라우저 뷰어", "페이지 이미지"), horizontal=True)
+        limit, offset = file_list.page_bounds("inspection_list_page", total)
+        for file_id, file_name, size, uploaded_at, page_count in file_page("inspection_items", limit, offset, versions):
+            with file_list.entry(f"inspection_file_{file_id}", file_name, size, uploaded_at,
+                                 f"{page_count}쪽" if page_count else None) as expander:
+                if not expander.open:
+                    continue
+                if view_mode == "페이지 이미지":
+                    pdf_render.show_viewer("inspection", file_id, key="inspection")
+                else:
+                    pdf_server.show_pdf("inspection", file_id)
+                pdf_server.download_button("inspection", file_id, file_name)
+                ensure_tables(file_id)
+                pdf_tables.show_tables(file_id, nested=True)
 
     else:
         st.write("저장된 PDF 파일이 없습니다.")
 
+    # 예전 형식에서 옮긴 점검표
+    pdf_tables.show_tables(pdf_tables.LEGACY_FILE_ID, "기존 점검표")
+
     # 관리자 모드일 때만 업로드 허용
     if is_admin:
         st.subheader("PDF 파일 업로드")
         uploaded_file = st.file_uploader("PDF 파일을 업로드하세요", type=["pdf"])
-        if uploaded_file is not None:
-            file_name = uploaded_file.name
-            file_data = uploaded_file.read()
-
-            conn = get_connection()
-            c = conn.cursor()
-            c.execute('''INSERT INTO inspection_items (file_name, file_data)
-                         VALUES (?, ?)''', (file_name, file_data))
-            conn.commit()
-            conn.close()
-
-            st.success(f"'{file_name}' 파일이 성공적으로 저장되었습니다!")
+        # 업로드한 파일은 백그라운드에서 저장하고 색인
+        if ingest.submit_upload("inspection", uploaded_file):
+            st.success(f"'{uploaded_file.name}' 파일을 저장하는 중입니다.")
+        ingest.show_jobs(["inspection"])
 
         # 관리자 모드에서 파일 삭제 기능
         st.sidebar.title("저장된 파일 목록 및 삭제")
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT id, file_name FROM inspection_items")
-        items = c.fetchall()
-        conn.close()
+        items = list_files("inspection_items")
 
         if items:
             file_to_delete = st.sidebar.selectbox("삭제할 파일을 선택하세요", items, format_func=lambda x: x[1])
             if st.sidebar.button("파일 삭제"):
-                conn = get_connection()
-                c = conn.cursor()
-                c.execute("DELETE FROM inspection_items WHERE id = ?", (file_to_delete[0],))
-                conn.commit()
-                conn.close()
+                delete_file("inspection_items", file_to_delete[0])
                 st.sidebar.success(f"'{file_to_delete[1]}' 파일이 삭제되었습니다.")
 
 # 점검항목 페이지: 엑셀 파일 업로드 및 데이터 표시
 def inspection_notes_page(is_admin):
     st.title("점검항목")
-    create_tables()
-
-    # 저장된 엑셀 파일 보기
-    conn = get_connection()
-    c = conn.cursor()
-    try:
-        c.execute("SELECT id, file_name FROM inspection_notes")
-        rows = c.fetchall()
-    except sqlite3.OperationalError:
-        # 테이블이 올바르지 않은 경우 테이블을 재생성
-        c.execute("DROP TABLE IF EXISTS inspection_notes")
-        c.execute('''CREATE TABLE inspection_notes
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      file_name TEXT,
-                      file_data BLOB)''')
-        conn.commit()
-        rows = []
-    conn.close()
-
-    if rows:
-        for row in rows:
-            
-            conn = get_connection()
-            c = conn.cursor()
-            c.execute("SELECT file_data FROM inspection_notes WHERE id = ?", (row[0],))
-            file_data = c.fetchone()[0]
-            conn.close()
-
-            if isinstance(file_data, bytes):
-                try:
-                    # 엑셀 데이터 읽어서 표시
-                    df = pd.read_excel(io.BytesIO(file_data))
 
-                    # 날짜 입력 가능한 열 추가
-                    if 'date' not in df.columns:
-                        df['date'] = ''
+    # 저장된 엑셀 파일 목록 (펼친 파일만 행 데이터를 읽어서 표시)
+    versions = list_versions("inspection_notes")
+    total = file_count("inspection_notes", versions)
+
+    if total:
+        limit, offset = file_list.page_bounds("notes_list_page", total)
+        for note_id, file_name, size, uploaded_at, row_count in file_page("inspection_notes", limit, offset, versions):
+            with file_list.entry(f"notes_file_{note_id}", file_name, size, uploaded_at,
+                                 f"{row_count}행" if row_count else None) as expander:
+                if not expander.open:
+                    continue
+                try:
+                    # 저장된 행 데이터 표시
+                    df = note_frame(note_id)
 
-                    edited_df = st.data_editor(df, use_container_width=True, num_rows="dynamic")
+                    editor_name = f"notes_{note_id}"
+                    edited_df = st.data_editor(table_changes.editor_frame(df), use_container_width=True, num_rows="dynamic", hide_index=True,
+                                               key=table_changes.editor_key(editor_name))
 
                     # 저장 버튼 추가
-                    if st.button("변경 사항 저장"):
-                        # 데이터베이스 업데이트
-                        output = io.BytesIO()
-                        edited_df.to_excel(output, index=False, engine='openpyxl')
-                        updated_data = output.getvalue()
-
-                        conn = get_connection()
-                        c = conn.cursor()
-                        c.execute("UPDATE inspection_notes SET file_data = ? WHERE id = ?", (updated_data, row[0]))
-                        conn.commit()
-                        conn.close()
-
-                        st.success("변경 사항이 저장되었습니다!")
-
-                    st.download_button(label="엑셀 다운로드", data=file_data, file_name=row[1])
+                    if st.button("변경 사항 저장", key=f"notes_save_{note_id}"):
+                        changes = table_changes.editor_changes(editor_name, df)
+                        if table_changes.has_changes(changes):
+                            save_note_changes(note_id, file_name, df, edited_df, changes)
+                            table_changes.reset_editor(editor_name)
+                            st.success("변경 사항이 저장되었습니다!")
+                        else:
+                            st.info("변경된 내용이 없습니다.")
+
+                    # 엑셀 내보내기 (버튼을 누를 때만 파일 생성)
+                    if st.button("엑셀 파일 만들기", key=f"notes_export_{note_id}"):
+                        st.download_button(label="엑셀 다운로드", data=export_note_excel(note_id), file_name=file_name)
+
+                    inspection_records.show_records(note_id, df)
                 except Exception as e:
                     st.error(f"엑셀 파일 처리 중 오류가 발생했습니다: {e}")
     else:
@@ -177,41 +281,25 @@ def inspection_notes_page(is_admin):
     if is_admin:
         st.subheader("엑셀 파일 업로드")
         uploaded_file = st.file_uploader("엑셀 파일을 업로드하세요", type=["xlsx"])
-        if uploaded_file is not None:
-            file_name = uploaded_file.name
-            file_data = uploaded_file.read()
-
-            conn = get_connection()
-            c = conn.cursor()
-            c.execute('''INSERT INTO inspection_notes (file_name, file_data)
-                         VALUES (?, ?)''', (file_name, file_data))
-            conn.commit()
-            conn.close()
-
-            st.success(f"'{file_name}' 파일이 성공적으로 저장되었습니다!")
+        # 업로드한 파일은 백그라운드에서 읽고 저장
+        if ingest.submit_upload("notes", uploaded_file):
+            st.success(f"'{uploaded_file.name}' 파일을 저장하는 중입니다.")
+        ingest.show_jobs(["notes"])
 
         # 관리자 모드에서 파일 삭제 기능
         st.sidebar.title("저장된 파일 목록 및 삭제")
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("SELECT id, file_name FROM inspection_notes")
-        notes = c.fetchall()
-        conn.close()
+        notes = list_files("inspection_notes")
 
         if notes:
             file_to_delete = st.sidebar.selectbox("삭제할 파일을 선택하세요", notes, format_func=lambda x: x[1])
             if st.sidebar.button("파일 삭제"):
-                conn = get_connection()
-                c = conn.cursor()
-                c.execute("DELETE FROM inspection_notes WHERE id = ?", (file_to_delete[0],))
-                conn.commit()
-                conn.close()
+                delete_file("inspection_notes", file_to_delete[0])
                 st.sidebar.success(f"'{file_to_delete[1]}' 파일이 삭제되었습니다.")
 
 # 사용자 모드와 관리자 모드를 선택하는 함수
 def mode_selection():
     st.sidebar.title("모드 선택")
-    is_admin = st.sidebar.checkbox("관리자 모드 활성화")
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
     return is_admin
 
 # 보일러 작업 페이지 함수
@@ -0,0 +1,37 @@
+import streamlit as st
+
+# 업로드한 파일 목록 화면 (보일러 작업, 재고관리 페이지가 함께 사용)
+# 목록에는 쿼리 한 번으로 읽은 정보(이름, 크기, 올린 시각, 쪽 수 등)만 표시하고, 원본은 항목을 펼쳤을 때만 읽음
+
+# 한 번에 보여줄 파일 수
+PAGE_SIZE = 10
+
+# 파일 크기 표시
+def format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+# 목록 페이지 선택 (파일이 한 페이지보다 많을 때만 표시), (LIMIT, OFFSET) 반환
+def page_bounds(key, total, page_size=PAGE_SIZE):
+    pages = max(1, (total + page_size - 1) // page_size)
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages  # 파일을 지워서 페이지 수가 줄어든 경우
+    page_no = 1
+    if pages > 1:
+        page_no = st.number_input(f"목록 페이지 (전체 {pages}쪽, 파일 {total}개)", min_value=1, max_value=pages, step=1, key=key)
+    return page_size, (page_no - 1) * page_size
+
+# 파일 항목 하나 (펼치면 rerun해서 .open이 True가 됨, 내용은 펼쳤을 때만 만들기)
+# 크기, 올린 시각, 개수 표시 중 값이 없는 것은 빼고 이름 뒤에 붙임
+def entry(key, file_name, size=None, uploaded_at=None, count=None):
+    details = [file_name]
+    if size is not None:
+        details.append(format_size(size))
+    if uploaded_at:
+        details.append(uploaded_at.replace("T", " ")[:16])
+    if count:
+        details.append(count)
+    return st.expander(" · ".join(details), key=key, on_change="rerun")
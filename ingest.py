@@ -0,0 +1,215 @@
+import streamlit as st
+import os
+import io
+import hashlib
+import importlib
+import multiprocessing
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+import storage
+import metrics
+
+# 작업 목록 데이터베이스와 업로드 파일 임시 보관 위치
+DB_PATH = storage.DB_PATH
+SPOOL_DIR = os.path.join(storage.DB_DIR, "ingest_spool")
+
+# 동시에 처리할 작업 수 (파일 읽기는 프로세스마다 코어 하나씩 사용)
+WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# 작업 목록 화면 갱신 주기 (초)와 표시할 작업 수
+POLL_SECONDS = 1
+RECENT_JOBS = 5
+
+# 작업 종류별 처리 함수 ("모듈.함수" 이름, 작업을 처리할 때만 모듈을 불러옴)
+# parse: 임시 파일 경로를 받아 읽은 결과 반환 (별도 프로세스에서 실행, streamlit과 데이터베이스는 사용하지 않음)
+# store: (파일 이름, 파일 데이터, 읽은 결과)를 받아 저장하고 결과 메시지 반환
+JOB_KINDS = {
+    "manual": ("search.extract_pdf_pages", "boiler_manual.store_upload"),
+    "inspection": ("pdf_tables.parse_pdf", "boiler_operations.store_inspection_upload"),
+    "notes": ("boiler_operations.parse_note_excel", "boiler_operations.store_note_upload"),
+    "inventory": ("inventory_management.parse_excel", "inventory_management.store_upload"),
+    "troubleshooting": ("troubleshooting.parse_upload", "troubleshooting.store_upload"),
+    "telemetry": ("telemetry.parse_upload", "telemetry.store_upload"),
+}
+
+# 작업 종류별로 읽기 전에 작업 스레드에서 조회하는 값 ("모듈.함수" 이름, 결과는 parse 함수의 두 번째 인자로 전달)
+PARSE_INPUTS = {
+    "inspection": "pdf_tables.stored_digests",
+}
+
+# 업로드 파일을 나눠 받는 크기
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 작업 종류별 파일 시작 부분 (첫 조각을 받을 때 형식 확인, None이면 확인하지 않음)
+# PDF는 "%PDF", xlsx와 docx는 zip 파일
+PDF_SIGNATURE = (b"%PDF",)
+ZIP_SIGNATURE = (b"PK\x03\x04",)
+SIGNATURES = {
+    "manual": PDF_SIGNATURE,
+    "inspection": PDF_SIGNATURE,
+    "notes": ZIP_SIGNATURE,
+    "inventory": ZIP_SIGNATURE,
+    "troubleshooting": ZIP_SIGNATURE,
+    "telemetry": None,
+}
+
+# 작업 상태 이름
+STATUS_LABELS = {"queued": "대기", "running": "처리 중", "done": "완료", "failed": "실패"}
+
+# blr_app 폴더가 없으면 생성
+if not os.path.exists(SPOOL_DIR):
+    os.makedirs(SPOOL_DIR)
+
+# "모듈.함수" 이름으로 함수 찾기
+def resolve(path):
+    module_name, function_name = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+# 임시 보관한 업로드 파일 경로
+def spool_path(job_id):
+    return os.path.join(SPOOL_DIR, f"{job_id}.upload")
+
+# 별도 프로세스에서 파일 읽기 (파일 데이터는 프로세스 사이로 보내지 않고 경로만 전달, 읽는 함수가 직접 파일을 엶)
+def parse_file(parse_path, path, *args):
+    return resolve(parse_path)(path, *args)
+
+# 작업 상태 갱신
+def update_job(job_id, status, progress, message=None):
+    finished_at = datetime.now().isoformat(timespec="seconds") if status in ("done", "failed") else None
+    storage.execute(DB_PATH, "UPDATE ingest_jobs SET status = ?, progress = ?, message = ?, finished_at = ? WHERE id = ?",
+                    (status, progress, message, finished_at, job_id))
+
+# 작업 하나 처리 (읽기는 프로세스 풀, 저장은 작업 스레드에서 실행)
+def run_job(job_id):
+    kind, file_name = storage.query_one(DB_PATH, "SELECT kind, file_name FROM ingest_jobs WHERE id = ?", (job_id,))
+    parse_path, store_path = JOB_KINDS[kind]
+    path = spool_path(job_id)
+    try:
+        update_job(job_id, "running", 0.1, "파일 읽는 중")
+        args = [resolve(PARSE_INPUTS[kind])()] if kind in PARSE_INPUTS else []
+        with metrics.timer(f"ingest parse {kind}") as t:
+            parsed = get_workers()["processes"].submit(parse_file, parse_path, path, *args).result()
+            t.size = os.path.getsize(path)
+
+        update_job(job_id, "running", 0.6, "저장 및 색인 중")
+        # 저장 함수에는 임시 파일을 열어서 넘김 (원본 저장소가 조금씩 읽어서 기록)
+        with open(path, "rb") as f, metrics.timer(f"ingest store {kind}"):
+            message = resolve(store_path)(file_name, f, parsed)
+        update_job(job_id, "done", 1.0, message)
+    except Exception as e:
+        update_job(job_id, "failed", 1.0, str(e))
+    finally:
+        try:
+            os.remove(path)  # 실패한 작업은 다시 처리하지 않으므로 임시 파일도 삭제
+        except FileNotFoundError:
+            pass
+
+# 작업 스레드와 파일 읽기 프로세스 풀 (모든 세션이 공유)
+# 서버가 다시 시작되기 전에 끝나지 않은 작업은 다시 처리
+@st.cache_resource
+def get_workers():
+    workers = {
+        "threads": ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="ingest"),
+        "processes": ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn")),
+    }
+    for name in os.listdir(SPOOL_DIR):
+        if name.endswith(".part"):
+            os.remove(os.path.join(SPOOL_DIR, name))  # 받다가 멈춘 업로드 파일
+    pending = storage.query(DB_PATH, "SELECT id FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY id")
+    for (job_id,) in pending:
+        if os.path.exists(spool_path(job_id)):
+            workers["threads"].submit(run_job, job_id)
+        else:
+            update_job(job_id, "failed", 1.0, "업로드 파일이 없습니다.")
+    return workers
+
+# 업로드 파일을 조금씩 임시 파일에 복사하면서 해시 계산과 형식 확인 (파일 전체를 한 번 더 메모리에 복사하지 않음)
+# (임시 파일 경로, SHA-256) 반환, 형식이 맞지 않으면 ValueError
+def spool_upload(kind, source):
+    signatures = SIGNATURES.get(kind)
+    digest, size = hashlib.sha256(), 0
+    with tempfile.NamedTemporaryFile(dir=SPOOL_DIR, suffix=".part", delete=False) as f:
+        try:
+            source.seek(0)
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                if size == 0 and signatures and not chunk.startswith(signatures):
+                    raise ValueError("파일 형식이 올바르지 않습니다.")
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    if size == 0:
+        os.remove(f.name)
+        raise ValueError("빈 파일입니다.")
+    return f.name, digest.hexdigest()
+
+# 업로드 파일을 작업 목록에 추가하고 작업 id 반환 (처리는 백그라운드에서 진행)
+# source: bytes 또는 읽기용 파일 객체, 형식이 맞지 않으면 실패한 작업으로 기록하고 None 반환
+def submit(kind, file_name, source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    workers = get_workers()
+    now = datetime.now().isoformat(timespec="seconds")
+    try:
+        with metrics.timer(f"ingest spool {kind}"):
+            temp_path, digest = spool_upload(kind, source)
+    except ValueError as e:
+        storage.execute(DB_PATH, '''
+            INSERT INTO ingest_jobs (kind, file_name, status, progress, message, created_at, finished_at)
+            VALUES (?, ?, 'failed', 1, ?, ?, ?)
+        ''', (kind, file_name, str(e), now, now))
+        return None
+    job_id = storage.execute(DB_PATH, '''
+        INSERT INTO ingest_jobs (kind, file_name, digest, status, progress, created_at)
+        VALUES (?, ?, ?, 'queued', 0, ?)
+    ''', (kind, file_name, digest, now)).lastrowid
+    os.replace(temp_path, spool_path(job_id))
+    workers["threads"].submit(run_job, job_id)
+    return job_id
+
+# 업로드 위젯의 파일을 한 번만 작업 목록에 추가 (rerun 때 다시 추가하지 않음)
+# 위젯의 파일 객체를 그대로 넘겨서 조금씩 복사 (getvalue()로 전체를 복사하지 않음)
+def submit_upload(kind, uploaded_file):
+    state_key = f"ingest_upload_{kind}"
+    if uploaded_file is None or st.session_state.get(state_key) == uploaded_file.file_id:
+        return None
+    st.session_state[state_key] = uploaded_file.file_id
+    return submit(kind, uploaded_file.name, uploaded_file)
+
+# 최근 작업 목록 조회
+def recent_jobs(kinds, limit=RECENT_JOBS):
+    placeholders = ", ".join("?" for _ in kinds)
+    return storage.query(DB_PATH, f'''
+        SELECT id, file_name, status, progress, message FROM ingest_jobs
+        WHERE kind IN ({placeholders}) ORDER BY id DESC LIMIT ?
+    ''', (*kinds, limit))
+
+# 작업 목록 표시 (처리 중인 작업이 있으면 주기적으로 다시 조회하고, 끝나면 페이지를 다시 그림)
+def show_jobs(kinds):
+    get_workers()
+    jobs = recent_jobs(kinds)
+    active = {job[0] for job in jobs if job[2] in ("queued", "running")}
+    seen_key = f"ingest_active_{'_'.join(kinds)}"
+    st.session_state[seen_key] = active
+
+    @st.fragment(run_every=POLL_SECONDS if active else None)
+    def job_list():
+        jobs = recent_jobs(kinds)
+        now_active = {job[0] for job in jobs if job[2] in ("queued", "running")}
+        if st.session_state.get(seen_key, set()) - now_active:
+            st.rerun()  # 끝난 작업의 결과를 페이지 전체에 반영
+        for job_id, file_name, status, progress, message in jobs:
+            label = f"{file_name} · {STATUS_LABELS.get(status, status)}" + (f" · {message}" if message else "")
+            if status == "failed":
+                st.error(label)
+            elif status == "done":
+                st.caption(label)
+            else:
+                st.progress(progress or 0.0, text=label)
+
+    if jobs:
+        job_list()
@@ -0,0 +1,141 @@
+import streamlit as st
+import json
+from datetime import date, datetime, timedelta
+import pandas as pd
+import storage
+
+# 데이터베이스 파일 경로 (boiler_operations와 같은 파일, 서로 불러오지 않도록 storage에서 가져옴)
+DB_PATH = storage.DB_PATH
+
+# 점검 주기 기본값 (일, 매일 순회 점검)
+DEFAULT_INTERVAL_DAYS = 1
+
+# 기록 조회 기간 기본값 (일)
+DEFAULT_PERIOD_DAYS = 30
+
+# 점검항목 이름으로 쓰지 않는 열 (예전 엑셀에 추가하던 날짜 입력 열)
+DATE_COLUMN = "date"
+
+# 점검 기록 화면 열 이름
+RECORD_COLUMNS = {"done_on": "점검일", "item": "점검항목", "operator": "작업자", "value": "측정값", "remark": "비고"}
+
+# 예전 엑셀의 'date' 열에 입력된 날짜를 점검 기록으로 옮김 (예전 데이터베이스를 가져올 때 한 번)
+def migrate_date_column(conn):
+    notes = conn.execute("SELECT id, columns FROM inspection_notes WHERE columns IS NOT NULL").fetchall()
+    records = []
+    for note_id, columns in notes:
+        columns = json.loads(columns)
+        if DATE_COLUMN not in columns:
+            continue
+        position = columns.index(DATE_COLUMN)
+        for row_id, data in conn.execute("SELECT id, data FROM inspection_note_rows WHERE note_id = ?", (note_id,)):
+            done_on = pd.to_datetime(json.loads(data)[position], errors="coerce")
+            if not pd.isna(done_on):
+                records.append((note_id, row_id, done_on.date().isoformat(), None, None, None, done_on.isoformat()))
+    conn.executemany('''INSERT INTO inspection_records (note_id, row_id, done_on, operator, value, remark, recorded_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''', records)
+
+# 점검항목 이름 (행의 값 중 앞에서부터 비어 있지 않은 두 칸, index는 행 id)
+def item_labels(df):
+    values = df.drop(columns=[DATE_COLUMN], errors="ignore").astype(str)
+    labels = values.apply(lambda row: " · ".join([value for value in row if value.strip() and value != "nan"][:2]), axis=1)
+    return labels[labels != ""]
+
+# 점검 기록 추가
+def record(note_id, row_id, done_on, operator, value, remark):
+    storage.execute(DB_PATH, '''INSERT INTO inspection_records (note_id, row_id, done_on, operator, value, remark, recorded_at)
+                                                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    (note_id, row_id, done_on.isoformat(), operator or None, value or None, remark or None,
+                     datetime.now().isoformat(timespec="seconds")))
+
+# 점검항목 행의 기록과 주기 삭제 (행이나 파일을 지울 때 같은 트랜잭션 안에서 호출)
+def delete_rows(conn, row_ids):
+    conn.executemany("DELETE FROM inspection_records WHERE row_id = ?", [(row_id,) for row_id in row_ids])
+    conn.executemany("DELETE FROM inspection_intervals WHERE row_id = ?", [(row_id,) for row_id in row_ids])
+
+# 기간 안의 점검 기록 (최근 순, end는 포함하지 않음)
+def records_between(note_id, start, end):
+    rows = storage.query(DB_PATH, '''
+        SELECT done_on, row_id, operator, value, remark FROM inspection_records
+        WHERE note_id = ? AND done_on >= ? AND done_on < ? ORDER BY done_on DESC, id DESC
+    ''', (note_id, start.isoformat(), end.isoformat()))
+    return pd.DataFrame(rows, columns=["done_on", "row_id", "operator", "value", "remark"])
+
+# 점검항목별 마지막 점검일과 주기 (항목마다 (row_id, done_on) 색인에서 최근 값 하나만 읽음)
+def last_done(note_id):
+    rows = storage.query(DB_PATH, '''
+        SELECT r.id,
+               (SELECT MAX(done_on) FROM inspection_records WHERE row_id = r.id),
+               COALESCE(i.interval_days, ?)
+        FROM inspection_note_rows r LEFT JOIN inspection_intervals i ON i.row_id = r.id
+        WHERE r.note_id = ?
+    ''', (DEFAULT_INTERVAL_DAYS, note_id))
+    return pd.DataFrame(rows, columns=["row_id", "last_done", "interval_days"]).set_index("row_id")
+
+# 점검항목별 상태 (마지막 점검일, 주기, 다음 점검일, 밀린 일수)
+# 한 번도 점검하지 않은 항목은 밀린 것으로 봄
+def item_status(note_id, labels, today):
+    status = last_done(note_id).reindex(labels.index)
+    status["interval_days"] = status["interval_days"].fillna(DEFAULT_INTERVAL_DAYS).astype(int)
+    last = pd.to_datetime(status["last_done"])
+    due = last + pd.to_timedelta(status["interval_days"], unit="D")
+    overdue_days = (pd.Timestamp(today) - due).dt.days
+    return pd.DataFrame({
+        "점검항목": labels,
+        "마지막 점검일": last.dt.date,
+        "주기(일)": status["interval_days"],
+        "다음 점검일": due.dt.date,
+        "밀린 일수": overdue_days.where(last.notna()),
+        "밀림": last.isna() | (overdue_days > 0),
+    }, index=labels.index)
+
+# 점검 주기 저장
+def save_intervals(note_id, intervals):
+    storage.executemany(DB_PATH, '''
+        INSERT INTO inspection_intervals (row_id, note_id, interval_days) VALUES (?, ?, ?)
+        ON CONFLICT (row_id) DO UPDATE SET interval_days = excluded.interval_days
+    ''', [(int(row_id), note_id, int(days)) for row_id, days in intervals.items()])
+
+# 점검 기록 화면 (밀린 점검, 기록 입력, 선택한 기간의 기록만 조회)
+def show_records(note_id, df):
+    labels = item_labels(df)
+    if labels.empty:
+        return
+    st.subheader("점검 기록")
+    today = date.today()
+
+    status = item_status(note_id, labels, today)
+    show_all = st.toggle("모든 항목 보기", key=f"records_all_{note_id}")
+    st.metric("밀린 점검", f"{int(status['밀림'].sum()):,} / {len(status):,}")
+    shown = status if show_all else status[status["밀림"]]
+    edited = st.data_editor(shown.drop(columns="밀림"), hide_index=True, use_container_width=True,
+                            disabled=["점검항목", "마지막 점검일", "다음 점검일", "밀린 일수"], key=f"records_status_{note_id}")
+    changed = edited["주기(일)"][edited["주기(일)"] != shown["주기(일)"]]
+    if not changed.empty and st.button("점검 주기 저장", key=f"records_intervals_{note_id}"):
+        save_intervals(note_id, changed.clip(lower=1))
+        st.rerun()
+
+    # 점검 기록 입력
+    with st.form(f"inspection_record_{note_id}", clear_on_submit=True):
+        row_id = st.selectbox("점검항목", labels.index, format_func=labels.get)
+        col_date, col_operator = st.columns(2)
+        done_on = col_date.date_input("점검일", value=today)
+        operator = col_operator.text_input("작업자", value=st.session_state.get("inspection_operator", ""))
+        col_value, col_remark = st.columns(2)
+        value = col_value.text_input("측정값")
+        remark = col_remark.text_input("비고")
+        if st.form_submit_button("기록"):
+            st.session_state["inspection_operator"] = operator
+            record(note_id, int(row_id), done_on, operator, value, remark)
+            # rerun 후에 표시하도록 메시지를 남김 (바로 표시하면 rerun으로 사라짐)
+            st.session_state[f"inspection_message_{note_id}"] = f"'{labels[row_id]}' 점검을 기록했습니다."
+            st.rerun()
+    if f"inspection_message_{note_id}" in st.session_state:
+        st.success(st.session_state.pop(f"inspection_message_{note_id}"))
+
+    # 선택한 기간의 기록 조회
+    period = st.date_input("조회 기간", value=(today - timedelta(days=DEFAULT_PERIOD_DAYS), today), key=f"records_period_{note_id}")
+    if len(period) == 2:
+        records = records_between(note_id, period[0], period[1] + timedelta(days=1))
+        records.insert(1, "item", records.pop("row_id").map(labels))
+        st.dataframe(records.rename(columns=RECORD_COLUMNS), hide_index=True, use_container_width=True)
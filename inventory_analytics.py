@@ -0,0 +1,101 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import storage
+import inventory_management
+
+# 안전 재고 비율 기본값 (필요 수량 대비 추가로 확보할 비율)
+SAFETY_STOCK_RATIO = 0.2
+
+# ABC 등급 기준 (필요 수량 누적 비율)
+ABC_LIMITS = (0.8, 0.95)
+
+# 상태 이름 (부족: 필요 수량보다 적음, 재주문: 재주문점보다 적음)
+STATUS_LABELS = ("부족", "재주문", "정상")
+
+# 분석 결과 열 이름
+RESULT_COLUMNS = {
+    "file_name": "파일(선박)",
+    "part_name": "Part Name",
+    "part_number": "Part Number",
+    "available_quantity": "Available Quantity",
+    "required_quantity": "Required Quantity",
+    "shortage": "부족 수량",
+    "coverage": "보유율",
+    "reorder_point": "재주문점",
+    "reorder_quantity": "주문 수량",
+    "abc": "ABC",
+    "status": "상태",
+}
+
+# 모든 파일의 재고 항목 조회
+def load_inventory():
+    rows = storage.query(inventory_management.DB_PATH, '''
+        SELECT i.id, COALESCE(f.file_name, '기존 재고'), i.part_name, i.part_number,
+               i.available_quantity, i.required_quantity
+        FROM inventory i LEFT JOIN inventory_files f ON f.id = i.file_id
+    ''')
+    columns = ["id", "file_name", "part_name", "part_number", "available_quantity", "required_quantity"]
+    return pd.DataFrame(rows, columns=columns).set_index("id")
+
+# ABC 등급 (필요 수량이 큰 순서로 누적 비율이 80%까지 A, 95%까지 B, 나머지 C)
+def abc_classes(values):
+    total = values.sum()
+    if total <= 0:
+        return np.full(len(values), "C", dtype=object)
+    order = np.argsort(-values, kind="stable")
+    before = (np.cumsum(values[order]) - values[order]) / total  # 앞선 항목까지의 누적 비율
+    classes = np.empty(len(values), dtype=object)
+    classes[order] = np.select([before < ABC_LIMITS[0], before < ABC_LIMITS[1]], ["A", "B"], "C")
+    return classes
+
+# 부족 수량, 보유율, 재주문점, ABC 등급 계산 (행마다 반복하지 않고 배열 단위로 계산, 필요 수량이 0이면 보유율은 빈 값)
+def compute_metrics(df, safety_ratio=SAFETY_STOCK_RATIO):
+    available = df["available_quantity"].to_numpy(dtype=float)
+    required = df["required_quantity"].to_numpy(dtype=float)
+
+    shortage = np.maximum(required - available, 0)
+    coverage = np.divide(available, required, out=np.full(len(df), np.nan), where=required > 0)
+    reorder_point = np.ceil(required * (1 + safety_ratio))
+    reorder_quantity = np.maximum(reorder_point - available, 0)
+    status = np.select([shortage > 0, available < reorder_point], STATUS_LABELS[:2], STATUS_LABELS[2])
+
+    return df.assign(
+        shortage=shortage.astype(int),
+        coverage=coverage,
+        reorder_point=reorder_point.astype(int),
+        reorder_quantity=reorder_quantity.astype(int),
+        abc=abc_classes(required),
+        status=status,
+    )
+
+# 분석 결과 (재고 항목 테이블 버전이 바뀌면 다시 계산, 모든 세션이 공유)
+@st.cache_data(max_entries=8, show_spinner=False)
+def analyze(version, safety_ratio):
+    return compute_metrics(load_inventory(), safety_ratio)
+
+# 재고 분석 화면 (부족하거나 재주문이 필요한 항목만 표시)
+def show_analytics():
+    safety_ratio = st.slider("안전 재고 비율 (%)", min_value=0, max_value=100, value=int(SAFETY_STOCK_RATIO * 100), step=5) / 100
+    result = analyze(storage.table_version(inventory_management.DB_PATH, "inventory"), safety_ratio)
+    if result.empty:
+        st.write("분석할 재고 항목이 없습니다.")
+        return
+
+    files = sorted(result["file_name"].unique())
+    col_files, col_status = st.columns(2)
+    selected_files = col_files.multiselect("파일(선박)", files, default=files)
+    selected_status = col_status.multiselect("상태", STATUS_LABELS[:2], default=list(STATUS_LABELS[:2]))
+
+    scope = result[result["file_name"].isin(selected_files)]
+    flagged = scope[scope["status"].isin(selected_status)]
+
+    col_total, col_short, col_reorder, col_a = st.columns(4)
+    col_total.metric("전체 항목", f"{len(scope):,}")
+    col_short.metric("부족", f"{(scope['status'] == '부족').sum():,}")
+    col_reorder.metric("재주문", f"{(scope['status'] == '재주문').sum():,}")
+    col_a.metric("A 등급 중 부족", f"{((scope['abc'] == 'A') & (scope['status'] == '부족')).sum():,}")
+
+    flagged = flagged.sort_values(["shortage", "reorder_quantity"], ascending=False)
+    st.dataframe(flagged[list(RESULT_COLUMNS)].rename(columns=RESULT_COLUMNS), hide_index=True, use_container_width=True,
+                 column_config={RESULT_COLUMNS["coverage"]: st.column_config.NumberColumn(format="percent")})
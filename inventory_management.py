@@ -1,147 +1,251 @@
 import streamlit as st
-import sqlite3
-import os
 import pandas as pd
 import io
-
-# 데이터베이스 파일 경로 설정
-DB_DIR = "blr_app"
-DB_PATH = os.path.join(DB_DIR, "inventory.db")
-
-# blr_app 폴더가 없으면 생성
-if not os.path.exists(DB_DIR):
-    os.makedirs(DB_DIR)
-
-# 데이터베이스 연결 함수
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    return conn
-
-# 테이블 생성 함수
-def create_table():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS inventory (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            file_name TEXT,
-            file_data BLOB
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# 데이터베이스 초기화 함수 (기존 데이터 삭제)
+from datetime import datetime
+import storage
+import blobs
+import metrics
+import table_changes
+import ingest
+import inventory_analytics
+import stock_ledger
+import file_list
+
+# 데이터베이스 파일 경로 설정 (테이블은 migrations.py에서 생성)
+DB_PATH = storage.DB_PATH
+
+# 재고 항목 열 이름 (데이터베이스 열 -> 엑셀 열)
+COLUMNS = {
+    "part_name": "Part Name",
+    "part_number": "Part Number",
+    "available_quantity": "Available Quantity",
+    "required_quantity": "Required Quantity",
+}
+
+# 엑셀 열 이름 별칭 (소문자, 공백 제거 후 비교)
+COLUMN_ALIASES = {
+    "partname": "part_name", "부품명": "part_name", "품명": "part_name",
+    "partnumber": "part_number", "partno": "part_number", "부품번호": "part_number", "품번": "part_number",
+    "availablequantity": "available_quantity", "재고수량": "available_quantity", "보유수량": "available_quantity",
+    "requiredquantity": "required_quantity", "필요수량": "required_quantity", "요구수량": "required_quantity",
+}
+
+# 데이터베이스 초기화 함수 (기존 데이터 삭제, 삭제 트리거가 변경 버전을 올림)
 def reset_database():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DROP TABLE IF EXISTS inventory")
-    conn.commit()
-    conn.close()
-    create_table()
-
-# 데이터베이스에 데이터 삽입
-def insert_data(file_name, file_data):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO inventory (file_name, file_data)
-        VALUES (?, ?)
-    ''', (file_name, file_data))
-    conn.commit()
-    conn.close()
-
-# 데이터베이스에서 데이터 조회
+    with storage.transaction(DB_PATH) as conn:
+        conn.execute("DELETE FROM inventory")
+        for (digest,) in conn.execute("DELETE FROM inventory_files RETURNING digest").fetchall():
+            blobs.release(conn, digest)
+        stock_ledger.clear_tables(conn)
+    blobs.collect()
+
+# 엑셀 데이터를 재고 항목 표로 변환 (열 이름을 데이터베이스 열로 맞춤, file: 파일 경로 또는 읽기용 파일 객체)
+@metrics.timed("parse excel inventory")
+def parse_excel(file):
+    df = pd.read_excel(file)
+    renamed = {}
+    for column in df.columns:
+        key = str(column).strip().lower().replace(" ", "").replace("_", "")
+        if key in COLUMN_ALIASES:
+            renamed[column] = COLUMN_ALIASES[key]
+    df = df.rename(columns=renamed)
+    if "part_number" not in df.columns:
+        raise ValueError("'Part Number' 열이 없습니다.")
+
+    df = df.reindex(columns=list(COLUMNS))
+    df = df.dropna(how="all")
+    df["part_name"] = df["part_name"].fillna("").astype(str).str.strip()
+    df["part_number"] = df["part_number"].fillna("").astype(str).str.strip()
+    for column in ("available_quantity", "required_quantity"):
+        df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0).astype(int)
+    return df
+
+# 재고 항목 삽입
+def insert_rows(conn, file_id, df):
+    conn.executemany('''
+        INSERT INTO inventory (part_name, part_number, available_quantity, required_quantity, file_id)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(*row, file_id) for row in df[list(COLUMNS)].itertuples(index=False, name=None)])
+
+# 엑셀 파일을 한 번만 읽어서 원본과 재고 항목을 저장
+def insert_data(file_name, file_data, df=None):
+    if df is None:
+        df = parse_excel(io.BytesIO(file_data))
+    with storage.transaction(DB_PATH) as conn:
+        file_id = conn.execute('''
+            INSERT INTO inventory_files (file_name, digest, uploaded_at)
+            VALUES (?, ?, ?)
+        ''', (file_name, blobs.put(conn, file_data), datetime.now().isoformat(timespec="seconds"))).lastrowid
+        insert_rows(conn, file_id, df)
+        stock_ledger.record(conn, [(file_id, part_number, "adjustment", quantity, None, "엑셀 업로드")
+                                   for part_number, quantity in zip(df["part_number"], df["available_quantity"])],
+                            sync_inventory=False)
+    return file_id, len(df)
+
+# 업로드 작업 저장 (ingest 작업 스레드에서 실행, df는 미리 읽은 재고 항목)
+def store_upload(file_name, file_data, df):
+    _, row_count = insert_data(file_name, file_data, df)
+    return f"항목 {row_count}개"
+
+# 데이터베이스에서 데이터 조회 (업로드한 파일 목록)
 def view_data():
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT id, file_name FROM inventory")
-    data = c.fetchall()
-    conn.close()
-    return data
-
-# 데이터베이스에서 파일 데이터 삭제
+    return storage.query(DB_PATH, "SELECT id, file_name FROM inventory_files ORDER BY id")
+
+# 파일 목록이 읽는 테이블 (이 테이블들의 변경 버전이 목록 캐시의 키)
+LIST_TABLES = ("inventory_files", "inventory")
+
+# 업로드한 파일 수 (버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=4, show_spinner=False)
+def file_count(versions):
+    return storage.query_one(DB_PATH, "SELECT COUNT(*) FROM inventory_files")[0]
+
+# 업로드한 파일 목록 한 페이지 (id, 이름, 크기, 올린 시각, 재고 항목 수), 최근 파일부터
+# 원본은 읽지 않고 원본 저장소의 크기만 함께 조회, 버전이 바뀔 때까지 모든 세션이 같은 결과를 사용
+@st.cache_data(max_entries=16, show_spinner=False)
+def file_page(limit, offset, versions):
+    return storage.query(DB_PATH, '''
+        SELECT f.id, f.file_name, b.size, f.uploaded_at, (SELECT COUNT(*) FROM inventory i WHERE i.file_id = f.id)
+        FROM inventory_files f LEFT JOIN blobs b ON b.digest = f.digest
+        ORDER BY f.id DESC LIMIT ? OFFSET ?
+    ''', (limit, offset))
+
+# 파일이 없는 예전 재고 항목이 있는지 확인
+def has_legacy_rows():
+    return storage.query_one(DB_PATH, "SELECT 1 FROM inventory WHERE file_id IS NULL LIMIT 1") is not None
+
+# 재고 항목 조회 (file_id가 None이면 파일이 없는 예전 항목)
+def load_items(file_id):
+    columns = ", ".join(COLUMNS)
+    if file_id is None:
+        rows = storage.query(DB_PATH, f"SELECT id, {columns} FROM inventory WHERE file_id IS NULL ORDER BY id")
+    else:
+        rows = storage.query(DB_PATH, f"SELECT id, {columns} FROM inventory WHERE file_id = ? ORDER BY id", (file_id,))
+    return pd.DataFrame(rows, columns=["id", *COLUMNS]).set_index("id")
+
+# 재고 항목 (재고 항목 테이블 버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_items(file_id, version):
+    return load_items(file_id)
+
+# 현재 재고 항목 (다른 세션에서 저장한 변경도 바로 반영)
+def current_items(file_id):
+    return cached_items(file_id, storage.table_version(DB_PATH, "inventory"))
+
+# 편집한 값을 저장할 형식으로 변환 (수량은 정수, 이름과 번호는 문자열)
+def convert_value(column, value):
+    value = table_changes.sql_value(value)
+    if column in ("available_quantity", "required_quantity"):
+        value = pd.to_numeric(value, errors="coerce")
+        return 0 if pd.isna(value) else int(value)
+    if column in ("part_name", "part_number"):
+        return "" if value is None else str(value).strip()
+    return value
+
+# 재고 항목 저장 (바뀐 행만 반영하고, 보유 수량 변경은 같은 트랜잭션에서 입출고 장부에 조정으로 기록)
+# original: 편집 전 재고 항목 (index는 행 id)
+def save_items(file_id, changes, original, user=None):
+    defaults = {"part_name": "", "part_number": "", "available_quantity": 0, "required_quantity": 0, "file_id": file_id}
+    with storage.transaction(DB_PATH) as conn:
+        table_changes.apply_changes(conn, "inventory", changes, defaults=defaults, convert=convert_value)
+        stock_ledger.record(conn, stock_ledger.edit_movements(file_id, original, changes, user, convert_value), sync_inventory=False)
+
+# 재고 항목을 엑셀 파일로 내보내기
+def export_excel(file_id):
+    df = load_items(file_id).rename(columns=COLUMNS)
+    output = io.BytesIO()
+    df.to_excel(output, index=False, engine='openpyxl')
+    return output.getvalue()
+
+# 데이터베이스에서 파일 데이터 삭제 (해당 파일의 재고 항목도 삭제)
 def delete_file(file_id):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM inventory WHERE id = ?", (file_id,))
-    conn.commit()
-    conn.close()
+    with storage.transaction(DB_PATH) as conn:
+        conn.execute("DELETE FROM inventory WHERE file_id = ?", (file_id,))
+        stock_ledger.delete_file(conn, file_id)
+        row = conn.execute("DELETE FROM inventory_files WHERE id = ? RETURNING digest", (file_id,)).fetchone()
+        if row:
+            blobs.release(conn, row[0])
+    blobs.collect()
+
+# 재고 목록 하나 표시 (편집, 엑셀 내보내기, 관리자 모드에서는 파일 삭제)
+# file_id가 None이면 파일이 없는 예전 항목
+def show_file(file_id, file_name, is_admin):
+    df = current_items(file_id)
+    editor_name = f"inventory_editor_{file_id}"
+    st.data_editor(table_changes.editor_frame(df), use_container_width=True, num_rows="dynamic", hide_index=True,
+                   column_config={column: label for column, label in COLUMNS.items()},
+                   key=table_changes.editor_key(editor_name))
+
+    if st.button("변경 사항 저장", key=f"inventory_save_{file_id}"):
+        changes = table_changes.editor_changes(editor_name, df)
+        if table_changes.has_changes(changes):
+            save_items(file_id, changes, df)
+            table_changes.reset_editor(editor_name)
+            st.success(f"변경 사항이 저장되었습니다! (수정 {len(changes.updated)}, 추가 {len(changes.added)}, 삭제 {len(changes.deleted)})")
+        else:
+            st.info("변경된 내용이 없습니다.")
+
+    # 엑셀 내보내기 (버튼을 누를 때만 파일 생성)
+    if st.button("엑셀 파일 만들기", key=f"inventory_export_{file_id}"):
+        st.download_button(label="엑셀 다운로드", data=export_excel(file_id), file_name=file_name)
+
+    # 관리자 모드에서 파일 삭제 기능 추가
+    if is_admin and file_id is not None and st.button("파일 삭제", key=f"inventory_delete_{file_id}"):
+        delete_file(file_id)
+        st.success(f"'{file_name}' 파일이 삭제되었습니다. 페이지를 다시 로드하세요.")
 
 # 재고관리 페이지 함수
 def app():
     st.title("재고관리")
 
     # 관리자 모드 체크박스
-    is_admin = st.sidebar.checkbox("관리자 모드 활성화")
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
 
     # 데이터베이스 초기화 옵션 (관리자 전용)
     if is_admin and st.sidebar.button("데이터베이스 초기화"):
         reset_database()
         st.sidebar.success("데이터베이스가 초기화되었습니다.")
 
-    # 테이블 생성
-    create_table()
-
     # 파일 업로드 UI (관리자 모드에서만 가능)
     if is_admin:
         uploaded_file = st.file_uploader("Excel 파일을 업로드하세요", type=["xlsx"])
 
-        # 파일 업로드된 경우 처리
-        if uploaded_file is not None:
-            file_name = uploaded_file.name
-            file_data = uploaded_file.read()
-
-            # 데이터베이스에 저장
-            insert_data(file_name, file_data)
-            st.success(f"'{file_name}' 파일이 성공적으로 저장되었습니다.")
-
-    # 데이터베이스에서 데이터를 조회하고 표시
-    
-    stored_files = view_data()
-
-    if stored_files:
-        for file_id, file_name in stored_files:
-            
-
-            conn = get_connection()
-            c = conn.cursor()
-            c.execute("SELECT file_data FROM inventory WHERE id = ?", (file_id,))
-            file_data = c.fetchone()[0]
-            conn.close()
-
-            if isinstance(file_data, bytes):
-                try:
-                    df = pd.read_excel(io.BytesIO(file_data))
-                  
-                    edited_df = st.data_editor(df, use_container_width=True, num_rows="dynamic")
-
-                    if st.button(f"변경 사항 저장"):
-                        output = io.BytesIO()
-                        edited_df.to_excel(output, index=False, engine='openpyxl')
-                        updated_data = output.getvalue()
-
-                        conn = get_connection()
-                        c = conn.cursor()
-                        c.execute("UPDATE inventory SET file_data = ? WHERE id = ?", (updated_data, file_id))
-                        conn.commit()
-                        conn.close()
-
-                        st.success("변경 사항이 저장되었습니다!")
-
-                    st.download_button(label="엑셀 다운로드", data=file_data, file_name=file_name)
-                except Exception as e:
-                    st.error(f"엑셀 파일 처리 중 오류가 발생했습니다: {e}")
-
-        # 관리자 모드에서 파일 삭제 기능 추가
-        if is_admin:
-            st.subheader("파일 삭제")
-            file_to_delete = st.selectbox("삭제할 파일을 선택하세요", stored_files, format_func=lambda x: x[1])
-            if st.button("선택된 파일 삭제"):
-                delete_file(file_to_delete[0])
-                st.success(f"'{file_to_delete[1]}' 파일이 삭제되었습니다. 페이지를 다시 로드하세요.")
-    else:
+        # 업로드한 파일은 백그라운드에서 읽고 저장 (같은 업로드는 rerun 때 다시 추가하지 않음)
+        if ingest.submit_upload("inventory", uploaded_file):
+            st.success(f"'{uploaded_file.name}' 파일을 저장하는 중입니다.")
+        ingest.show_jobs(["inventory"])
+
+    # 보기 방식 선택 (재고 분석은 전체 파일의 부족, 재주문 항목만 표시)
+    view = st.radio("보기", ("재고 목록", "재고 분석", "입출고"), horizontal=True)
+    if view == "재고 분석":
+        inventory_analytics.show_analytics()
+        return
+    if view == "입출고":
+        choices = list(view_data())
+        if has_legacy_rows():
+            choices.insert(0, (None, "기존 재고 (원본 파일 없음)"))
+        if choices:
+            stock_ledger.show_ledger(choices)
+        else:
+            st.write("저장된 파일이 없습니다.")
+        return
+
+    # 재고 목록 (펼친 파일만 재고 항목을 읽어서 표시)
+    versions = storage.table_versions(DB_PATH, LIST_TABLES)
+    total, legacy = file_count(versions), has_legacy_rows()
+    if not total and not legacy:
         st.write("저장된 파일이 없습니다.")
+        return
+
+    if legacy:
+        with file_list.entry("inventory_file_legacy", "기존 재고 (원본 파일 없음)") as expander:
+            if expander.open:
+                show_file(None, "inventory.xlsx", is_admin)
+    if total:
+        limit, offset = file_list.page_bounds("inventory_list_page", total)
+        for file_id, file_name, size, uploaded_at, item_count in file_page(limit, offset, versions):
+            with file_list.entry(f"inventory_file_{file_id}", file_name, size, uploaded_at, f"항목 {item_count}개") as expander:
+                if expander.open:
+                    show_file(file_id, file_name, is_admin)
 
 # Streamlit 앱 실행
 if __name__ == "__main__":
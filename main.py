@@ -1,67 +1,74 @@
 import streamlit as st
-import datetime
-import pandas as pd
-import numpy as np
+import importlib
+import sys
 import time
-import matplotlib.pyplot as plt
-from PIL import Image
-import sqlite3
-from datetime import date
-from io import BytesIO
-import fitz  # PyMuPDF for PDF processing
-import base64
-import matplotlib.dates as mdates
-import qrcode
+import hashlib
+import pdf_server
+import metrics
+import migrations
 
-import boiler_manual
-import inventory_management
-import troubleshooting
-import boiler_operations
+# 페이지 이름과 해당 모듈 이름
+# 모듈(및 pandas, fitz 등 무거운 의존성)은 페이지가 처음 선택될 때만 불러옴
+PAGES = {
+    "보일러 메뉴얼": "boiler_manual",
+    "재고관리": "inventory_management",
+    "Trouble Shooting": "troubleshooting",
+    "보일러 작업": "boiler_operations",
+    "운전 데이터": "telemetry",
+    "통합 검색": "search",
+    "RAG": "rag",
+}
 
-# 사이드바에서 페이지 선택
-page = st.sidebar.selectbox(
-    "페이지 선택",
-    ("보일러 메뉴얼", "재고관리", "Trouble Shooting", "보일러 작업", "RAG")
-)
+# 페이지별 모듈 로딩 시간 기록 (모든 세션이 공유)
+@st.cache_resource
+def get_import_report():
+    return {}
 
-# 선택된 페이지에 따라 해당 모듈 실행
-if page == "보일러 메뉴얼":
-    boiler_manual.app()
-elif page == "재고관리":
-    inventory_management.app()
-elif page == "Trouble Shooting":
-    troubleshooting.app()
-elif page == "보일러 작업":
-    boiler_operations.app()
-elif page == "RAG":
-    st.title("RAG (Retrieve and Generate)")
-    st.markdown("**RAG 페이지에 오신 것을 환영합니다!**")
-    st.write("여기에서 RAG 관련 링크 및 기능을 확인할 수 있습니다.")
+# 페이지 모듈 불러오기 (처음 한 번만 import, 소요 시간 기록)
+def load_page(module_name):
+    if module_name in sys.modules:
+        return sys.modules[module_name]
 
-    # 링크 버튼 추가
-    RAG_link = st.button("Go to RAG Documentation")
-    GPT_link = st.button("Go to GPT Model")
+    report = get_import_report()
+    modules_before = len(sys.modules)
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    report[module_name] = (elapsed_ms, len(sys.modules) - modules_before)
+    return module
 
-    if RAG_link:
-        st.write("RAG 관련 문서 링크로 이동 중입니다...")
-        st.markdown("[Visit RAG Documentation](https://example.com/rag-docs)")
+# 사이드바에 페이지별 로딩 시간 표시
+def show_import_report():
+    report = get_import_report()
+    with st.sidebar.expander("페이지 로딩 시간"):
+        for page_name, module_name in PAGES.items():
+            if module_name in report:
+                elapsed_ms, module_count = report[module_name]
+                st.write(f"{page_name}: {elapsed_ms:.0f} ms (모듈 {module_count}개)")
+            elif module_name in sys.modules:
+                st.write(f"{page_name}: 다른 페이지와 함께 로딩됨")
+            else:
+                st.write(f"{page_name}: 아직 로딩되지 않음")
 
-    if GPT_link:
-        st.write("GPT 모델 관련 링크로 이동 중입니다...")
-        st.markdown("[Visit GPT Model](https://example.com/gpt)")
+# PDF 파일을 데이터베이스에서 불러와 보여주는 함수 (PDF 서버가 Range 요청으로 전송)
+def load_and_display_pdf_from_db(database_path, file_id):
+    source = hashlib.sha1(database_path.encode()).hexdigest()[:12]
+    pdf_server.register_source(source, database_path, "pdf_files")
+    pdf_server.show_pdf(source, file_id)
 
-# PDF 파일 표시 함수
-def show_pdf(file_data):
-    base64_pdf = base64.b64encode(file_data).decode('utf-8')
-    pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="700" height="1000" type="application/pdf"></iframe>'
-    st.markdown(pdf_display, unsafe_allow_html=True)
+# 이번 rerun의 측정 시작
+metrics.start_run()
 
-# PDF 파일을 데이터베이스에서 불러와 보여주는 함수
-def load_and_display_pdf_from_db(database_path, file_id):
-    conn = sqlite3.connect(database_path)
-    c = conn.cursor()
-    c.execute('SELECT file_data FROM pdf_files WHERE id = ?', (file_id,))
-    pdf_data = c.fetchone()[0]
-    conn.close()
+# 데이터베이스 테이블 생성과 예전 데이터 가져오기 (서버 프로세스에서 처음 한 번만 실행)
+migrations.run_migrations()
+
+# 사이드바에서 페이지 선택
+page = st.sidebar.selectbox("페이지 선택", tuple(PAGES))
+
+# 선택된 페이지의 모듈만 불러와서 실행
+load_page(PAGES[page]).app()
+show_import_report()
 
-    show_pdf(pdf_data)
+# 관리자 모드일 때만 성능 측정 패널 표시
+if st.session_state.get("is_admin"):
+    metrics.show_panel()
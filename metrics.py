@@ -0,0 +1,207 @@
+import os
+import io
+import re
+import json
+import time
+import threading
+from functools import lru_cache, wraps
+
+# 측정 켜기/끄기 (환경 변수 BLR_METRICS=0 이면 끔, 끄면 측정 코드는 플래그 확인 한 번만 실행)
+ENABLED = os.environ.get("BLR_METRICS", "1") != "0"
+
+# 내보내기 파일 위치
+EXPORT_DIR = "blr_app"
+PROMETHEUS_PATH = os.path.join(EXPORT_DIR, "metrics.prom")
+JSONL_PATH = os.path.join(EXPORT_DIR, "metrics.jsonl")
+
+# 패널에 표시할 항목 수
+PANEL_LIMIT = 30
+
+# SQL 문장의 종류와 대상 테이블 찾기
+SQL_PATTERN = re.compile(r"^\s*(\w+)(?:.*?\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+([\w\"]+))?", re.IGNORECASE | re.DOTALL)
+
+# 항목별 누적 값 {이름: [호출 수, 시간(초), 최대 시간(초), 행 수, 바이트 수]} (모든 세션과 스레드가 공유)
+_totals = {}
+_lock = threading.Lock()
+
+# 현재 스레드에서 진행 중인 rerun의 항목별 값 (같은 형식)
+_local = threading.local()
+
+# 측정 켜기/끄기
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+# 측정값 하나 기록 (calls=0이면 호출 수는 늘리지 않고 시간, 행, 바이트만 더함)
+def record(name, seconds, rows=0, size=0, calls=1):
+    with _lock:
+        entry = _totals.get(name)
+        if entry is None:
+            entry = _totals[name] = [0, 0.0, 0.0, 0, 0]
+        add(entry, seconds, rows, size, calls)
+    run = getattr(_local, "run", None)
+    if run is not None:
+        entry = run.get(name)
+        if entry is None:
+            entry = run[name] = [0, 0.0, 0.0, 0, 0]
+        add(entry, seconds, rows, size, calls)
+
+# 누적 값에 더하기
+def add(entry, seconds, rows, size, calls):
+    entry[0] += calls
+    entry[1] += seconds
+    entry[2] = max(entry[2], seconds)
+    entry[3] += rows
+    entry[4] += size
+
+# 시간 측정 (with 문 안에서 rows, size를 채우면 함께 기록)
+class Timer:
+    __slots__ = ("name", "calls", "rows", "size", "start")
+
+    def __init__(self, name, calls=1):
+        self.name = name
+        self.calls = calls
+        self.rows = 0
+        self.size = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start, self.rows, self.size, self.calls)
+        return False
+
+# 측정을 끈 경우 쓰는 빈 타이머 (값을 채워도 기록하지 않음)
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_TIMER = NullTimer()
+
+# 시간 측정 시작 (with metrics.timer("parse excel") as t: ...; t.rows = len(df))
+def timer(name, calls=1):
+    return Timer(name, calls) if ENABLED else NULL_TIMER
+
+# 함수 전체 시간 측정 데코레이터 (첫 인자가 bytes, BytesIO, 파일 경로이면 바이트 수, 결과에 길이가 있으면 행 수로 기록)
+def timed(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with Timer(name) as t:
+                result = function(*args, **kwargs)
+                if args and isinstance(args[0], (bytes, bytearray, memoryview)):
+                    t.size = len(args[0])
+                elif args and isinstance(args[0], io.BytesIO):
+                    t.size = args[0].getbuffer().nbytes
+                elif args and isinstance(args[0], (str, os.PathLike)) and os.path.isfile(args[0]):
+                    t.size = os.path.getsize(args[0])
+                if hasattr(result, "__len__"):
+                    t.rows = len(result)
+            return result
+        return wrapper
+    return decorator
+
+# SQL 문장의 측정 이름 (예: "sql SELECT inventory")
+@lru_cache(maxsize=1024)
+def statement_name(sql):
+    match = SQL_PATTERN.match(sql)
+    if match is None:
+        return "sql"
+    verb, table_name = match.groups()
+    return f"sql {verb.upper()} {table_name.strip(chr(34))}" if table_name else f"sql {verb.upper()}"
+
+# rerun 시작 (이 스레드에서 기록되는 값을 rerun별로 모음)
+def start_run():
+    _local.run = {} if ENABLED else None
+    _local.started = time.perf_counter()
+
+# 현재 rerun의 항목별 값과 경과 시간
+def current_run():
+    return getattr(_local, "run", None) or {}, time.perf_counter() - getattr(_local, "started", time.perf_counter())
+
+# 누적 값 복사본
+def totals():
+    with _lock:
+        return {name: list(entry) for name, entry in _totals.items()}
+
+# 누적 값 초기화
+def reset():
+    with _lock:
+        _totals.clear()
+
+# Prometheus 텍스트 형식으로 변환
+def prometheus_text(snapshot):
+    lines = []
+    for metric, index, kind, help_text in (
+        ("blr_calls_total", 0, "counter", "호출 수"),
+        ("blr_seconds_total", 1, "counter", "누적 시간 (초)"),
+        ("blr_seconds_max", 2, "gauge", "최대 시간 (초)"),
+        ("blr_rows_total", 3, "counter", "행 수"),
+        ("blr_bytes_total", 4, "counter", "바이트 수"),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, entry in sorted(snapshot.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{op="{label}"}} {entry[index]}')
+    return "\n".join(lines) + "\n"
+
+# Prometheus 텍스트 파일로 내보내기 (다른 프로그램이 반쯤 쓴 파일을 읽지 않도록 바꿔치기)
+def export_prometheus(path=PROMETHEUS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(totals()))
+    os.replace(temp_path, path)
+    return path
+
+# JSON Lines 파일에 현재 누적 값 한 줄 추가
+def export_jsonl(path=JSONL_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    snapshot = {name: dict(zip(("calls", "seconds", "max_seconds", "rows", "bytes"), entry)) for name, entry in totals().items()}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"time": time.time(), "metrics": snapshot}, ensure_ascii=False) + "\n")
+    return path
+
+# 서버 전체 측정 켜기/끄기 (패널 버튼 콜백, 확인 체크는 다시 해제)
+def toggle_enabled():
+    import streamlit as st
+
+    set_enabled(not ENABLED)
+    st.session_state["metrics_confirm"] = False
+
+# 관리자용 사이드바 패널 (이번 rerun의 항목별 시간과 내보내기)
+def show_panel():
+    import streamlit as st
+    import pandas as pd
+
+    with st.sidebar.expander("성능 측정", expanded=False):
+        # 공유 연결 풀이 모든 세션에서 같은 설정을 쓰므로 세션별로 나눌 수 없음, 바꿀 때는 확인을 받음
+        st.caption(f"측정은 서버 전체 설정입니다. (현재 {'켜짐' if ENABLED else '꺼짐'}, 모든 사용자에게 적용)")
+        confirmed = st.checkbox("모든 사용자의 측정 설정을 바꿉니다", key="metrics_confirm")
+        st.button("서버 전체 측정 끄기" if ENABLED else "서버 전체 측정 켜기", disabled=not confirmed, on_click=toggle_enabled)
+        run, elapsed = current_run()
+        if not run:
+            st.caption("측정값이 없습니다.")
+        else:
+            df = pd.DataFrame.from_dict(run, orient="index", columns=["호출", "시간(ms)", "최대(ms)", "행", "바이트"])
+            df[["시간(ms)", "최대(ms)"]] *= 1000
+            df = df.sort_values("시간(ms)", ascending=False).head(PANEL_LIMIT)
+            st.caption(f"이번 rerun {elapsed * 1000:.0f} ms 중 측정된 시간 {df['시간(ms)'].sum():.0f} ms")
+            st.dataframe(df.round(1), use_container_width=True)
+        col_prom, col_jsonl = st.columns(2)
+        if col_prom.button("Prometheus"):
+            st.caption(f"{export_prometheus()} 저장")
+        if col_jsonl.button("JSON Lines"):
+            st.caption(f"{export_jsonl()} 저장")
@@ -0,0 +1,493 @@
+import streamlit as st
+import os
+import io
+import logging
+import sqlite3
+from datetime import datetime
+import storage
+
+# 가져오지 못한 예전 데이터를 남기는 서버 로그
+logger = logging.getLogger(__name__)
+
+# 데이터베이스 구조 버전 관리
+# 모든 페이지가 storage.DB_PATH 하나를 사용하고, 테이블 생성과 예전 데이터 변환은 서버가 시작할 때 한 번만 실행
+# 구조를 바꿀 때는 MIGRATIONS 끝에 새 버전을 추가 (이미 배포한 버전의 함수는 고치지 않음)
+
+# 기본 테이블 (페이지별)
+SCHEMA = (
+    # 보일러 메뉴얼: PDF 원본
+    '''CREATE TABLE IF NOT EXISTS pdf_files (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           file_name TEXT,
+           file_data BLOB)''',
+
+    # 보일러 작업: 점검사항 PDF, 점검항목 엑셀 원본과 한 번 읽어 둔 행 데이터
+    '''CREATE TABLE IF NOT EXISTS inspection_items (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           file_name TEXT,
+           file_data BLOB)''',
+    '''CREATE TABLE IF NOT EXISTS inspection_notes (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           file_name TEXT,
+           file_data BLOB,
+           columns TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS inspection_note_rows (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           note_id INTEGER,
+           row_no INTEGER,
+           data TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_inspection_note_rows_note ON inspection_note_rows (note_id, row_no)",
+
+    # 점검사항 표 추출 결과
+    # pdf_table_pages: 표를 추출한 페이지 (페이지 내용의 해시, 표가 없는 페이지도 기록)
+    # pdf_table_cells: 페이지 해시별 칸 내용 (같은 내용의 페이지는 한 번만 추출하고 저장)
+    # inspection_item_pages: 점검사항 파일의 페이지별 해시
+    '''CREATE TABLE IF NOT EXISTS pdf_table_pages (
+           digest TEXT PRIMARY KEY,
+           table_count INTEGER) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS pdf_table_cells (
+           digest TEXT,
+           table_no INTEGER,
+           row_no INTEGER,
+           col_no INTEGER,
+           text TEXT,
+           PRIMARY KEY (digest, table_no, row_no, col_no)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS inspection_item_pages (
+           file_id INTEGER,
+           page_no INTEGER,
+           digest TEXT,
+           PRIMARY KEY (file_id, page_no)) WITHOUT ROWID''',
+    "CREATE INDEX IF NOT EXISTS idx_inspection_item_pages_digest ON inspection_item_pages (digest)",
+
+    # 점검 기록
+    # inspection_records: 점검항목 행마다 점검한 날짜, 작업자, 측정값, 비고
+    # inspection_intervals: 점검항목 행별 점검 주기 (없으면 기본값)
+    '''CREATE TABLE IF NOT EXISTS inspection_records (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           note_id INTEGER,
+           row_id INTEGER,
+           done_on TEXT,
+           operator TEXT,
+           value TEXT,
+           remark TEXT,
+           recorded_at TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_inspection_records_item ON inspection_records (row_id, done_on)",
+    "CREATE INDEX IF NOT EXISTS idx_inspection_records_note ON inspection_records (note_id, done_on)",
+    '''CREATE TABLE IF NOT EXISTS inspection_intervals (
+           row_id INTEGER PRIMARY KEY,
+           note_id INTEGER,
+           interval_days INTEGER) WITHOUT ROWID''',
+
+    # 재고관리: 업로드한 엑셀 원본과 엑셀에서 읽은 재고 항목 (행 단위)
+    '''CREATE TABLE IF NOT EXISTS inventory_files (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           file_name TEXT,
+           file_data BLOB,
+           uploaded_at TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS inventory (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           part_name TEXT,
+           part_number TEXT,
+           available_quantity INTEGER,
+           required_quantity INTEGER,
+           file_id INTEGER)''',
+    "CREATE INDEX IF NOT EXISTS idx_inventory_part_number ON inventory (part_number)",
+    "CREATE INDEX IF NOT EXISTS idx_inventory_file ON inventory (file_id, part_number)",
+
+    # 입출고 장부
+    # stock_movements: 입출고 기록 (추가만 함), stock_snapshot: 파일·부품별 현재 재고 (재고 항목 수량의 부품별 합계)
+    # stock_checkpoints/stock_checkpoint_items: 일정 건수마다 저장한 재고 (과거 시점 재고 계산용)
+    '''CREATE TABLE IF NOT EXISTS stock_movements (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           file_id INTEGER NOT NULL,
+           part_number TEXT NOT NULL,
+           kind TEXT NOT NULL,
+           quantity INTEGER NOT NULL,
+           moved_at TEXT NOT NULL,
+           user TEXT,
+           note TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_time ON stock_movements (moved_at)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_part ON stock_movements (file_id, part_number, moved_at)",
+    '''CREATE TABLE IF NOT EXISTS stock_snapshot (
+           file_id INTEGER NOT NULL,
+           part_number TEXT NOT NULL,
+           quantity INTEGER NOT NULL,
+           last_movement_id INTEGER,
+           PRIMARY KEY (file_id, part_number)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS stock_checkpoints (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           last_movement_id INTEGER,
+           created_at TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS stock_checkpoint_items (
+           checkpoint_id INTEGER,
+           file_id INTEGER,
+           part_number TEXT,
+           quantity INTEGER,
+           PRIMARY KEY (checkpoint_id, file_id, part_number)) WITHOUT ROWID''',
+
+    # Trouble Shooting: 표마다 테이블을 만들지 않고 두 테이블에 저장
+    # ts_sections: 장비/항목별 표 (이름, 열 순서, 변경 버전)
+    # ts_entries: 표의 각 칸 (표 id, 행 번호, 열 이름, 값), 빈 칸은 저장하지 않음
+    '''CREATE TABLE IF NOT EXISTS ts_sections (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           name TEXT UNIQUE,
+           columns TEXT,
+           version INTEGER DEFAULT 0)''',
+    '''CREATE TABLE IF NOT EXISTS ts_entries (
+           section_id INTEGER REFERENCES ts_sections (id) ON DELETE CASCADE,
+           row_no INTEGER,
+           column_name TEXT,
+           value TEXT,
+           PRIMARY KEY (section_id, row_no, column_name)) WITHOUT ROWID''',
+    # 열 이름으로 모든 표를 한 번에 찾기 위한 인덱스 (예: 모든 장비의 '원인')
+    "CREATE INDEX IF NOT EXISTS idx_ts_entries_column ON ts_entries (column_name, section_id)",
+
+    # 통합 검색: 색인할 문서 (검색용 FTS5 테이블은 create_search_tables에서 생성)
+    '''CREATE TABLE IF NOT EXISTS search_documents (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           source TEXT,
+           ref TEXT,
+           title TEXT,
+           page INTEGER,
+           body TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_search_documents_ref ON search_documents (source, ref)",
+
+    # 업로드 작업 목록
+    '''CREATE TABLE IF NOT EXISTS ingest_jobs (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           kind TEXT,
+           file_name TEXT,
+           digest TEXT,
+           status TEXT,
+           progress REAL,
+           message TEXT,
+           created_at TEXT,
+           finished_at TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_ingest_jobs_kind ON ingest_jobs (kind, id)",
+
+    # 운전 데이터: 신호 목록 (측정값은 신호 id별 폴더의 날짜별 파일)
+    '''CREATE TABLE IF NOT EXISTS signals (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           name TEXT UNIQUE,
+           unit TEXT,
+           setpoint REAL)''',
+
+    # 이상 감지
+    # anomaly_rules: 신호별 운전 범위, z-score 기준, 관련 Troubleshooting 표
+    # anomaly_alerts: 경보 (조건이 시작된 시각마다 하나)
+    '''CREATE TABLE IF NOT EXISTS anomaly_rules (
+           signal_id INTEGER PRIMARY KEY,
+           low REAL,
+           high REAL,
+           z_limit REAL,
+           section TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS anomaly_alerts (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           signal_id INTEGER,
+           t INTEGER,
+           kind TEXT,
+           value REAL,
+           score REAL,
+           section TEXT)''',
+    "CREATE INDEX IF NOT EXISTS idx_anomaly_alerts_signal ON anomaly_alerts (signal_id, t)",
+    "CREATE INDEX IF NOT EXISTS idx_anomaly_alerts_time ON anomaly_alerts (t)",
+)
+
+# 검색 색인 테이블 (이름, 토크나이저)
+# search_words: 단어 단위 색인 (영문 단어, 띄어쓰기 단위 한글, 접두어 검색)
+# search_trigrams: 3글자 단위 색인 (한글 복합어 중간 부분, "분출압력" 안의 "출압력" 등)
+SEARCH_INDEXES = (("search_words", "unicode61 remove_diacritics 2"), ("search_trigrams", "trigram"))
+
+# 변경 버전을 추적하는 테이블 (캐시 키에 사용)
+TRACKED_TABLES = ("inventory",)
+
+# 6에서 추가로 추적하는 테이블 (모든 세션이 공유하는 파일 목록과 표 캐시)
+CACHED_TABLES = ("pdf_files", "inspection_items", "inspection_item_pages", "inspection_notes", "inspection_note_rows",
+                 "inventory_files", "ts_sections")
+
+# 파일 원본 저장소 (blobs.py)
+BLOBS_TABLE = '''CREATE TABLE IF NOT EXISTS blobs (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   digest TEXT UNIQUE,
+                   size INTEGER,
+                   codec TEXT,
+                   refcount INTEGER,
+                   data BLOB)'''
+
+# 원본 파일을 저장하는 페이지 테이블
+FILE_TABLES = ("pdf_files", "inspection_items", "inspection_notes", "inventory_files")
+
+# 버전 적용 후 할 일 (버전 트랜잭션 밖에서 실행): 검색 색인 다시 만들기, 빈 공간 정리
+REINDEX = "reindex"
+VACUUM = "vacuum"
+
+# 적용한 버전 목록 테이블 생성
+def create_version_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                 (version INTEGER PRIMARY KEY,
+                  name TEXT,
+                  applied_at TEXT)''')
+
+# 현재 데이터베이스 버전 (아무것도 적용하지 않았으면 0)
+def current_version(db_path=storage.DB_PATH):
+    with storage.connection(db_path) as conn:
+        create_version_table(conn)
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+# 1: 기본 테이블 생성
+def create_schema(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+    create_search_tables(conn)
+    for table_name in TRACKED_TABLES:
+        storage.track_changes(conn, table_name)
+
+# 검색 색인 FTS5 테이블과 문서 테이블을 따라가는 트리거 생성
+def create_search_tables(conn):
+    for table_name, tokenizer in SEARCH_INDEXES:
+        conn.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {table_name}
+                         USING fts5(title, body, content='search_documents', content_rowid='id', tokenize='{tokenizer}')''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table_name}_insert AFTER INSERT ON search_documents BEGIN
+                             INSERT INTO {table_name} (rowid, title, body) VALUES (new.id, new.title, new.body);
+                         END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table_name}_delete AFTER DELETE ON search_documents BEGIN
+                             INSERT INTO {table_name} ({table_name}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+                         END''')
+
+# 예전 데이터베이스 파일의 테이블 목록 (만든 순서)
+def legacy_tables(legacy):
+    return [row[0] for row in legacy.execute('''
+        SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'sqlite_sequence' ORDER BY rowid
+    ''')]
+
+# 테이블의 열 이름 목록
+def table_columns(conn, table_name):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+
+# 예전 파일의 테이블 행을 같은 이름의 열만 골라 복사 (keep_ids=False이면 id를 새로 매김)
+def copy_rows(conn, legacy, source, target=None, keep_ids=True):
+    target = target or source
+    existing = set(table_columns(conn, target))
+    columns = [column for column in table_columns(legacy, source) if column in existing and (keep_ids or column != "id")]
+    names = ", ".join(f'"{column}"' for column in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    conn.executemany(f'INSERT OR IGNORE INTO "{target}" ({names}) VALUES ({placeholders})',
+                     legacy.execute(f'SELECT {names} FROM "{source}"'))
+
+# 예전 파일에 있는 테이블만 복사
+def copy_tables(conn, legacy, table_names):
+    tables = set(legacy_tables(legacy))
+    for table_name in table_names:
+        if table_name in tables:
+            copy_rows(conn, legacy, table_name)
+
+# 보일러 메뉴얼 PDF
+def import_manuals(conn, legacy):
+    copy_tables(conn, legacy, ["pdf_files"])
+
+# 점검사항과 점검항목 (텍스트 블록으로 저장하던 점검사항 표는 표 추출 결과로 변환)
+def import_inspection(conn, legacy):
+    import pdf_tables
+    import inspection_records
+
+    tables = legacy_tables(legacy)
+    if "inspection_items" in tables and "file_data" not in table_columns(legacy, "inspection_items"):
+        pdf_tables.migrate_legacy_rows(conn, legacy.execute("SELECT table_name, data FROM inspection_items ORDER BY id").fetchall())
+    else:
+        copy_tables(conn, legacy, ["inspection_items"])
+    copy_tables(conn, legacy, ["inspection_notes", "inspection_note_rows", "pdf_table_pages", "pdf_table_cells",
+                               "inspection_item_pages", "inspection_records", "inspection_intervals"])
+    # 점검 기록이 생기기 전의 파일은 엑셀의 'date' 열을 점검 기록으로 옮김
+    if "inspection_records" not in tables:
+        inspection_records.migrate_date_column(conn)
+
+# Trouble Shooting 표 (Word 표마다 테이블을 만들던 형식은 표 하나씩 변환)
+def import_troubleshooting(conn, legacy):
+    import troubleshooting
+
+    tables = legacy_tables(legacy)
+    if "ts_sections" in tables:
+        copy_tables(conn, legacy, ["ts_sections", "ts_entries"])
+    else:
+        troubleshooting.import_legacy_tables(conn, legacy, tables)
+
+# 재고 항목과 입출고 장부
+# 엑셀 파일을 통째로 저장하던 형식은 원본으로 옮기고 다시 읽음, 같은 파일에 있던 예전 Trouble Shooting 표도 가져옴
+def import_inventory(conn, legacy):
+    import zipfile
+    from openpyxl.utils.exceptions import InvalidFileException
+    import inventory_management
+    import troubleshooting
+
+    tables = legacy_tables(legacy)
+    if "inventory" in tables and "file_data" in table_columns(legacy, "inventory"):
+        copy_rows(conn, legacy, "inventory", "inventory_files")
+        for file_id, file_name, file_data in conn.execute("SELECT id, file_name, file_data FROM inventory_files").fetchall():
+            try:
+                df = inventory_management.parse_excel(io.BytesIO(file_data))
+            except (ValueError, zipfile.BadZipFile, InvalidFileException) as e:
+                # 읽을 수 없는 파일은 원본만 보관하고 서버 로그에 남김 (목록에는 항목 없이 표시됨)
+                logger.warning("재고 파일 '%s'(id %s)을 읽지 못해 원본만 보관합니다: %s", file_name, file_id, e)
+                continue
+            inventory_management.insert_rows(conn, file_id, df)
+    else:
+        copy_tables(conn, legacy, ["inventory_files", "inventory"])
+    copy_tables(conn, legacy, ["stock_movements", "stock_snapshot", "stock_checkpoints", "stock_checkpoint_items"])
+    if "troubleshooting" in tables:
+        troubleshooting.import_legacy_tables(conn, legacy, ["troubleshooting"])
+
+# 운전 데이터 신호와 경보 (측정값 파일 폴더가 신호 id를 쓰므로 id를 그대로 유지)
+def import_telemetry(conn, legacy):
+    copy_tables(conn, legacy, ["signals", "anomaly_rules", "anomaly_alerts"])
+
+# 업로드 작업 기록
+def import_ingest(conn, legacy):
+    copy_tables(conn, legacy, ["ingest_jobs"])
+
+# 예전 위치의 메뉴얼 PDF (같은 이름과 내용의 파일이 이미 있으면 건너뜀)
+def import_extra_manuals(conn, legacy):
+    for file_name, file_data in legacy.execute("SELECT file_name, file_data FROM pdf_files ORDER BY id"):
+        if conn.execute("SELECT 1 FROM pdf_files WHERE file_name = ? AND file_data = ?", (file_name, file_data)).fetchone() is None:
+            conn.execute("INSERT INTO pdf_files (file_name, file_data) VALUES (?, ?)", (file_name, file_data))
+
+# 예전 위치의 재고 항목 (원본 파일이 없는 재고 목록 하나로 추가)
+def import_extra_inventory(conn, legacy):
+    if legacy.execute("SELECT 1 FROM inventory LIMIT 1").fetchone() is None:
+        return
+    file_id = conn.execute("INSERT INTO inventory_files (file_name, file_data, uploaded_at) VALUES (?, NULL, NULL)",
+                           (f"{os.path.basename(legacy_path(legacy))} (예전 재고)",)).lastrowid
+    conn.executemany('''INSERT INTO inventory (part_name, part_number, available_quantity, required_quantity, file_id)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     [(*row, file_id) for row in legacy.execute('''
+                         SELECT part_name, part_number, available_quantity, required_quantity FROM inventory ORDER BY id
+                     ''')])
+
+# 어느 페이지에서도 쓰지 않는 예전 파일은 테이블을 legacy_<파일>_<테이블> 이름으로 그대로 보관 (빈 테이블은 건너뜀)
+def import_archive(conn, legacy):
+    prefix = os.path.splitext(os.path.basename(legacy_path(legacy)))[0]
+    for table_name in legacy_tables(legacy):
+        if legacy.execute(f'SELECT 1 FROM "{table_name}" LIMIT 1').fetchone() is None:
+            continue
+        columns = table_columns(legacy, table_name)
+        names = ", ".join(f'"{column}"' for column in columns)
+        target = f"legacy_{prefix}_{table_name}"
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{target}" ({names})')
+        conn.executemany(f'INSERT INTO "{target}" ({names}) VALUES ({", ".join("?" for _ in columns)})',
+                         legacy.execute(f'SELECT {names} FROM "{table_name}"'))
+
+# 예전 데이터베이스 파일 경로
+def legacy_path(legacy):
+    return legacy.execute("PRAGMA database_list").fetchone()[2]
+
+# 2: 예전 데이터베이스 파일 가져오기 (원래 파일은 읽기 전용으로 열고 그대로 둠)
+# 먼저 가져오는 파일의 id를 유지하므로 페이지별 현재 파일을 앞에 둠
+def import_legacy_files(conn):
+    import stock_ledger
+
+    imported = False
+    for path, importer in LEGACY_FILES:
+        if not os.path.exists(path):
+            continue
+        legacy = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+        try:
+            importer(conn, legacy)
+        finally:
+            legacy.close()
+        imported = True
+
+    # 장부가 생기기 전의 재고 항목은 조정 기록으로 옮김
+    stock_ledger.record_opening_balances(conn)
+    return (REINDEX,) if imported else ()
+
+# 3: 보일러 상태값 표에서 신호 등록, 규칙이 없는 신호에 기본 경보 규칙 추가
+def seed_signals(conn):
+    import telemetry
+    import anomaly
+
+    if conn.execute("SELECT 1 FROM signals LIMIT 1").fetchone() is None and os.path.exists(telemetry.STATE_TABLE_PATH):
+        conn.executemany("INSERT OR IGNORE INTO signals (name, unit, setpoint) VALUES (?, ?, ?)", telemetry.read_state_table())
+    anomaly.add_default_rules(conn)
+
+# 4: 파일 원본을 공유 저장소로 옮기고 페이지 테이블에는 내용 해시만 남김 (같은 내용의 파일은 한 번만 저장)
+def move_files_to_blob_store(conn):
+    import blobs
+
+    conn.execute(BLOBS_TABLE)
+    for table_name in FILE_TABLES:
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN digest TEXT")
+        row_ids = [row[0] for row in conn.execute(f"SELECT id FROM {table_name} WHERE file_data IS NOT NULL")]
+        for row_id in row_ids:  # 파일 하나씩 읽어서 메모리 사용을 줄임
+            file_data = conn.execute(f"SELECT file_data FROM {table_name} WHERE id = ?", (row_id,)).fetchone()[0]
+            conn.execute(f"UPDATE {table_name} SET digest = ? WHERE id = ?", (blobs.put(conn, file_data), row_id))
+        conn.execute(f"ALTER TABLE {table_name} DROP COLUMN file_data")
+    return (VACUUM,)
+
+# 5: 점검사항, 점검항목 파일에 올린 시각 추가 (파일 목록에 표시, 예전 파일은 비워 둠)
+def add_upload_times(conn):
+    for table_name in ("inspection_items", "inspection_notes"):
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN uploaded_at TEXT")
+
+# 6: 공유 캐시가 읽는 테이블의 변경 버전 추적 (어느 경로로 쓰든 트리거가 버전을 올림)
+def track_cached_tables(conn):
+    for table_name in CACHED_TABLES:
+        storage.track_changes(conn, table_name)
+
+# 7: 검색 문서의 변경 버전 추적 (RAG 색인이 어느 버전의 문서로 만들어졌는지 비교)
+def track_search_documents(conn):
+    storage.track_changes(conn, "search_documents")
+
+# 예전 데이터베이스 파일 (경로, 가져오는 함수)
+LEGACY_FILES = (
+    ("/tmp/pdf_files.db", import_manuals),
+    (os.path.join(storage.DB_DIR, "boiler_operations.db"), import_inspection),
+    (os.path.join(storage.DB_DIR, "troubleshooting.db"), import_troubleshooting),
+    (os.path.join(storage.DB_DIR, "inventory.db"), import_inventory),
+    (os.path.join(storage.DB_DIR, "telemetry.db"), import_telemetry),
+    (os.path.join(storage.DB_DIR, "ingest.db"), import_ingest),
+    ("pdf_files.db", import_extra_manuals),
+    ("inventory.db", import_extra_inventory),
+    ("boiler_operations.db", import_archive),
+    ("database.db", import_archive),
+    ("weather_data.db", import_archive),
+    ("data.db", import_archive),
+)
+
+# 버전 목록 (버전, 이름, 함수), 함수는 적용 후 할 일 목록을 반환할 수 있음
+MIGRATIONS = (
+    (1, "기본 테이블", create_schema),
+    (2, "예전 데이터베이스 파일 가져오기", import_legacy_files),
+    (3, "보일러 상태값 신호 등록", seed_signals),
+    (4, "파일 원본 공유 저장소", move_files_to_blob_store),
+    (5, "파일 올린 시각", add_upload_times),
+    (6, "공유 캐시 변경 버전", track_cached_tables),
+    (7, "검색 문서 변경 버전", track_search_documents),
+)
+
+# 아직 적용하지 않은 버전을 순서대로 적용 (버전마다 한 트랜잭션, 적용한 버전 목록 반환)
+def migrate(db_path=storage.DB_PATH):
+    applied, after = [], set()
+    if current_version(db_path) >= MIGRATIONS[-1][0]:
+        return applied
+    for version, name, function in MIGRATIONS:
+        with storage.transaction(db_path) as conn:
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                continue  # 다른 프로세스가 먼저 적용함
+            after.update(function(conn) or ())
+            conn.execute("INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                         (version, name, datetime.now().isoformat(timespec="seconds")))
+        applied.append(version)
+
+    # 색인은 문서를 저장한 뒤 페이지 모듈로 다시 만듦 (각자 트랜잭션을 사용하므로 버전 트랜잭션 밖에서 실행)
+    if REINDEX in after:
+        import search
+        search.rebuild_index()
+    # 파일 원본을 옮기고 남은 빈 공간을 돌려받음 (트랜잭션 안에서는 실행할 수 없음)
+    if VACUUM in after:
+        with storage.connection(db_path) as conn:
+            conn.execute("VACUUM")
+    return applied
+
+# 서버 프로세스에서 한 번만 적용 (모든 세션이 공유)
+@st.cache_resource(show_spinner="데이터베이스 준비 중...")
+def run_migrations():
+    return migrate()
@@ -0,0 +1,189 @@
+import streamlit as st
+import os
+import threading
+from collections import OrderedDict
+import fitz  # PyMuPDF for PDF rendering
+import metrics
+import blobs
+import pdf_server
+
+# 렌더링한 페이지 이미지 캐시 위치와 크기 제한
+CACHE_DIR = os.path.join("blr_app", "page_cache")
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+
+# 동시에 열어 둘 PDF 문서 수
+OPEN_DOCUMENTS = 4
+
+# 선택 가능한 해상도와 썸네일 설정
+DPI_OPTIONS = (72, 100, 150, 200)
+THUMBNAIL_DPI = 20
+THUMBNAIL_COUNT = 8
+
+# 크기 제한이 있는 LRU 메모리 캐시 (키 -> PNG 데이터)
+class MemoryPageCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, png):
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            self._items[key] = png
+            self.size += len(png)
+            while self.size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+# 크기 제한이 있는 디스크 캐시 (오래 쓰지 않은 파일부터 삭제)
+class DiskPageCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        for folder in os.scandir(self.directory):
+            if folder.is_dir():
+                yield from (entry for entry in os.scandir(folder.path) if entry.name.endswith(".png"))
+
+    def _path(self, key):
+        digest, page_no, dpi = key
+        return os.path.join(self.directory, digest[:2], f"{digest}_{page_no}_{dpi}.png")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            os.utime(path)  # 최근 사용 시간 갱신
+            return png
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, png):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(png)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.size += len(png)
+            if self.size > self.max_bytes:
+                self._prune()
+
+    def _prune(self):
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            self.size -= entry.stat().st_size
+            os.remove(entry.path)
+
+# 열어 둔 PDF 문서 (해시 -> fitz 문서, MuPDF는 스레드에 안전하지 않으므로 잠금 사용)
+class DocumentCache:
+    def __init__(self, max_documents):
+        self.max_documents = max_documents
+        self.lock = threading.Lock()
+        self._documents = OrderedDict()
+
+    def open(self, digest, open_document):
+        if digest in self._documents:
+            self._documents.move_to_end(digest)
+            return self._documents[digest]
+        with metrics.timer("parse pdf open"):
+            document = open_document()
+        self._documents[digest] = document
+        while len(self._documents) > self.max_documents:
+            _, closed = self._documents.popitem(last=False)
+            closed.close()
+        return document
+
+# 모든 세션이 공유하는 캐시
+@st.cache_resource
+def get_caches():
+    return (
+        MemoryPageCache(MEMORY_CACHE_BYTES),
+        DiskPageCache(CACHE_DIR, DISK_CACHE_BYTES),
+        DocumentCache(OPEN_DOCUMENTS),
+    )
+
+# 저장된 PDF의 내용 해시 (캐시 키로 사용)
+def document_digest(source, file_id):
+    return pdf_server.pdf_digest(source, file_id)
+
+# 저장된 PDF 열기 (디스크에 둔 큰 파일은 경로로 열어서 MuPDF가 필요한 부분만 읽음)
+def open_pdf(source, file_id, digest):
+    path = blobs.local_path(digest, pdf_server.SOURCES[source][0])
+    if path is not None:
+        return fitz.open(path, filetype="pdf")
+    return fitz.open(stream=pdf_server.load_pdf_data(source, file_id), filetype="pdf")
+
+# 페이지 수 조회
+def page_count(source, file_id):
+    digest = document_digest(source, file_id)
+    _, _, documents = get_caches()
+    with documents.lock:
+        return documents.open(digest, lambda: open_pdf(source, file_id, digest)).page_count
+
+# 페이지 하나를 PNG로 렌더링 (메모리 -> 디스크 -> 렌더링 순서로 확인)
+def render_page(source, file_id, page_no, dpi):
+    key = (document_digest(source, file_id), page_no, dpi)
+    memory, disk, documents = get_caches()
+
+    png = memory.get(key)
+    if png is not None:
+        return png
+    png = disk.get(key)
+    if png is None:
+        with documents.lock, metrics.timer("render pdf page") as t:
+            document = documents.open(key[0], lambda: open_pdf(source, file_id, key[0]))
+            png = document[page_no].get_pixmap(dpi=dpi).tobytes("png")
+            t.size = len(png)
+        disk.put(key, png)
+    memory.put(key, png)
+    return png
+
+# 썸네일을 누르면 해당 페이지로 이동
+def go_to_page(state_key, page_no):
+    st.session_state[state_key] = page_no
+
+# 페이지 이미지 뷰어 (보고 있는 페이지와 주변 썸네일만 렌더링)
+# 다른 세션에서 파일을 삭제했으면 해시가 없으므로 렌더링하지 않고 오류 표시
+def show_viewer(source, file_id, key):
+    if document_digest(source, file_id) is None:
+        st.error("PDF 데이터를 불러오는 데 실패했습니다. 파일이 삭제되었을 수 있습니다.")
+        return
+    total_pages = page_count(source, file_id)
+    if total_pages == 0:
+        st.error("PDF에 표시할 페이지가 없습니다. 파일이 손상되었을 수 있습니다.")
+        return
+    page_key = f"{key}_page_{file_id}"
+
+    col_page, col_dpi = st.columns(2)
+    page_no = col_page.number_input(f"페이지 (전체 {total_pages})", min_value=1, max_value=total_pages, step=1, key=page_key)
+    dpi = col_dpi.selectbox("해상도 (DPI)", DPI_OPTIONS, index=1, key=f"{key}_dpi_{file_id}")
+
+    # 썸네일 목록 (현재 페이지 주변)
+    first = max(1, min(page_no - THUMBNAIL_COUNT // 2, total_pages - THUMBNAIL_COUNT + 1))
+    thumbnails = range(first, min(first + THUMBNAIL_COUNT, total_pages + 1))
+    for column, thumb_no in zip(st.columns(THUMBNAIL_COUNT), thumbnails):
+        column.image(render_page(source, file_id, thumb_no - 1, THUMBNAIL_DPI), use_container_width=True)
+        column.button(f"{thumb_no}", key=f"{key}_thumb_{file_id}_{thumb_no}", on_click=go_to_page, args=(page_key, thumb_no),
+                      type="primary" if thumb_no == page_no else "secondary")
+
+    st.image(render_page(source, file_id, page_no - 1, dpi), caption=f"{page_no} / {total_pages}")
@@ -0,0 +1,179 @@
+import streamlit as st
+import os
+import re
+import sqlite3
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, urlsplit, parse_qs
+import storage
+import metrics
+import blobs
+
+# PDF 서버 설정 (환경 변수로 변경 가능)
+# 인증이 없으므로 기본값은 이 컴퓨터에서만 접속, 다른 컴퓨터의 브라우저에서 볼 때만 PDF_SERVER_HOST를 바꿈
+HOST = os.environ.get("PDF_SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("PDF_SERVER_PORT", "8502"))
+PUBLIC_URL = os.environ.get("PDF_SERVER_URL", "")
+
+# 한 번에 읽어서 보내는 크기
+CHUNK_SIZE = 64 * 1024
+
+# 브라우저 캐시 유지 시간 (저장된 PDF는 id가 바뀌지 않는 한 내용이 바뀌지 않음)
+CACHE_CONTROL = "private, max-age=86400"
+
+# 제공할 PDF 저장 위치 (이름 -> (데이터베이스 경로, 테이블 이름))
+SOURCES = {}
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# PDF가 저장된 테이블 등록
+def register_source(name, db_path, table_name):
+    SOURCES[name] = (db_path, table_name)
+
+# 단일 범위 Range 헤더인지 확인 (여러 범위 요청 등은 전체 파일로 응답)
+def is_single_range(header):
+    match = RANGE_PATTERN.match(header.strip())
+    return bool(match) and match.groups() != ("", "")
+
+# Range 헤더 해석 (만족할 수 없는 범위면 None)
+def parse_range(header, size):
+    start, end = RANGE_PATTERN.match(header.strip()).groups()
+    if start == "":
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+# PDF 요청 처리기 (/pdf/<저장 위치>/<id>)
+class PdfRequestHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.handle_pdf(send_body=False)
+
+    def do_GET(self):
+        self.handle_pdf(send_body=True)
+
+    def handle_pdf(self, send_body):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "pdf" or parts[1] not in SOURCES or not parts[2].isdigit():
+            self.send_error(404)
+            return
+        db_path, table_name = SOURCES[parts[1]]
+        file_id = int(parts[2])
+
+        row = storage.query_one(db_path, f'''SELECT t.file_name, b.size, t.digest FROM {table_name} t
+                                              JOIN blobs b ON b.digest = t.digest WHERE t.id = ?''', (file_id,))
+        if row is None:
+            self.send_error(404)
+            return
+        file_name, size, digest = row
+        etag = f'"{digest}"'  # 내용 해시가 곧 원본의 버전
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", CACHE_CONTROL)
+            self.end_headers()
+            return
+
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if not range_header or not is_single_range(range_header) or (if_range and if_range != etag):
+            range_header = None
+            start, end = 0, size - 1
+        else:
+            byte_range = parse_range(range_header, size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            start, end = byte_range
+
+        chunks = blobs.iter_range(digest, start, end, CHUNK_SIZE, db_path)
+        if chunks is None:
+            self.send_error(404)  # 조회한 뒤에 다른 세션에서 삭제됨
+            return
+
+        disposition = "attachment" if "download" in parse_qs(url.query) else "inline"
+        self.send_response(206 if range_header else 200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Content-Disposition", f"{disposition}; filename*=UTF-8''{quote(file_name)}")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", CACHE_CONTROL)
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        if send_body and end >= start:  # 빈 파일은 헤더만 보냄
+            with metrics.timer("blob read pdf_server") as t:
+                try:
+                    for chunk in chunks:
+                        self.wfile.write(chunk)
+                except (OSError, sqlite3.Error):
+                    self.close_connection = True  # 보내는 중에 브라우저가 연결을 끊었거나 원본이 삭제됨
+                    return
+                t.size = end - start + 1
+
+    # 요청마다 로그를 남기지 않음
+    def log_message(self, format, *args):
+        pass
+
+# PDF 서버 시작 (프로세스당 한 번, 포트를 쓸 수 없으면 None)
+@st.cache_resource
+def start_server():
+    try:
+        server = ThreadingHTTPServer((HOST, PORT), PdfRequestHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# 브라우저에서 접근할 PDF 서버 주소
+def public_url():
+    if PUBLIC_URL:
+        return PUBLIC_URL.rstrip("/")
+    host = st.context.headers.get("Host") or "localhost"
+    return f"http://{urlsplit('//' + host).hostname}:{PORT}"
+
+# 저장된 PDF의 주소
+def pdf_url(source, file_id, download=False):
+    url = f"{public_url()}/pdf/{source}/{file_id}"
+    return url + "?download=1" if download else url
+
+# 저장된 PDF의 내용 해시 (없으면 None)
+def pdf_digest(source, file_id):
+    db_path, table_name = SOURCES[source]
+    row = storage.query_one(db_path, f"SELECT digest FROM {table_name} WHERE id = ?", (file_id,))
+    return row[0] if row else None
+
+# 서버를 쓸 수 없을 때 PDF 데이터 직접 읽기
+def load_pdf_data(source, file_id):
+    digest = pdf_digest(source, file_id)
+    return None if digest is None else blobs.read(digest, SOURCES[source][0])
+
+# PDF 보기 (브라우저가 Range 요청으로 필요한 부분만 받아감)
+def show_pdf(source, file_id, width=700, height=1000):
+    with metrics.timer("payload pdf iframe") as t:
+        if start_server() is not None:
+            src = pdf_url(source, file_id)
+        else:
+            base64_pdf = base64.b64encode(load_pdf_data(source, file_id)).decode('utf-8')
+            src = f"data:application/pdf;base64,{base64_pdf}"
+        pdf_display = f'<iframe src="{src}" width="{width}" height="{height}" type="application/pdf"></iframe>'
+        t.size = len(pdf_display)
+    st.markdown(pdf_display, unsafe_allow_html=True)
+
+# PDF 다운로드 버튼
+def download_button(source, file_id, file_name, label="PDF 다운로드"):
+    if start_server() is not None:
+        st.link_button(label, pdf_url(source, file_id, download=True))
+    else:
+        st.download_button(label=label, data=load_pdf_data(source, file_id), file_name=file_name)
@@ -0,0 +1,184 @@
+import streamlit as st
+import ast
+import hashlib
+import fitz  # PyMuPDF for PDF table extraction
+import pandas as pd
+import storage
+import metrics
+import search
+
+# 점검사항 PDF와 같은 데이터베이스에 표 추출 결과 저장 (테이블은 migrations.py에서 생성)
+DB_PATH = storage.DB_PATH
+
+# 예전 형식(텍스트 블록 튜플)으로 저장된 표의 파일 번호
+LEGACY_FILE_ID = 0
+
+# 예전 형식 변환 시 같은 열로 보는 x 좌표 차이와 같은 행으로 보는 y 겹침 (pt)
+COLUMN_TOLERANCE = 5.0
+ROW_OVERLAP = 2.0
+
+# 페이지 내용 해시 (페이지 크기와 내용 스트림이 같으면 같은 페이지로 봄)
+def page_digest(page):
+    digest = hashlib.sha256(repr(tuple(page.rect)).encode())
+    digest.update(page.read_contents())
+    return digest.hexdigest()
+
+# 페이지의 표를 (표 번호, 행 번호, 열 번호, 텍스트) 목록으로 추출 (빈 칸은 제외)
+def extract_page_tables(page):
+    cells = []
+    for table_no, table in enumerate(page.find_tables().tables):
+        for row_no, row in enumerate(table.extract()):
+            cells.extend((table_no, row_no, col_no, text.strip()) for col_no, text in enumerate(row) if text and text.strip())
+    return cells
+
+# 이미 추출한 모든 페이지 해시 (parse_pdf에 넘김, ingest에서는 작업 스레드가 조회)
+def stored_digests():
+    return {row[0] for row in storage.query(DB_PATH, "SELECT digest FROM pdf_table_pages")}
+
+# 문서에서 skip에 없는 페이지 해시의 표만 추출 (같은 해시의 페이지는 한 번만)
+def extract_tables(document, digests, skip):
+    tables = {}
+    for page, digest in zip(document, digests):
+        if digest not in skip and digest not in tables:
+            tables[digest] = extract_page_tables(page)
+    return tables
+
+# PDF 읽기 (ingest 프로세스 풀에서 실행, file: 파일 경로 또는 읽기용 파일 객체, known: 이미 추출한 페이지 해시)
+# 데이터베이스에 접속하지 않고 페이지 텍스트(검색 색인용), 페이지 해시, 처음 보는 페이지의 표만 추출한 결과 반환
+@metrics.timed("parse pdf tables")
+def parse_pdf(file, known):
+    with search.open_pdf_file(file) as document:
+        pages = [page.get_text() for page in document]
+        digests = [page_digest(page) for page in document]
+        tables = extract_tables(document, digests, known)
+    return {"pages": pages, "digests": digests, "tables": tables}
+
+# 페이지 해시별 추출 결과 저장 (이미 있는 페이지는 건너뜀)
+def store_cells(conn, tables):
+    for digest, cells in tables.items():
+        if conn.execute("INSERT OR IGNORE INTO pdf_table_pages (digest, table_count) VALUES (?, ?)",
+                        (digest, len({cell[0] for cell in cells}))).rowcount:
+            conn.executemany("INSERT INTO pdf_table_cells (digest, table_no, row_no, col_no, text) VALUES (?, ?, ?, ?, ?)",
+                             [(digest, *cell) for cell in cells])
+
+# 추출 결과가 저장되어 있지 않은 페이지 해시
+def missing_digests(conn, digests):
+    digests = set(digests)
+    if not digests:
+        return set()
+    placeholders = ", ".join("?" for _ in digests)
+    rows = conn.execute(f"SELECT digest FROM pdf_table_pages WHERE digest IN ({placeholders})", tuple(digests))
+    return digests - {row[0] for row in rows}
+
+# 파일의 표 저장 (같은 연결의 트랜잭션 안에서 호출, digests는 페이지 순서대로의 해시, file은 원본 PDF 파일 객체)
+# 읽을 때 이미 있어서 건너뛴 페이지가 그사이 다른 파일 삭제로 지워졌으면 쓰기 잠금을 잡은 이 트랜잭션 안에서 다시 추출
+def store_tables(conn, file_id, digests, tables, file):
+    store_cells(conn, tables)
+    missing = missing_digests(conn, digests)
+    if missing:
+        file.seek(0)
+        with search.open_pdf_file(file) as document:
+            store_cells(conn, extract_tables(document, digests, set(digests) - missing))
+    conn.execute("DELETE FROM inspection_item_pages WHERE file_id = ?", (file_id,))
+    conn.executemany("INSERT INTO inspection_item_pages (file_id, page_no, digest) VALUES (?, ?, ?)",
+                     [(file_id, page_no, digest) for page_no, digest in enumerate(digests)])
+
+# 파일의 표 삭제 (다른 파일이 쓰지 않는 페이지의 추출 결과도 삭제)
+def delete_tables(conn, file_id):
+    digests = [row[0] for row in conn.execute("SELECT DISTINCT digest FROM inspection_item_pages WHERE file_id = ?", (file_id,))]
+    conn.execute("DELETE FROM inspection_item_pages WHERE file_id = ?", (file_id,))
+    for digest in digests:
+        if conn.execute("SELECT 1 FROM inspection_item_pages WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+            conn.execute("DELETE FROM pdf_table_cells WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM pdf_table_pages WHERE digest = ?", (digest,))
+
+# 텍스트 블록 (x0, y0, x1, y1, 텍스트, ...)을 행과 열로 정리
+# 세로로 겹치는 블록은 같은 행, 왼쪽 x 좌표가 가까운 블록은 같은 열 (같은 칸의 블록은 위에서부터 이어 붙임)
+def blocks_to_cells(blocks):
+    lefts = []
+    for x0 in sorted(block[0] for block in blocks):
+        if not lefts or x0 - lefts[-1] > COLUMN_TOLERANCE:
+            lefts.append(x0)
+
+    cells, row_no, row_bottom = {}, -1, None
+    for x0, y0, x1, y1, text in sorted((block[:5] for block in blocks), key=lambda block: (block[1], block[0])):
+        if row_bottom is None or y0 > row_bottom - ROW_OVERLAP:
+            row_no += 1
+            row_bottom = y1
+        row_bottom = max(row_bottom, y1)
+        col_no = max(col for col, left in enumerate(lefts) if left <= x0 + COLUMN_TOLERANCE)
+        text = " ".join(text.split())
+        if text:
+            cells[(row_no, col_no)] = f"{cells[(row_no, col_no)]} {text}" if (row_no, col_no) in cells else text
+    return [(0, row_no, col_no, text) for (row_no, col_no), text in sorted(cells.items())]
+
+# 예전 형식의 점검사항 표 변환 ("Page N Table" 이름과 텍스트 블록 튜플 문자열)
+# 변환한 표는 파일 번호 0으로 저장, 반환값은 변환한 페이지 수
+def migrate_legacy_rows(conn, rows):
+    pages = {}
+    for table_name, data in rows:
+        pages.setdefault(table_name, []).append(ast.literal_eval(data))
+    for table_name, blocks in pages.items():
+        digest = "legacy-" + hashlib.sha256(repr(blocks).encode()).hexdigest()
+        store_cells(conn, {digest: blocks_to_cells(blocks)})
+        conn.execute("INSERT OR REPLACE INTO inspection_item_pages (file_id, page_no, digest) VALUES (?, ?, ?)",
+                     (LEGACY_FILE_ID, legacy_page_no(table_name), digest))
+    return len(pages)
+
+# "Page N Table" 이름의 페이지 번호 (0부터)
+def legacy_page_no(table_name):
+    digits = "".join(ch for ch in table_name if ch.isdigit())
+    return int(digits) - 1 if digits else 0
+
+# 페이지 하나의 표 목록 [(표 번호, 표)] (페이지 해시가 같으면 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=256, show_spinner=False)
+def page_frames(digest):
+    rows = storage.query(DB_PATH, "SELECT table_no, row_no, col_no, text FROM pdf_table_cells WHERE digest = ?", (digest,))
+    df = pd.DataFrame(rows, columns=["table_no", "row_no", "col_no", "text"])
+    frames = []
+    for table_no, cells in df.groupby("table_no"):
+        grid = cells.pivot(index="row_no", columns="col_no", values="text")
+        grid = grid.reindex(index=range(grid.index.max() + 1), columns=range(grid.columns.max() + 1)).fillna("")
+        frames.append((int(table_no), grid))
+    return frames
+
+# 파일의 모든 표 [(페이지 번호, 표 번호, 표)]
+def file_frames(file_id):
+    pages = storage.query(DB_PATH, "SELECT page_no, digest FROM inspection_item_pages WHERE file_id = ? ORDER BY page_no", (file_id,))
+    return [(page_no, table_no, grid) for page_no, digest in pages for table_no, grid in page_frames(digest)]
+
+# 파일의 칸 목록 (페이지, 표, 행, 열, 텍스트)
+def file_records(file_id):
+    rows = storage.query(DB_PATH, '''
+        SELECT p.page_no, c.table_no, c.row_no, c.col_no, c.text
+        FROM inspection_item_pages p JOIN pdf_table_cells c ON c.digest = p.digest
+        WHERE p.file_id = ? ORDER BY p.page_no, c.table_no, c.row_no, c.col_no
+    ''', (file_id,))
+    return pd.DataFrame(rows, columns=["page", "table", "row", "col", "text"])
+
+# 모든 파일의 표에서 텍스트가 들어간 칸 찾기 (파일 번호, 페이지, 표, 행, 열, 텍스트)
+def find_cells(text):
+    return storage.query(DB_PATH, '''
+        SELECT p.file_id, p.page_no, c.table_no, c.row_no, c.col_no, c.text
+        FROM pdf_table_cells c JOIN inspection_item_pages p ON p.digest = c.digest
+        WHERE c.text LIKE ? ORDER BY p.file_id, p.page_no, c.table_no, c.row_no, c.col_no
+    ''', (f"%{text}%",))
+
+# 표 목록 표시
+def show_frames(frames):
+    for page_no, table_no, grid in frames:
+        st.caption(f"{page_no + 1}쪽 · 표 {table_no + 1}")
+        st.dataframe(grid, hide_index=True, use_container_width=True)
+
+# 파일의 표 표시 (페이지별로 펼쳐 볼 수 있음)
+# 파일 목록 항목처럼 이미 펼친 영역 안에서는 expander를 겹칠 수 없으므로 토글로 표시
+def show_tables(file_id, label="추출한 표", nested=False):
+    frames = file_frames(file_id)
+    if not frames:
+        return
+    if nested:
+        if st.toggle(f"{label} ({len(frames)}개)", key=f"tables_{file_id}"):
+            show_frames(frames)
+        return
+    with st.expander(f"{label} ({len(frames)}개)"):
+        show_frames(frames)
@@ -0,0 +1,200 @@
+import streamlit as st
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import zlib
+import numpy as np
+import storage
+import search
+
+# 검색 색인 파일 위치
+INDEX_DIR = os.path.join("blr_app", "rag_index")
+
+# 문단 나누기 설정 (글자 수)
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 80
+
+# 글자 n-gram 길이 (한글은 띄어쓰기만으로 단어를 나누기 어려움)
+NGRAM_SIZES = (2, 3)
+
+# BM25 설정
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 검색 결과 개수 기본값
+DEFAULT_TOP_K = 5
+
+# 검색 대상 이름
+SOURCE_LABELS = search.SOURCE_LABELS
+
+# 텍스트를 겹치는 문단으로 나누기
+def chunk_text(text):
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) <= CHUNK_SIZE:
+        return [text] if text else []
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+    return [text[start:start + CHUNK_SIZE] for start in range(0, len(text) - CHUNK_OVERLAP, step)]
+
+# 텍스트의 글자 n-gram 해시 목록 (단어 앞뒤에 공백을 붙여 단어 경계도 반영)
+def ngram_hashes(text):
+    hashes = []
+    for word in text.lower().split():
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            hashes.extend(zlib.crc32(padded[i:i + n].encode()) for i in range(len(padded) - n + 1))
+    return np.array(hashes, dtype=np.uint32)
+
+# 검색 색인의 문서에서 문단 목록 만들기
+def load_passages():
+    rows = storage.query(search.DB_PATH, "SELECT source, title, page, body FROM search_documents ORDER BY id")
+    passages = []
+    for source, title, page, body in rows:
+        for text in chunk_text(body):
+            passages.append({"source": source, "title": title, "page": page, "text": text})
+    return passages
+
+# BM25 역색인 만들기 (용어별로 정렬된 문단 번호와 가중치 배열)
+def build_arrays(passages):
+    term_parts, doc_parts, tf_parts = [], [], []
+    doc_lengths = np.zeros(len(passages), dtype=np.float32)
+    for doc_id, passage in enumerate(passages):
+        terms, counts = np.unique(ngram_hashes(passage["text"]), return_counts=True)
+        term_parts.append(terms)
+        doc_parts.append(np.full(len(terms), doc_id, dtype=np.int32))
+        tf_parts.append(counts.astype(np.float32))
+        doc_lengths[doc_id] = counts.sum()
+
+    terms = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.uint32)
+    docs = np.concatenate(doc_parts) if doc_parts else np.zeros(0, dtype=np.int32)
+    tfs = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.float32)
+
+    order = np.lexsort((docs, terms))
+    terms, docs, tfs = terms[order], docs[order], tfs[order]
+    vocab, starts, doc_freq = np.unique(terms, return_index=True, return_counts=True)
+
+    # 문단마다 BM25 가중치를 미리 계산해서 검색 시에는 더하기만 하도록 함
+    idf = np.log1p((len(passages) - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+    average_length = doc_lengths.mean() if len(passages) else 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[docs] / average_length)
+    weights = np.repeat(idf, doc_freq) * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+    pointers = np.append(starts, len(terms)).astype(np.int64)
+    return {"vocab": vocab, "pointers": pointers, "docs": docs, "weights": weights.astype(np.float32)}
+
+# 검색 문서의 변경 버전 (색인을 만든 뒤 문서가 바뀌었는지 비교)
+def corpus_version():
+    return storage.table_version(search.DB_PATH, "search_documents")
+
+# 색인을 만들어 디스크에 저장 (세션마다 다른 임시 폴더에 쓴 뒤 교체)
+def build_index():
+    # 문서를 읽기 전의 버전을 저장 (읽는 동안 바뀌면 다음 확인에서 오래된 색인으로 표시됨)
+    version = corpus_version()
+    passages = load_passages()
+    arrays = build_arrays(passages)
+
+    parent_dir = os.path.dirname(INDEX_DIR)
+    os.makedirs(parent_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix="rag_index.", dir=parent_dir)
+    old_dir = tempfile.mkdtemp(prefix="rag_index.old.", dir=parent_dir)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_dir, f"{name}.npy"), array)
+        with open(os.path.join(temp_dir, "passages.json"), "w", encoding="utf-8") as f:
+            json.dump(passages, f, ensure_ascii=False)
+        with open(os.path.join(temp_dir, "corpus_version.json"), "w", encoding="utf-8") as f:
+            json.dump(version, f)
+
+        # 빈 old_dir 자리로 기존 색인을 옮긴 뒤 새 색인으로 교체
+        if os.path.exists(INDEX_DIR):
+            os.replace(INDEX_DIR, old_dir)
+        os.replace(temp_dir, INDEX_DIR)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return len(passages)
+
+# 색인을 만들 때의 검색 문서 버전 (버전 파일이 없는 예전 색인은 None)
+def indexed_corpus_version():
+    path = os.path.join(INDEX_DIR, "corpus_version.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# 색인 파일이 바뀐 시각 (캐시 키로 사용)
+def index_version():
+    path = os.path.join(INDEX_DIR, "passages.json")
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+# 디스크의 색인을 메모리 매핑으로 불러오기 (색인이 바뀌면 다시 불러옴)
+@st.cache_resource(max_entries=1)
+def load_index(version):
+    if version is None:
+        return None
+    arrays = {name: np.load(os.path.join(INDEX_DIR, f"{name}.npy"), mmap_mode="r")
+              for name in ("vocab", "pointers", "docs", "weights")}
+    with open(os.path.join(INDEX_DIR, "passages.json"), encoding="utf-8") as f:
+        arrays["passages"] = json.load(f)
+    return arrays
+
+# 질문과 가장 관련 있는 문단 top-k 검색 (점수, 문단) 목록
+def retrieve(question, top_k=DEFAULT_TOP_K):
+    index = load_index(index_version())
+    if index is None or not index["passages"]:
+        return []
+
+    query_terms = np.unique(ngram_hashes(question))
+    vocab = index["vocab"]
+    positions = np.minimum(np.searchsorted(vocab, query_terms), len(vocab) - 1)
+    positions = positions[vocab[positions] == query_terms]
+    if len(positions) == 0:
+        return []
+
+    pointers = index["pointers"]
+    postings = [np.arange(pointers[p], pointers[p + 1]) for p in positions]
+    postings = np.concatenate(postings)
+    scores = np.bincount(index["docs"][postings], weights=index["weights"][postings], minlength=len(index["passages"]))
+
+    top_k = min(top_k, len(scores))
+    best = np.argpartition(-scores, top_k - 1)[:top_k]
+    best = best[np.argsort(-scores[best])]
+    return [(float(scores[i]), index["passages"][i]) for i in best if scores[i] > 0]
+
+# RAG 페이지 함수
+def app():
+    st.title("RAG (Retrieve and Generate)")
+    st.write("메뉴얼, 점검 문서, Troubleshooting 표에서 질문과 관련된 문단을 찾습니다. (오프라인 검색)")
+
+    # 관리자 모드 체크박스
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
+    if is_admin and st.sidebar.button("검색 색인 만들기"):
+        search.rebuild_index()
+        passage_count = build_index()
+        st.sidebar.success(f"문단 {passage_count}개로 색인을 만들었습니다.")
+
+    if index_version() is None:
+        st.info("검색 색인이 없습니다. 관리자 모드에서 검색 색인을 만드세요.")
+        return
+    if indexed_corpus_version() != corpus_version():
+        st.warning("색인을 만든 뒤 문서가 추가, 수정 또는 삭제되었습니다. 검색 결과에 최근 변경이 빠져 있을 수 있으니 관리자 모드에서 검색 색인을 다시 만드세요.")
+
+    question = st.text_input("질문을 입력하세요 (예: 버너 점화 실패 원인)")
+    top_k = st.slider("결과 개수", min_value=1, max_value=20, value=DEFAULT_TOP_K)
+
+    if question:
+        start = time.perf_counter()
+        results = retrieve(question, top_k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.caption(f"검색 결과 {len(results)}건 ({elapsed_ms:.1f} ms)")
+
+        for score, passage in results:
+            location = search.location_label(passage["source"], passage["page"])
+            st.markdown(f"**[{SOURCE_LABELS.get(passage['source'], passage['source'])}] {passage['title']}** · {location} · 점수 {score:.2f}")
+            st.write(passage["text"])
+
+# Streamlit 앱 실행
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,179 @@
+import streamlit as st
+import io
+import os
+import time
+import fitz  # PyMuPDF for PDF text extraction
+import storage
+import metrics
+
+# 검색 색인 데이터베이스 경로 설정 (색인 테이블과 트리거는 migrations.py에서 생성)
+DB_PATH = storage.DB_PATH
+
+# 검색 대상 이름
+SOURCE_LABELS = {
+    "manual": "보일러 메뉴얼",
+    "inspection": "점검사항",
+    "notes": "점검항목",
+    "troubleshooting": "Trouble Shooting",
+}
+
+# 검색 결과 최대 개수
+RESULT_LIMIT = 50
+
+# 색인 항목 교체 (같은 문서의 기존 항목은 삭제)
+def replace_entries(source, ref, entries):
+    with storage.transaction(DB_PATH) as conn:
+        conn.execute("DELETE FROM search_documents WHERE source = ? AND ref = ?", (source, str(ref)))
+        conn.executemany('''INSERT INTO search_documents (source, ref, title, page, body)
+                            VALUES (?, ?, ?, ?, ?)''',
+                         [(source, str(ref), title, page, body) for title, page, body in entries if body.strip()])
+
+# 문서 색인 삭제
+def remove_document(source, ref):
+    storage.execute(DB_PATH, "DELETE FROM search_documents WHERE source = ? AND ref = ?", (source, str(ref)))
+
+# PDF 파일 열기 (file: 파일 경로 또는 읽기용 파일 객체, 경로는 MuPDF가 필요한 부분만 읽음)
+def open_pdf_file(file):
+    if isinstance(file, (str, os.PathLike)):
+        return fitz.open(file, filetype="pdf")
+    return fitz.open(stream=file.read(), filetype="pdf")
+
+# PDF 페이지별 텍스트 추출
+@metrics.timed("parse pdf text")
+def extract_pdf_pages(file):
+    with open_pdf_file(file) as document:
+        return [page.get_text() for page in document]
+
+# 표의 텍스트 추출 (행마다 "열: 값" 형태)
+def frame_text(df):
+    import pandas as pd  # 엑셀 색인할 때만 불러옴 (메뉴얼 페이지 로딩 시간 단축)
+
+    lines = []
+    for row in df.itertuples(index=False):
+        cells = [f"{column}: {value}" for column, value in zip(df.columns, row) if pd.notna(value) and str(value).strip()]
+        if cells:
+            lines.append(", ".join(cells))
+    return "\n".join(lines)
+
+# PDF 문서 색인 (이미 추출한 페이지 텍스트가 있으면 그대로 사용)
+def index_pdf(source, file_id, file_name, file_data, pages=None):
+    if pages is None:
+        pages = extract_pdf_pages(io.BytesIO(file_data))
+    replace_entries(source, file_id, [(file_name, page_no, text) for page_no, text in enumerate(pages, start=1)])
+
+# 이미 읽어 둔 표 색인 (시트마다 항목 하나)
+def index_frames(source, file_id, file_name, frames):
+    replace_entries(source, file_id, [(file_name, sheet_no, frame_text(df)) for sheet_no, df in enumerate(frames, start=1)])
+
+# Troubleshooting 표의 색인 항목 (행마다 항목 하나)
+def table_entries(table_name, headers, rows):
+    entries = []
+    for row_no, row in enumerate(rows, start=1):
+        body = "\n".join(f"{header}: {value}" for header, value in zip(headers, row) if value)
+        entries.append((table_name, row_no, body))
+    return entries
+
+# Troubleshooting 표 색인
+def index_table(table_name, headers, rows):
+    replace_entries("troubleshooting", table_name, table_entries(table_name, headers, rows))
+
+# Troubleshooting 표 전체 색인 (한 번의 트랜잭션으로 교체)
+def index_tables(tables):
+    with storage.transaction(DB_PATH) as conn:
+        conn.execute("DELETE FROM search_documents WHERE source = 'troubleshooting'")
+        for table_name, headers, rows in tables:
+            conn.executemany('''INSERT INTO search_documents (source, ref, title, page, body)
+                                VALUES ('troubleshooting', ?, ?, ?, ?)''',
+                             [(table_name, title, page, body) for title, page, body in table_entries(table_name, headers, rows) if body.strip()])
+
+# 검색 결과 위치 표시 (PDF는 쪽, 엑셀은 시트, 표는 행)
+def location_label(source, page):
+    if source == "troubleshooting":
+        return f"{page}행"
+    if source == "notes":
+        return f"{page}번째 시트"
+    return f"{page}쪽"
+
+# 검색어를 FTS5 구문으로 변환 (각 단어를 따옴표로 묶어 특수 문자를 무시)
+def quote_terms(terms, prefix=False):
+    suffix = "*" if prefix else ""
+    return " AND ".join('"' + term.replace('"', '""') + '"' + suffix for term in terms)
+
+# 검색 (점수 순으로 정렬된 결과와 강조 표시된 일부 내용 반환)
+# 3글자 이상 단어만 있으면 trigram 색인, 짧은 단어가 있으면 단어 색인으로 찾고,
+# 결과가 없으면 trigram 색인에서 부분 문자열로 다시 찾음
+def search(text, sources=None, limit=RESULT_LIMIT):
+    terms = text.split()
+    if not terms:
+        return []
+
+    source_filter = ""
+    params = []
+    if sources:
+        source_filter = f"AND d.source IN ({', '.join('?' for _ in sources)})"
+        params = list(sources)
+
+    def run(table_name, condition, condition_params, order):
+        sql = f'''SELECT d.source, d.ref, d.title, d.page,
+                         snippet({table_name}, 1, '**', '**', '…', 16)
+                  FROM {table_name} JOIN search_documents d ON d.id = {table_name}.rowid
+                  WHERE {condition} {source_filter}
+                  ORDER BY {order} LIMIT ?'''
+        return storage.query(DB_PATH, sql, condition_params + params + [limit])
+
+    if all(len(term) >= 3 for term in terms):
+        return run("search_trigrams", "search_trigrams MATCH ?", [quote_terms(terms)], "bm25(search_trigrams)")
+
+    results = run("search_words", "search_words MATCH ?", [quote_terms(terms, prefix=True)], "bm25(search_words)")
+    if results:
+        return results
+    condition = " AND ".join("search_trigrams.body LIKE ?" for _ in terms)
+    return run("search_trigrams", condition, [f"%{term}%" for term in terms], "d.id")
+
+# 저장된 모든 문서의 색인 다시 만들기
+def rebuild_index():
+    import boiler_manual
+    import boiler_operations
+    import troubleshooting
+
+    storage.execute(DB_PATH, "DELETE FROM search_documents")
+
+    for file_id, file_name in boiler_manual.load_pdf_list_from_db():
+        index_pdf("manual", file_id, file_name, boiler_manual.load_pdf_data_from_db(file_id))
+
+    for table_name in boiler_operations.SEARCH_SOURCES:
+        for file_id, file_name in boiler_operations.list_files(table_name):
+            try:
+                boiler_operations.index_file(table_name, file_id, file_name, boiler_operations.load_file_data(table_name, file_id))
+            except (ValueError, RuntimeError):
+                pass  # 형식이 맞지 않는 파일은 건너뜀
+    for section_id, name in troubleshooting.list_sections():
+        troubleshooting.index_section(section_id, name)
+
+# 통합 검색 페이지 함수
+def app():
+    st.title("통합 검색")
+
+    # 관리자 모드 체크박스
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
+    if is_admin and st.sidebar.button("색인 다시 만들기"):
+        rebuild_index()
+        st.sidebar.success("검색 색인을 다시 만들었습니다.")
+
+    text = st.text_input("검색어를 입력하세요 (예: Safety Valve 분출압력)")
+    sources = st.multiselect("검색 대상", list(SOURCE_LABELS), default=list(SOURCE_LABELS), format_func=SOURCE_LABELS.get)
+
+    if text:
+        start = time.perf_counter()
+        results = search(text, sources)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.caption(f"검색 결과 {len(results)}건 ({elapsed_ms:.1f} ms)")
+
+        for source, ref, title, page, snippet in results:
+            location = location_label(source, page)
+            st.markdown(f"**[{SOURCE_LABELS.get(source, source)}] {title}** · {location}")
+            st.markdown(snippet.replace("\n", " "))
+
+# Streamlit 앱 실행
+if __name__ == "__main__":
+    app()
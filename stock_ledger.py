@@ -0,0 +1,204 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
+import storage
+
+# 데이터베이스 파일 경로 (inventory_management와 같은 파일, 서로 불러오지 않도록 storage에서 가져옴)
+DB_PATH = storage.DB_PATH
+
+# 입출고 종류 (수량은 재고 증감: 입고 +, 출고 -, 조정 +/-)
+KINDS = {"receipt": "입고", "issue": "출고", "adjustment": "조정"}
+
+# 체크포인트 간격 (입출고 건수)
+CHECKPOINT_INTERVAL = 500
+
+# 입출고 기록 표시 개수
+HISTORY_LIMIT = 50
+
+# 파일 없는 예전 재고 항목의 파일 번호 (기본키에는 NULL을 쓸 수 없음)
+LEGACY_FILE_ID = 0
+
+# 장부가 생기기 전의 재고 항목을 처음 한 번 조정 기록으로 옮김 (예전 데이터베이스를 가져올 때 호출)
+def record_opening_balances(conn):
+    if conn.execute("SELECT 1 FROM stock_movements LIMIT 1").fetchone() is None:
+        rows = conn.execute("SELECT file_id, part_number, available_quantity FROM inventory").fetchall()
+        record(conn, [(file_id, part_number, "adjustment", quantity or 0, None, "기존 재고")
+                      for file_id, part_number, quantity in rows], sync_inventory=False)
+
+# 장부 비우기 (재고 데이터베이스 초기화)
+def clear_tables(conn):
+    for table_name in ("stock_movements", "stock_snapshot", "stock_checkpoints", "stock_checkpoint_items"):
+        conn.execute(f"DELETE FROM {table_name}")
+
+# 장부의 파일 번호 (예전 재고 항목은 0)
+def ledger_file_id(file_id):
+    return LEGACY_FILE_ID if file_id is None else file_id
+
+# 입출고 기록 추가 (기록, 현재 재고, 재고 항목 수량을 같은 트랜잭션에서 갱신)
+# movements: (file_id, part_number, kind, 증감 수량, 작업자, 메모) 목록
+# sync_inventory: 재고 항목의 보유 수량을 현재 재고로 맞출지 여부 (편집기에서 이미 저장한 경우 False)
+def record(conn, movements, sync_inventory=True):
+    movements = [(ledger_file_id(file_id), part_number, kind, int(quantity), user, note)
+                 for file_id, part_number, kind, quantity, user, note in movements if part_number]
+    if not movements:
+        return
+
+    moved_at = datetime.now().isoformat(timespec="seconds")
+    conn.executemany('''
+        INSERT INTO stock_movements (file_id, part_number, kind, quantity, moved_at, user, note)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(file_id, part_number, kind, quantity, moved_at, user, note)
+          for file_id, part_number, kind, quantity, user, note in movements])
+    last_id = conn.execute("SELECT MAX(id) FROM stock_movements").fetchone()[0]
+
+    # 부품별 증감 합계만 현재 재고에 더함
+    deltas = {}
+    for file_id, part_number, _, quantity, _, _ in movements:
+        deltas[(file_id, part_number)] = deltas.get((file_id, part_number), 0) + quantity
+    conn.executemany('''
+        INSERT INTO stock_snapshot (file_id, part_number, quantity, last_movement_id) VALUES (?, ?, ?, ?)
+        ON CONFLICT (file_id, part_number)
+        DO UPDATE SET quantity = quantity + excluded.quantity, last_movement_id = excluded.last_movement_id
+    ''', [(file_id, part_number, delta, last_id) for (file_id, part_number), delta in deltas.items()])
+
+    # 같은 부품 번호의 행이 여러 개일 수 있으므로 증감은 첫 번째 행에만 반영 (행 수량 합계 = 현재 재고)
+    if sync_inventory:
+        conn.executemany('''
+            UPDATE inventory SET available_quantity = available_quantity + ?
+            WHERE id = (SELECT MIN(id) FROM inventory WHERE file_id IS ? AND part_number = ?)
+        ''', [(delta, None if file_id == LEGACY_FILE_ID else file_id, part_number) for (file_id, part_number), delta in deltas.items()])
+
+    last_checkpoint = conn.execute("SELECT COALESCE(MAX(last_movement_id), 0) FROM stock_checkpoints").fetchone()[0]
+    if last_id - last_checkpoint >= CHECKPOINT_INTERVAL:
+        checkpoint(conn, last_id)
+
+# 현재 재고를 체크포인트로 저장
+def checkpoint(conn, last_id):
+    checkpoint_id = conn.execute("INSERT INTO stock_checkpoints (last_movement_id, created_at) VALUES (?, ?)",
+                                 (last_id, datetime.now().isoformat(timespec="seconds"))).lastrowid
+    conn.execute('''
+        INSERT INTO stock_checkpoint_items (checkpoint_id, file_id, part_number, quantity)
+        SELECT ?, file_id, part_number, quantity FROM stock_snapshot
+    ''', (checkpoint_id,))
+
+# 재고 항목 편집 내용을 입출고 기록으로 변환 (보유 수량 변경, 추가, 삭제는 조정으로 기록)
+# original: 편집 전 재고 항목 (index는 행 id), convert: 편집한 값을 저장할 형식으로 바꾸는 함수
+def edit_movements(file_id, original, changes, user, convert):
+    movements = []
+    for key, values in changes.updated.items():
+        old_number, old_quantity = original.at[key, "part_number"], int(original.at[key, "available_quantity"])
+        new_number = convert("part_number", values["part_number"]) if "part_number" in values else old_number
+        new_quantity = convert("available_quantity", values["available_quantity"]) if "available_quantity" in values else old_quantity
+        if new_number != old_number:
+            movements.append((file_id, old_number, "adjustment", -old_quantity, user, "부품 번호 변경"))
+            movements.append((file_id, new_number, "adjustment", new_quantity, user, "부품 번호 변경"))
+        elif new_quantity != old_quantity:
+            movements.append((file_id, new_number, "adjustment", new_quantity - old_quantity, user, "재고 항목 수정"))
+    for values in changes.added:
+        quantity = convert("available_quantity", values.get("available_quantity", 0))
+        movements.append((file_id, convert("part_number", values.get("part_number", "")), "adjustment", quantity, user, "재고 항목 추가"))
+    for key in changes.deleted:
+        movements.append((file_id, original.at[key, "part_number"], "adjustment",
+                          -int(original.at[key, "available_quantity"]), user, "재고 항목 삭제"))
+    return movements
+
+# 파일의 장부 삭제 (파일 삭제 시)
+def delete_file(conn, file_id):
+    conn.execute("DELETE FROM stock_movements WHERE file_id = ?", (file_id,))
+    conn.execute("DELETE FROM stock_snapshot WHERE file_id = ?", (file_id,))
+    conn.execute("DELETE FROM stock_checkpoint_items WHERE file_id = ?", (file_id,))
+
+# 현재 재고 (기본키로 바로 조회)
+def current_stock(file_id, part_number):
+    row = storage.query_one(DB_PATH, "SELECT quantity FROM stock_snapshot WHERE file_id = ? AND part_number = ?",
+                            (ledger_file_id(file_id), part_number))
+    return row[0] if row else 0
+
+# 과거 시점의 재고 (그 전의 마지막 체크포인트 + 이후 입출고 합계)
+def stock_as_of(file_id, part_number, when):
+    file_id = ledger_file_id(file_id)
+    with storage.connection(DB_PATH) as conn:
+        base = conn.execute('''
+            SELECT c.last_movement_id, COALESCE(i.quantity, 0)
+            FROM stock_checkpoints c
+            LEFT JOIN stock_checkpoint_items i ON i.checkpoint_id = c.id AND i.file_id = ? AND i.part_number = ?
+            WHERE c.created_at <= ? ORDER BY c.id DESC LIMIT 1
+        ''', (file_id, part_number, when)).fetchone() or (0, 0)
+        delta = conn.execute('''
+            SELECT COALESCE(SUM(quantity), 0) FROM stock_movements
+            WHERE file_id = ? AND part_number = ? AND moved_at <= ? AND id > ?
+        ''', (file_id, part_number, when, base[0])).fetchone()[0]
+    return base[1] + delta
+
+# 기간별 출고 수량 (예: 지난 분기 사용량)
+def consumption(start, end):
+    rows = storage.query(DB_PATH, '''
+        SELECT m.part_number, COALESCE(f.file_name, '기존 재고'), -SUM(m.quantity), COUNT(*)
+        FROM stock_movements m LEFT JOIN inventory_files f ON f.id = m.file_id
+        WHERE m.kind = 'issue' AND m.moved_at >= ? AND m.moved_at < ?
+        GROUP BY m.file_id, m.part_number ORDER BY 3 DESC
+    ''', (start, end))
+    return pd.DataFrame(rows, columns=["Part Number", "파일(선박)", "출고 수량", "출고 횟수"])
+
+# 부품의 입출고 기록 (최근 순)
+def history(file_id, part_number, limit=HISTORY_LIMIT):
+    rows = storage.query(DB_PATH, '''
+        SELECT moved_at, kind, quantity, user, note FROM stock_movements
+        WHERE file_id = ? AND part_number = ? ORDER BY moved_at DESC, id DESC LIMIT ?
+    ''', (ledger_file_id(file_id), part_number, limit))
+    df = pd.DataFrame(rows, columns=["시각", "종류", "수량", "작업자", "메모"])
+    df["종류"] = df["종류"].map(KINDS)
+    return df
+
+# 지난 분기 (시작일, 종료일)
+def last_quarter(today):
+    quarter_start = datetime(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+    previous_end = quarter_start - timedelta(days=1)
+    return datetime(previous_end.year, 3 * ((previous_end.month - 1) // 3) + 1, 1).date(), quarter_start.date()
+
+# 입출고 화면
+def show_ledger(choices):
+    import inventory_management  # 재고 관리 페이지가 이 모듈을 불러오므로 화면을 그릴 때만 불러옴
+
+    file_id, file_name = st.selectbox("재고 목록을 선택하세요", choices, format_func=lambda x: x[1], key="ledger_file")
+    items = inventory_management.load_items(file_id)
+    parts = sorted(set(items["part_number"]) - {""})
+    if not parts:
+        st.write("부품 번호가 있는 재고 항목이 없습니다.")
+        return
+
+    part_number = st.selectbox("부품 번호", parts)
+    st.metric("현재 재고", current_stock(file_id, part_number))
+
+    # 입출고 입력
+    with st.form("stock_movement", clear_on_submit=True):
+        col_kind, col_quantity = st.columns(2)
+        kind = col_kind.selectbox("종류", list(KINDS), format_func=KINDS.get)
+        quantity = col_quantity.number_input("수량 (조정은 증감 수량)", value=0, step=1)
+        col_user, col_note = st.columns(2)
+        user = col_user.text_input("작업자", value=st.session_state.get("ledger_user", ""))
+        note = col_note.text_input("메모")
+        if st.form_submit_button("기록"):
+            delta = -abs(quantity) if kind == "issue" else abs(quantity) if kind == "receipt" else quantity
+            if delta == 0:
+                st.warning("수량을 입력하세요.")
+            else:
+                st.session_state["ledger_user"] = user
+                with storage.transaction(DB_PATH) as conn:
+                    record(conn, [(file_id, part_number, kind, delta, user, note)])
+                # rerun 후에 표시하도록 메시지를 남김 (바로 표시하면 rerun으로 사라짐)
+                st.session_state["ledger_message"] = f"{part_number} {KINDS[kind]} {abs(delta)}개를 기록했습니다."
+                st.rerun()
+    if "ledger_message" in st.session_state:
+        st.success(st.session_state.pop("ledger_message"))
+
+    st.subheader("입출고 기록")
+    st.dataframe(history(file_id, part_number), hide_index=True, use_container_width=True)
+
+    # 기간별 사용량 (기본값은 지난 분기)
+    st.subheader("기간별 출고 수량")
+    start, end = last_quarter(datetime.now())
+    period = st.date_input("기간", value=(start, end - timedelta(days=1)))
+    if len(period) == 2:
+        st.dataframe(consumption(period[0].isoformat(), (period[1] + timedelta(days=1)).isoformat()),
+                     hide_index=True, use_container_width=True)
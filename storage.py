@@ -0,0 +1,200 @@
+import streamlit as st
+import os
+import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
+import metrics
+
+# 모든 페이지가 함께 쓰는 데이터베이스 파일 (테이블은 migrations.py에서 생성)
+DB_DIR = "blr_app"
+DB_PATH = os.path.join(DB_DIR, "blr.db")
+
+# blr_app 폴더가 없으면 생성
+if not os.path.exists(DB_DIR):
+    os.makedirs(DB_DIR)
+
+# 데이터베이스별 연결 풀 크기와 잠금 대기 시간
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+
+# 풀의 연결이 모두 사용 중일 때 기다리는 최대 시간 (초)
+POOL_TIMEOUT_SECONDS = 30
+
+# BLOB을 나눠 읽는 크기
+BLOB_CHUNK_SIZE = 256 * 1024
+
+# 연결마다 적용할 설정 (WAL 모드로 읽기와 쓰기가 서로 막지 않도록 함)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+# 실행 시간과 행 수를 기록하는 커서 (측정을 끄면 기본 커서와 같이 동작)
+class MeteredCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        if not metrics.ENABLED:
+            return super().execute(sql, params)
+        self.metric_name = metrics.statement_name(sql)
+        with metrics.Timer(self.metric_name) as t:
+            super().execute(sql, params)
+            t.rows = max(self.rowcount, 0)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        if not metrics.ENABLED:
+            return super().executemany(sql, seq_of_params)
+        self.metric_name = metrics.statement_name(sql)
+        with metrics.Timer(self.metric_name) as t:
+            super().executemany(sql, seq_of_params)
+            t.rows = max(self.rowcount, 0)
+        return self
+
+    # 조회 결과 읽는 시간과 행 수는 같은 문장에 더함 (호출 수는 늘리지 않음)
+    def fetchall(self):
+        if not metrics.ENABLED or not hasattr(self, "metric_name"):
+            return super().fetchall()
+        with metrics.Timer(self.metric_name, calls=0) as t:
+            rows = super().fetchall()
+            t.rows = len(rows)
+        return rows
+
+    def fetchone(self):
+        if not metrics.ENABLED or not hasattr(self, "metric_name"):
+            return super().fetchone()
+        with metrics.Timer(self.metric_name, calls=0) as t:
+            row = super().fetchone()
+            t.rows = 0 if row is None else 1
+        return row
+
+# 모든 문장을 MeteredCursor로 실행하는 연결
+class MeteredConnection(sqlite3.Connection):
+    def execute(self, sql, params=()):
+        return self.cursor(MeteredCursor).execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor(MeteredCursor).executemany(sql, seq_of_params)
+
+# 새 데이터베이스 연결 생성 (트랜잭션은 transaction()에서 직접 관리, 시작할 때 측정을 껐으면 기본 연결 사용)
+def open_connection(db_path):
+    conn = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        isolation_level=None,
+        factory=MeteredConnection if metrics.ENABLED else sqlite3.Connection,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+# 데이터베이스 하나에 대한 연결 풀
+class ConnectionPool:
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    # 쉬고 있는 연결을 꺼내거나, 없으면 새로 연결 (timeout초 안에 빈 자리가 없으면 TimeoutError)
+    def acquire(self, timeout=POOL_TIMEOUT_SECONDS):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"데이터베이스 연결을 {timeout}초 동안 얻지 못했습니다. (연결 {self.size}개 모두 사용 중: {self.db_path})")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return open_connection(self.db_path)
+        except Exception:
+            self._slots.release()
+            raise
+
+    # 사용이 끝난 연결을 풀에 반환 (끝나지 않은 트랜잭션은 되돌림)
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+# 데이터베이스 경로별 연결 풀 (rerun과 세션이 바뀌어도 유지됨)
+@st.cache_resource
+def get_pool(db_path):
+    return ConnectionPool(db_path)
+
+# 풀에서 연결을 빌려 쓰고 자동으로 반환
+@contextmanager
+def connection(db_path):
+    pool = get_pool(db_path)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+# 트랜잭션 안에서 여러 문장 실행 (오류가 나면 전체를 되돌림)
+@contextmanager
+def transaction(db_path):
+    with connection(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+# 조회 결과 전체 반환
+def query(db_path, sql, params=()):
+    with connection(db_path) as conn:
+        return conn.execute(sql, params).fetchall()
+
+# 조회 결과 첫 행 반환 (없으면 None)
+def query_one(db_path, sql, params=()):
+    with connection(db_path) as conn:
+        return conn.execute(sql, params).fetchone()
+
+# 문장 하나를 트랜잭션으로 실행
+def execute(db_path, sql, params=()):
+    with transaction(db_path) as conn:
+        return conn.execute(sql, params)
+
+# 같은 문장을 여러 값으로 한 번의 트랜잭션에서 실행
+def executemany(db_path, sql, seq_of_params):
+    with transaction(db_path) as conn:
+        return conn.executemany(sql, seq_of_params)
+
+# 테이블 변경 버전 추적 (행이 추가, 수정, 삭제될 때마다 트리거로 버전 증가)
+# 캐시 키에 버전을 넣으면 어느 경로로 데이터가 바뀌어도 캐시가 자동으로 무효화됨
+def track_changes(conn, table_name):
+    create_versions_table(conn)
+    conn.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table_name,))
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS "{table_name}_version_{event.lower()}" AFTER {event} ON "{table_name}" BEGIN
+                             UPDATE table_versions SET version = version + 1 WHERE table_name = '{table_name}';
+                         END''')
+
+# 테이블별 변경 버전 테이블 생성
+def create_versions_table(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS table_versions (table_name TEXT PRIMARY KEY, version INTEGER)")
+
+# 테이블 변경 버전 조회 (추적하지 않는 테이블은 0)
+def table_version(db_path, table_name):
+    try:
+        row = query_one(db_path, "SELECT version FROM table_versions WHERE table_name = ?", (table_name,))
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+# 여러 테이블의 변경 버전을 한 번에 조회 (테이블 순서대로의 튜플, 캐시 키로 사용)
+def table_versions(db_path, table_names):
+    placeholders = ", ".join("?" for _ in table_names)
+    try:
+        rows = dict(query(db_path, f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})", tuple(table_names)))
+    except sqlite3.OperationalError:
+        return (0,) * len(table_names)
+    return tuple(rows.get(table_name, 0) for table_name in table_names)
@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+from collections import namedtuple
+
+# 표 변경 내용 (수정: 기본키 -> {열: 값}, 추가: [{열: 값}], 삭제: [기본키])
+Changes = namedtuple("Changes", ["updated", "added", "deleted"])
+
+# st.data_editor가 index를 편집 열로 바꿀 때 쓰는 열 이름
+INDEX_COLUMN = "_index"
+
+# 편집기 위젯 키 (저장 후에는 새 키로 바꿔서 편집 상태를 비움)
+def editor_key(name):
+    return f"{name}_{st.session_state.get(f'{name}_version', 0)}"
+
+# 편집기에 넘길 표 (index를 0부터의 번호로 바꿈, 기본키는 editor_changes에서 원래 df의 위치로 찾음)
+# 기본키 index를 그대로 넘기면 num_rows="dynamic"에서 hide_index가 무시되고 index가 편집 가능한 _index 열이 됨
+def editor_frame(df):
+    return df.reset_index(drop=True)
+
+# 편집 상태 초기화
+def reset_editor(name):
+    st.session_state[f"{name}_version"] = st.session_state.get(f"{name}_version", 0) + 1
+
+# st.data_editor의 편집 상태를 기본키 기준 변경 내용으로 변환
+# (df의 index가 기본키, 편집 상태의 행 번호는 df 안의 위치, _index 값은 기본키가 아니므로 저장하지 않음)
+# 기본키는 numpy 정수 대신 파이썬 값으로 바꿈 (sqlite3는 numpy 정수를 BLOB으로 넘겨서 WHERE id = ?에 맞지 않음)
+def editor_changes(name, df):
+    state = st.session_state.get(editor_key(name))
+    if state is None:
+        return Changes({}, [], [])
+    deleted_positions = set(state.get("deleted_rows", []))
+    updated = {}
+    for position, values in state.get("edited_rows", {}).items():
+        values = table_values(values)
+        if int(position) not in deleted_positions and values:
+            updated[sql_value(df.index[int(position)])] = values
+    added = [values for values in map(table_values, state.get("added_rows", [])) if values]
+    deleted = [sql_value(df.index[position]) for position in sorted(deleted_positions)]
+    return Changes(updated, added, deleted)
+
+# 편집한 칸 중 표의 열만 남김
+def table_values(values):
+    return {column: value for column, value in values.items() if column != INDEX_COLUMN}
+
+# 변경 내용이 있는지 확인
+def has_changes(changes):
+    return bool(changes.updated or changes.added or changes.deleted)
+
+# 변경된 행만 한 번의 트랜잭션으로 반영 (같은 열을 바꾼 행끼리 executemany)
+# defaults: 추가되는 행에 함께 넣을 값 (예: 파일 id), convert: 열 이름과 값을 받아 저장할 값으로 변환
+def apply_changes(conn, table_name, changes, key_column="id", defaults=None, convert=None):
+    convert = convert or (lambda column, value: value)
+
+    groups = {}
+    for key, values in changes.updated.items():
+        columns = tuple(sorted(values))
+        groups.setdefault(columns, []).append([convert(column, values[column]) for column in columns] + [key])
+    for columns, params in groups.items():
+        assignments = ', '.join(f'"{column}" = ?' for column in columns)
+        conn.executemany(f'UPDATE "{table_name}" SET {assignments} WHERE "{key_column}" = ?', params)
+
+    if changes.deleted:
+        conn.executemany(f'DELETE FROM "{table_name}" WHERE "{key_column}" = ?', [(key,) for key in changes.deleted])
+
+    insert_groups = {}
+    for values in changes.added:
+        row = {**(defaults or {}), **values}
+        columns = tuple(row)
+        insert_groups.setdefault(columns, []).append([convert(column, row[column]) for column in columns])
+    for columns, params in insert_groups.items():
+        names = ', '.join(f'"{column}"' for column in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        conn.executemany(f'INSERT INTO "{table_name}" ({names}) VALUES ({placeholders})', params)
+
+# pandas 결측값을 None으로 바꿔서 저장
+def sql_value(value):
+    if value is None:
+        return None
+    if not isinstance(value, (list, dict)) and pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
@@ -0,0 +1,408 @@
+import streamlit as st
+import os
+import io
+import time
+import threading
+import zipfile
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import storage
+import metrics
+import ingest
+import anomaly
+
+# 신호 목록 데이터베이스와 측정값 파일 위치
+DB_PATH = storage.DB_PATH
+DATA_DIR = os.path.join(storage.DB_DIR, "telemetry")
+
+# 보일러 상태값 표 (신호 이름, 단위, 설정값)
+STATE_TABLE_PATH = "보일러 상태값(표) 최종.xlsx"
+
+# 측정값 한 개의 저장 형식 (초 단위 시각 8바이트 + 값 4바이트)
+SAMPLE_DTYPE = np.dtype([("t", "<i8"), ("v", "<f4")])
+SECONDS_PER_DAY = 86400
+
+# 그래프 점 개수 기본값과 축소 방식, 그래프 해상도
+DEFAULT_POINTS = 2000
+PLOT_DPI = 100
+DOWNSAMPLE_METHODS = {"minmax": "구간별 최소/최대", "lttb": "LTTB"}
+
+# 시뮬레이터 기본 신호 (보일러 상태값 표의 이름)
+SIMULATED_SIGNALS = (
+    "Pressure transmitter for steam drum",
+    "Temperature transmitter for high flue gas temperature",
+    "Salinity indicator for high content of natrium chloride",
+)
+
+# 시각과 값이 들어 있는 열 이름 (소문자로 비교)
+TIME_COLUMNS = ("time", "timestamp", "datetime", "date", "시각", "일시", "날짜")
+
+# blr_app 폴더가 없으면 생성
+if not os.path.exists(DATA_DIR):
+    os.makedirs(DATA_DIR)
+
+# 보일러 상태값 표 읽기 (같은 이름이 있으면 단위를 붙여 구분)
+def read_state_table():
+    df = pd.read_excel(STATE_TABLE_PATH, header=None).iloc[2:, 1:4].dropna(subset=[1])
+    signals, names = [], set()
+    for name, unit, setpoint in df.itertuples(index=False, name=None):
+        name = str(name).strip()
+        if name in names:
+            name = f"{name} ({unit})"
+        names.add(name)
+        setpoint = pd.to_numeric(setpoint, errors="coerce")
+        signals.append((name, None if pd.isna(unit) else str(unit), None if pd.isna(setpoint) else float(setpoint)))
+    return signals
+
+# 신호 목록 조회 (id, 이름, 단위, 설정값)
+def list_signals():
+    return storage.query(DB_PATH, "SELECT id, name, unit, setpoint FROM signals ORDER BY id")
+
+# 신호 id 조회 (없으면 새로 등록하고 기본 경보 규칙 추가)
+def signal_id(name):
+    with storage.transaction(DB_PATH) as conn:
+        if conn.execute("INSERT OR IGNORE INTO signals (name) VALUES (?)", (name,)).rowcount:
+            anomaly.add_default_rules(conn)
+        return conn.execute("SELECT id FROM signals WHERE name = ?", (name,)).fetchone()[0]
+
+# 신호의 하루치 측정값 파일 경로
+def day_path(signal, day):
+    return os.path.join(DATA_DIR, str(signal), f"{day}.bin")
+
+# 측정값 추가 (이상 감지를 거쳐 날짜별 파일 끝에 이어서 기록)
+def append_samples(signal, t, v):
+    t = np.asarray(t, dtype=np.int64)
+    order = np.argsort(t, kind="stable")
+    samples = np.empty(len(t), dtype=SAMPLE_DTYPE)
+    samples["t"], samples["v"] = t[order], np.asarray(v, dtype=np.float32)[order]
+    anomaly.observe(signal, samples["t"], samples["v"])
+
+    days = samples["t"] // SECONDS_PER_DAY
+    boundaries = np.flatnonzero(np.diff(days)) + 1
+    os.makedirs(os.path.join(DATA_DIR, str(signal)), exist_ok=True)
+    for chunk in np.split(samples, boundaries):
+        if len(chunk):
+            with open(day_path(signal, int(chunk["t"][0] // SECONDS_PER_DAY)), "ab") as f:
+                chunk.tofile(f)
+
+# 하루치 측정값 읽기 (시간 순서가 아니면 메모리에서만 정렬, 파일은 append_samples만 씀)
+# 다른 스레드가 이어서 기록 중인 마지막 측정값은 크기가 모자라면 읽지 않음
+def read_day(signal, day):
+    path = day_path(signal, day)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=SAMPLE_DTYPE)
+    samples = np.fromfile(path, dtype=SAMPLE_DTYPE, count=os.path.getsize(path) // SAMPLE_DTYPE.itemsize)
+    if len(samples) > 1 and np.any(np.diff(samples["t"]) < 0):
+        samples = samples[np.argsort(samples["t"], kind="stable")]
+    return samples
+
+# 하루치 측정값 파일의 첫 번째와 마지막 측정값 시각 (파일 전체를 읽지 않음)
+# 측정값이 하나도 없으면 None (막 만든 파일, 기록 중에 멈춰서 한 개보다 짧은 파일)
+def day_bounds(signal, day):
+    path = day_path(signal, day)
+    count = os.path.getsize(path) // SAMPLE_DTYPE.itemsize
+    if count == 0:
+        return None
+    with open(path, "rb") as f:
+        first = np.fromfile(f, dtype=SAMPLE_DTYPE, count=1)
+        f.seek((count - 1) * SAMPLE_DTYPE.itemsize)
+        last = np.fromfile(f, dtype=SAMPLE_DTYPE, count=1)
+    return int(first["t"][0]), int(last["t"][0])
+
+# 기간 안의 측정값 읽기 (시각 배열, 값 배열)
+def load_range(signal, start, end):
+    samples = [read_day(signal, day) for day in range(int(start) // SECONDS_PER_DAY, int(end) // SECONDS_PER_DAY + 1)]
+    samples = np.concatenate(samples) if samples else np.empty(0, dtype=SAMPLE_DTYPE)
+    first, last = np.searchsorted(samples["t"], [start, end], side="left")
+    return samples["t"][first:last], samples["v"][first:last]
+
+# 측정값 파일이 있는 날짜 목록 (1970-01-01부터 지난 일수, 오래된 순서)
+def stored_days(signal):
+    folder = os.path.join(DATA_DIR, str(signal))
+    return sorted(int(name[:-4]) for name in os.listdir(folder) if name.endswith(".bin")) if os.path.isdir(folder) else []
+
+# 측정값이 있는 기간 (처음 시각, 마지막 시각), 없으면 None
+# 첫 날 파일의 첫 측정값과 마지막 날 파일의 마지막 측정값만 읽음 (한 번에 올린 측정값은 시간 순서로 기록됨,
+# 같은 날의 더 이른 측정값을 나중에 올렸으면 기간이 조금 좁게 나올 수 있음)
+def data_span(signal):
+    days = stored_days(signal)
+    first = next((bounds for bounds in (day_bounds(signal, day) for day in days) if bounds), None)
+    if first is None:
+        return None
+    last = next(bounds for bounds in (day_bounds(signal, day) for day in reversed(days)) if bounds)
+    return first[0], last[1]
+
+# 구간별 최소/최대 축소 (같은 크기의 구간마다 최소값과 최대값을 시간 순서대로 남김)
+def downsample_minmax(t, v, points):
+    if len(t) <= points:
+        return t, v
+    size = -(-len(t) // (points // 2))  # 구간 크기 (올림)
+    full = len(t) // size * size
+    blocks = v[:full].reshape(-1, size)
+    offsets = np.arange(0, full, size)
+    index = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)]
+    if full < len(t):
+        rest = v[full:]
+        index.append(np.array([full + rest.argmin(), full + rest.argmax()]))
+    index = np.unique(np.concatenate(index))
+    return t[index], v[index]
+
+# LTTB 축소 (구간마다 앞뒤 점과 만드는 삼각형 넓이가 가장 큰 점 선택)
+def downsample_lttb(t, v, points):
+    if len(t) <= points or points < 3:
+        return t, v
+    x = (t - t[0]).astype(np.float64)
+    y = v.astype(np.float64)
+    edges = np.linspace(1, len(t) - 1, points - 1).astype(np.int64)
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, len(t) - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else len(t)
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return t[selected], v[selected]
+
+# 그래프용으로 축소한 측정값
+def downsample(t, v, points=DEFAULT_POINTS, method="minmax"):
+    if method == "lttb":
+        return downsample_lttb(t, v, points)
+    return downsample_minmax(t, v, points)
+
+# 기간 안의 측정값 파일 상태 (파일이 바뀌면 캐시를 다시 만들도록 캐시 키로 사용)
+def range_version(signal, start, end):
+    version = []
+    for day in range(int(start) // SECONDS_PER_DAY, int(end) // SECONDS_PER_DAY + 1):
+        try:
+            stat = os.stat(day_path(signal, day))
+        except FileNotFoundError:
+            continue
+        version.append((day, stat.st_size, stat.st_mtime_ns))
+    return tuple(version)
+
+# 기간 안의 측정값을 읽어서 축소한 결과 (시각 배열, 값 배열, 원래 개수), 파일이 바뀌지 않으면 캐시 사용
+@st.cache_data(max_entries=32, show_spinner=False)
+def downsampled_range(signal, start, end, points, method, version):
+    t, v = load_range(signal, start, end)
+    return (*downsample(t, v, points, method), len(t))
+
+# CSV/XLSX 측정값 읽기 (ingest 프로세스에서 실행, file: 파일 경로 또는 읽기용 파일 객체)
+# 넓은 형식 (시각 열 + 신호별 열) 또는 긴 형식 (시각, signal, value 열) -> {신호 이름: (시각 배열, 값 배열)}
+@metrics.timed("parse telemetry")
+def parse_upload(file):
+    is_excel = zipfile.is_zipfile(file)  # xlsx는 zip 파일
+    if hasattr(file, "seek"):
+        file.seek(0)
+    df = pd.read_excel(file) if is_excel else pd.read_csv(file)
+    columns = {str(column).strip().lower(): column for column in df.columns}
+    time_column = next((columns[name] for name in TIME_COLUMNS if name in columns), None)
+    if time_column is None:
+        raise ValueError(f"시각 열이 없습니다. ({', '.join(TIME_COLUMNS)} 중 하나)")
+    times = pd.to_datetime(df[time_column])
+    df = df[times.notna()]  # 시각이 빈 행은 버림 (NaT는 정수로 바꾸면 아주 오래전 날짜가 됨)
+    t = times[times.notna()].to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+    if "signal" in columns and "value" in columns:
+        signals = df[columns["signal"]].astype(str).to_numpy()
+        values = pd.to_numeric(df[columns["value"]], errors="coerce").to_numpy(dtype=np.float32)
+        series = {}
+        for name in np.unique(signals):
+            mask = (signals == name) & ~np.isnan(values)
+            series[name] = (t[mask], values[mask])
+        return series
+
+    series = {}
+    for column in df.columns:
+        if column == time_column:
+            continue
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float32)
+        mask = ~np.isnan(values)
+        if mask.any():
+            series[str(column).strip()] = (t[mask], values[mask])
+    return series
+
+# 업로드 작업 저장 (ingest 작업 스레드에서 실행)
+def store_upload(file_name, file_data, series):
+    count = 0
+    for name, (t, v) in series.items():
+        append_samples(signal_id(name), t, v)
+        count += len(t)
+    return f"신호 {len(series)}개, 측정값 {count:,}개"
+
+# 시뮬레이터 측정값 생성 (설정값 근처에서 천천히 변하는 값 + 잡음 + 가끔 튀는 값)
+def simulate(setpoint, t, seed=0):
+    rng = np.random.default_rng(seed)
+    base = 0.6 * (setpoint if setpoint else 1.0)
+    scale = abs(base) * 0.02
+    walk = np.cumsum(rng.normal(0, scale * 0.01, len(t)))
+    walk -= np.linspace(0, walk[-1], len(t)) if len(t) else 0  # 기간 끝에서 원래 값으로 돌아옴
+    daily = abs(base) * 0.03 * np.sin(2 * np.pi * (t % SECONDS_PER_DAY) / SECONDS_PER_DAY)
+    values = base + walk + daily + rng.normal(0, scale, len(t))
+    spikes = rng.random(len(t)) < 1e-5
+    values[spikes] += abs(base) * rng.uniform(0.3, 0.8, spikes.sum())
+    return values.astype(np.float32)
+
+# 시뮬레이터로 기간 전체 측정값 생성 (초 단위)
+def simulate_range(names, start, end):
+    t = np.arange(int(start), int(end), dtype=np.int64)
+    setpoints = {name: setpoint for _, name, _, setpoint in list_signals()}
+    for seed, name in enumerate(names):
+        append_samples(signal_id(name), t, simulate(setpoints.get(name), t, seed))
+    return len(t) * len(names)
+
+# 실시간 시뮬레이터 (1초마다 측정값 하나씩 추가, 모든 세션이 공유)
+class LiveSimulator:
+    def __init__(self):
+        self.names = ()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, names):
+        self.stop()
+        self.names = tuple(names)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-simulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        setpoints = {name: setpoint for _, name, _, setpoint in list_signals()}
+        signals = {name: signal_id(name) for name in self.names}
+        seed = int(time.time())
+        while not self._stop.wait(1.0):
+            now = np.array([int(time.time())], dtype=np.int64)
+            for name, signal in signals.items():
+                seed += 1
+                append_samples(signal, now, simulate(setpoints.get(name), now, seed))
+
+@st.cache_resource
+def get_simulator():
+    return LiveSimulator()
+
+# 초 단위 시각을 matplotlib 날짜로 변환
+def to_datetime(t):
+    return t.astype("datetime64[s]")
+
+# 신호별 그래프 (설정값은 점선, 이상 감지 경보는 x 표시)
+def plot_signals(series, alerts=None):
+    fig, axes = plt.subplots(len(series), 1, figsize=(12, 2.6 * len(series)), sharex=True, squeeze=False)
+    for ax, (name, unit, setpoint, t, v) in zip(axes[:, 0], series):
+        ax.plot(to_datetime(t), v, linewidth=0.8)
+        if alerts is not None and name in alerts:
+            marked = alerts[name]
+            ax.plot(to_datetime(marked["t"].to_numpy()), marked["value"], "x", color="tab:orange", markersize=6)
+        if setpoint is not None:
+            ax.axhline(setpoint, color="tab:red", linestyle="--", linewidth=0.8)
+        ax.set_title(name, fontsize=9, loc="left")
+        ax.set_ylabel(unit or "")
+        ax.grid(True, alpha=0.3)
+    locator = mdates.AutoDateLocator()
+    axes[-1, 0].xaxis.set_major_locator(locator)
+    axes[-1, 0].xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    height = fig.get_figheight()
+    fig.subplots_adjust(left=0.07, right=0.99, top=1 - 0.3 / height, bottom=0.6 / height, hspace=0.3)
+    return fig
+
+# 그래프를 PNG로 변환 (tight_layout 계산 없이 정해진 여백과 해상도 사용)
+def figure_png(fig):
+    output = io.BytesIO()
+    fig.savefig(output, format="png", dpi=PLOT_DPI)
+    plt.close(fig)
+    return output.getvalue()
+
+# 관리자용 데이터 입력 (파일 업로드와 시뮬레이터)
+def admin_panel(signals):
+    names = [name for _, name, _, _ in signals]
+    with st.sidebar.expander("데이터 입력", expanded=False):
+        uploaded_file = st.file_uploader("CSV/XLSX 측정값 파일", type=["csv", "xlsx"])
+        if ingest.submit_upload("telemetry", uploaded_file):
+            st.success(f"'{uploaded_file.name}' 파일을 저장하는 중입니다.")
+        ingest.show_jobs(["telemetry"])
+
+        default = [name for name in SIMULATED_SIGNALS if name in names]
+        simulated = st.multiselect("시뮬레이터 신호", names, default=default)
+        days = st.number_input("생성할 기간 (일, 초 단위 측정값)", min_value=1, max_value=366, value=30)
+        if st.button("시뮬레이터 데이터 생성") and simulated:
+            end = int(time.time())
+            count = simulate_range(simulated, end - days * SECONDS_PER_DAY, end)
+            st.success(f"측정값 {count:,}개를 생성했습니다.")
+
+        simulator = get_simulator()
+        if simulator.running:
+            st.caption(f"실시간 시뮬레이터 실행 중 ({len(simulator.names)}개 신호)")
+            if st.button("실시간 시뮬레이터 중지"):
+                simulator.stop()
+        elif st.button("실시간 시뮬레이터 시작") and simulated:
+            simulator.start(simulated)
+
+# 운전 데이터 페이지 함수
+def app():
+    st.title("운전 데이터")
+
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
+    signals = list_signals()
+    if is_admin:
+        admin_panel(signals)
+        anomaly.admin_panel()
+
+    spans = {signal: data_span(signal) for signal, _, _, _ in signals}
+    available = [row for row in signals if spans[row[0]] is not None]
+    if not available:
+        st.info("저장된 측정값이 없습니다. 관리자 모드에서 파일을 올리거나 시뮬레이터로 데이터를 만드세요.")
+        return
+
+    selected = st.multiselect("신호", available, default=available[:3], format_func=lambda x: x[1])
+    if not selected:
+        return
+
+    last = max(spans[row[0]][1] for row in selected)
+    first = min(spans[row[0]][0] for row in selected)
+    end_day = pd.Timestamp(last, unit="s").date()
+    start_day = max(pd.Timestamp(first, unit="s").date(), end_day - pd.Timedelta(days=30))
+    period = st.date_input("기간", value=(start_day, end_day))
+    col_method, col_points = st.columns(2)
+    method = col_method.radio("축소 방식", list(DOWNSAMPLE_METHODS), format_func=DOWNSAMPLE_METHODS.get, horizontal=True)
+    points = col_points.slider("그래프 점 개수", min_value=500, max_value=5000, value=DEFAULT_POINTS, step=500)
+    if len(period) != 2:
+        return
+    start = int(pd.Timestamp(period[0]).timestamp())
+    end = int((pd.Timestamp(period[1]) + pd.Timedelta(days=1)).timestamp())
+
+    started = time.perf_counter()
+    series, raw_count = [], 0
+    for signal, name, unit, setpoint in selected:
+        t, v, count = downsampled_range(signal, start, end, points, method, range_version(signal, start, end))
+        series.append((name, unit, setpoint, t, v))
+        raw_count += count
+    loaded = time.perf_counter()
+
+    alerts = anomaly.recent_alerts([row[0] for row in selected], start, end)
+    st.image(figure_png(plot_signals(series, dict(tuple(alerts.groupby("name"))))), use_container_width=True)
+
+    plotted_count = sum(len(t) for _, _, _, t, _ in series)
+    st.caption(f"측정값 {raw_count:,}개 → {plotted_count:,}개 · 읽기/축소 {(loaded - started) * 1000:.0f} ms · "
+               f"그리기 {(time.perf_counter() - loaded) * 1000:.0f} ms")
+
+    anomaly.show_alerts(alerts)
+
+# Streamlit 앱 실행
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,42 @@
+import io
+import fitz
+import pytest
+import storage
+import migrations
+import pdf_tables
+
+# 임시 데이터베이스에 모든 버전을 적용하고 표 추출 결과를 그 파일에 저장 (예전 파일은 가져오지 않음)
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(migrations, "LEGACY_FILES", ())
+    path = str(tmp_path / "blr.db")
+    migrations.migrate(path)
+    monkeypatch.setattr(pdf_tables, "DB_PATH", path)
+    return path
+
+# 페이지마다 다른 글자를 쓴 PDF
+def make_pdf(texts):
+    document = fitz.open()
+    for text in texts:
+        document.new_page().insert_text((72, 72), text)
+    data = document.tobytes()
+    document.close()
+    return data
+
+# 읽을 때 이미 있던 페이지가 저장 전에 지워지면 저장하면서 다시 추출
+def test_store_tables_extracts_pages_deleted_after_parse(db_path):
+    data = make_pdf(["첫 페이지", "둘째 페이지"])
+    parsed = pdf_tables.parse_pdf(io.BytesIO(data), set())
+    known = parsed["digests"][0]
+    with storage.transaction(db_path) as conn:
+        pdf_tables.store_cells(conn, {known: []})
+
+    file = io.BytesIO(data)
+    parsed = pdf_tables.parse_pdf(file, pdf_tables.stored_digests())
+    assert set(parsed["tables"]) == {parsed["digests"][1]}
+    storage.execute(db_path, "DELETE FROM pdf_table_pages WHERE digest = ?", (known,))
+
+    with storage.transaction(db_path) as conn:
+        pdf_tables.store_tables(conn, 1, parsed["digests"], parsed["tables"], file)
+        assert pdf_tables.missing_digests(conn, parsed["digests"]) == set()
@@ -0,0 +1,103 @@
+import json
+import pytest
+import pandas as pd
+import streamlit as st
+import storage
+import migrations
+import search
+import table_changes
+import inventory_management
+import troubleshooting
+import boiler_operations
+
+# 임시 데이터베이스에 모든 버전을 적용하고 페이지 모듈이 그 파일을 사용하게 함 (예전 파일은 가져오지 않음)
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(migrations, "LEGACY_FILES", ())
+    path = str(tmp_path / "blr.db")
+    migrations.migrate(path)
+    for module in (search, inventory_management, troubleshooting, boiler_operations):
+        monkeypatch.setattr(module, "DB_PATH", path)
+    yield path
+    st.session_state.clear()
+
+# st.data_editor가 기본키 index 편집기에 남기는 편집 상태 (추가한 행과 id 칸 수정에 _index가 들어감)
+def set_editor_state(name, edited_rows=None, added_rows=None, deleted_rows=None):
+    st.session_state[table_changes.editor_key(name)] = {
+        "edited_rows": edited_rows or {},
+        "added_rows": added_rows or [],
+        "deleted_rows": deleted_rows or [],
+    }
+
+def test_editor_frame_uses_range_index():
+    frame = table_changes.editor_frame(pd.DataFrame({"part_name": ["a", "b"]}, index=[7, 9]))
+    assert list(frame.index) == [0, 1]
+    assert list(frame.columns) == ["part_name"]
+
+def test_editor_changes_maps_positions_and_drops_index_column():
+    df = pd.DataFrame({"part_name": ["a", "b", "c"]}, index=[10, 20, 30])
+    set_editor_state("items",
+                     edited_rows={"1": {"part_name": "B", "_index": 99}, 2: {"_index": 5}},
+                     added_rows=[{"_index": None, "part_name": "d"}, {"_index": 7}],
+                     deleted_rows=[0])
+    changes = table_changes.editor_changes("items", df)
+    assert changes.updated == {20: {"part_name": "B"}}
+    assert changes.added == [{"part_name": "d"}]
+    assert changes.deleted == [10]
+    st.session_state.clear()
+
+def test_inventory_save_round_trip(db_path):
+    with storage.transaction(db_path) as conn:
+        file_id = conn.execute("INSERT INTO inventory_files (file_name) VALUES ('재고.xlsx') RETURNING id").fetchone()[0]
+        conn.executemany("INSERT INTO inventory (part_name, part_number, available_quantity, required_quantity, file_id) VALUES (?, ?, ?, ?, ?)",
+                         [("밸브", "V-1", 3, 1, file_id), ("펌프", "P-1", 2, 1, file_id), ("필터", "F-1", 5, 2, file_id)])
+    df = inventory_management.load_items(file_id)
+    name = f"inventory_editor_{file_id}"
+    set_editor_state(name,
+                     edited_rows={1: {"available_quantity": 4, "_index": 999}},
+                     added_rows=[{"_index": None, "part_name": "센서", "part_number": "S-1", "available_quantity": 6}],
+                     deleted_rows=[2])
+    inventory_management.save_items(file_id, table_changes.editor_changes(name, df), df)
+
+    saved = inventory_management.load_items(file_id)
+    assert saved["part_number"].tolist() == ["V-1", "P-1", "S-1"]
+    assert saved["available_quantity"].tolist() == [3, 4, 6]
+    assert saved.index[1] == df.index[1]
+
+def test_troubleshooting_save_round_trip(db_path):
+    with storage.transaction(db_path) as conn:
+        section_id = conn.execute("INSERT INTO ts_sections (name, columns, version) VALUES ('버너', ?, 0) RETURNING id",
+                                  (json.dumps(["증상", "원인"], ensure_ascii=False),)).fetchone()[0]
+        conn.executemany("INSERT INTO ts_entries (section_id, row_no, column_name, value) VALUES (?, ?, ?, ?)",
+                         [(section_id, 1, "증상", "점화 불량"), (section_id, 1, "원인", "전극"), (section_id, 2, "증상", "소음")])
+    df = troubleshooting.section_frame(section_id)
+    name = f"editable_section_{section_id}"
+    set_editor_state(name,
+                     edited_rows={1: {"원인": "팬", "_index": 8}},
+                     added_rows=[{"_index": None, "증상": "누수"}])
+    troubleshooting.save_section_changes(section_id, table_changes.editor_changes(name, df))
+
+    column_names = {row[0] for row in storage.query(db_path, "SELECT column_name FROM ts_entries")}
+    assert table_changes.INDEX_COLUMN not in column_names
+    saved = troubleshooting.section_frame(section_id)
+    assert saved["증상"].tolist() == ["점화 불량", "소음", "누수"]
+    assert saved["원인"].tolist()[:2] == ["전극", "팬"]
+
+def test_note_save_round_trip(db_path):
+    with storage.transaction(db_path) as conn:
+        note_id = conn.execute("INSERT INTO inspection_notes (file_name, columns) VALUES ('점검.xlsx', ?) RETURNING id",
+                               (json.dumps(["항목", "주기"], ensure_ascii=False),)).fetchone()[0]
+        conn.executemany("INSERT INTO inspection_note_rows (note_id, row_no, data) VALUES (?, ?, ?)",
+                         [(note_id, 0, json.dumps(["수위", "매일"], ensure_ascii=False)),
+                          (note_id, 1, json.dumps(["압력", "매주"], ensure_ascii=False))])
+    df = boiler_operations.load_note_frame(note_id)
+    name = f"notes_{note_id}"
+    set_editor_state(name,
+                     edited_rows={0: {"주기": "매월", "_index": 42}},
+                     added_rows=[{"_index": None, "항목": "온도"}])
+    edited_df = table_changes.editor_frame(df)
+    boiler_operations.save_note_changes(note_id, "점검.xlsx", df, edited_df, table_changes.editor_changes(name, df))
+
+    saved = boiler_operations.load_note_frame(note_id)
+    assert saved.fillna("").values.tolist() == [["수위", "매월"], ["압력", "매주"], ["온도", ""]]
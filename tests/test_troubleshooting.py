@@ -0,0 +1,17 @@
+import json
+import sqlite3
+import migrations
+import troubleshooting
+
+# 같은 표를 열 순서를 바꾸고 열을 더해서 다시 올려도 이미 있는 행은 추가하지 않음
+def test_insert_section_skips_rows_with_reordered_columns():
+    conn = sqlite3.connect(":memory:")
+    migrations.create_schema(conn)
+    troubleshooting.insert_section(conn, "버너", ["증상", "원인"], [["점화 불량", "전극"], ["소음", "팬"]])
+    section_id = troubleshooting.insert_section(conn, "버너", ["원인", "조치", "증상"],
+                                                [["전극", "", "점화 불량"], ["팬", "", "소음"], ["노즐", "청소", "불꽃 꺼짐"]])
+
+    columns, = conn.execute("SELECT columns FROM ts_sections WHERE id = ?", (section_id,)).fetchone()
+    entries = conn.execute("SELECT row_no, column_name, value FROM ts_entries WHERE section_id = ?", (section_id,)).fetchall()
+    frame = troubleshooting.build_frame(json.loads(columns), entries)
+    assert frame.values.tolist() == [["점화 불량", "전극", ""], ["소음", "팬", ""], ["불꽃 꺼짐", "노즐", "청소"]]
@@ -0,0 +1,25 @@
+import io
+import pytest
+import bench
+import troubleshooting
+import word_tables
+
+# 저장소에 Troubleshooting Word 원본이 없으므로 bench.py의 합성 파일을 사용
+# 메뉴얼 형식 (제목 행 가로 병합, 헤더, 데이터 행)과 병합 칸 표 (gridSpan, vMerge, gridBefore, 칸 안의 표)
+SAMPLES = {
+    "manual": lambda: bench.make_docx(3, 10),
+    "merged": lambda: bench.make_merged_docx(8),
+}
+
+# python-docx로 읽은 결과와 같은지 확인
+@pytest.mark.parametrize("name", SAMPLES)
+def test_iter_tables_matches_python_docx(name):
+    data = SAMPLES[name]()
+    expected = troubleshooting.read_word_table(io.BytesIO(data))
+    assert expected
+    assert list(word_tables.iter_tables(io.BytesIO(data))) == expected
+
+def test_parse_upload_reads_path(tmp_path):
+    path = tmp_path / "manual.docx"
+    path.write_bytes(bench.make_merged_docx(8))
+    assert troubleshooting.parse_upload(str(path)) == troubleshooting.read_word_table(str(path))
@@ -1,73 +1,179 @@
 import streamlit as st
 import pandas as pd
 from docx import Document
-import sqlite3
-
-# 데이터베이스 연결 함수
-def get_connection():
-    conn = sqlite3.connect('blr_app/troubleshooting.db', check_same_thread=False)
-    return conn
-
-# 데이터베이스 초기화 및 테이블 생성
-def create_table(table_name, headers):
-    conn = get_connection()
-    c = conn.cursor()
-    
-    # 테이블 이름과 컬럼 동적으로 생성
-    columns = ', '.join([f'"{header}" TEXT' for header in headers])  # 헤더를 컬럼으로 사용
-    query = f'''
-        CREATE TABLE IF NOT EXISTS "{table_name}" (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            {columns}
-        )
-    '''
-    c.execute(query)
-    conn.commit()
-    conn.close()
-
-# 데이터베이스의 모든 데이터 삭제
-def clear_table(table_name):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(f'DELETE FROM "{table_name}"')  # 테이블의 모든 데이터 삭제
-    conn.commit()
-    conn.close()
-
-# 데이터베이스에 데이터 삽입 (중복 체크 포함)
-def insert_data(table_name, headers, row):
-    conn = get_connection()
-    c = conn.cursor()
-
-    placeholders = ', '.join(['?' for _ in headers])  # ? 개수를 headers 길이에 맞게 설정
-    columns = ', '.join([f'"{header}"' for header in headers])  # 헤더를 컬럼으로 사용
-
-    # 중복된 내용이 있는지 확인
-    check_query = f'SELECT COUNT(*) FROM "{table_name}" WHERE '
-    check_conditions = ' AND '.join([f'"{header}" = ?' for header in headers])
-    check_query += check_conditions
-
-    if c.execute(check_query, row).fetchone()[0] == 0:  # 중복된 내용이 없으면
-        query = f'''
-            INSERT INTO "{table_name}" ({columns})
-            VALUES ({placeholders})
-        '''
-        c.execute(query, row)
-
-    conn.commit()
-    conn.close()
-
-# 데이터베이스에서 데이터 조회
-def view_data(table_name, headers):
-    conn = get_connection()
-    c = conn.cursor()
-    columns = ', '.join([f'"{header}"' for header in headers])  # 헤더를 컬럼으로 사용
-    query = f'SELECT {columns} FROM "{table_name}"'
-    c.execute(query)
-    data = c.fetchall()
-    conn.close()
-    return data
-
-# Word 파일에서 표 데이터를 읽어오는 함수
+import hashlib
+import json
+import storage
+import metrics
+import table_changes
+import search
+import ingest
+import word_tables
+
+# 데이터베이스 파일 경로 설정 (테이블은 migrations.py에서 생성)
+# 표마다 테이블을 만들지 않고 ts_sections (표), ts_entries (표의 각 칸) 두 테이블에 저장
+DB_PATH = storage.DB_PATH
+
+# 예전 형식 (Word 표마다 만든 테이블)을 새 테이블로 옮김 (legacy: 읽기 전용으로 연 예전 데이터베이스 파일)
+def import_legacy_tables(conn, legacy, table_names):
+    for table_name in table_names:
+        headers = [info[1] for info in legacy.execute(f'PRAGMA table_info("{table_name}")') if info[1] not in ('id', 'row_hash')]
+        columns = ', '.join(f'"{header}"' for header in headers)
+        rows = legacy.execute(f'SELECT {columns} FROM "{table_name}" ORDER BY id').fetchall()
+        insert_section(conn, table_name, headers, [["" if value is None else value for value in row] for row in rows])
+
+# 행 내용 해시 (전체 열을 비교하지 않고 중복 행을 확인)
+def row_hash(row):
+    return hashlib.sha1(json.dumps(list(row), ensure_ascii=False).encode()).hexdigest()
+
+# 표 하나 저장 (같은 이름의 표가 있으면 행을 뒤에 추가, 같은 내용의 행은 건너뜀)
+# 행 비교는 저장된 표의 열 순서로 맞춘 값으로 함 (열 순서가 다르거나 열이 더 있는 표를 다시 올려도 같은 행은 건너뜀)
+def insert_section(conn, name, headers, rows):
+    found = conn.execute("SELECT id, columns FROM ts_sections WHERE name = ?", (name,)).fetchone()
+    if found is None:
+        section_id = conn.execute("INSERT INTO ts_sections (name, columns) VALUES (?, ?)",
+                                  (name, json.dumps(headers, ensure_ascii=False))).lastrowid
+        columns, existing = headers, []
+    else:
+        section_id, columns = found
+        columns = json.loads(columns)
+        columns += [header for header in headers if header not in columns]
+        conn.execute("UPDATE ts_sections SET columns = ?, version = version + 1 WHERE id = ?",
+                     (json.dumps(columns, ensure_ascii=False), section_id))
+        entries = conn.execute("SELECT row_no, column_name, value FROM ts_entries WHERE section_id = ?", (section_id,)).fetchall()
+        existing = build_frame(columns, entries).itertuples(index=False, name=None)
+
+    seen = {row_hash(row) for row in existing}
+    next_row = conn.execute("SELECT COALESCE(MAX(row_no), 0) + 1 FROM ts_entries WHERE section_id = ?", (section_id,)).fetchone()[0]
+    entries = []
+    for row in rows:
+        values = dict(zip(headers, row))
+        digest = row_hash([values.get(column, "") for column in columns])
+        if digest in seen:
+            continue
+        seen.add(digest)
+        entries.extend((section_id, next_row, header, value) for header, value in zip(headers, row) if value != "")
+        next_row += 1
+    conn.executemany("INSERT INTO ts_entries (section_id, row_no, column_name, value) VALUES (?, ?, ?, ?)", entries)
+    return section_id
+
+# Word 파일의 표 전체를 한 번의 트랜잭션으로 저장
+# 기존 데이터 삭제와 새 데이터 저장을 함께 커밋하므로 읽는 쪽은 반쯤 지워진 상태를 보지 않음
+def import_tables(tables):
+    with storage.transaction(DB_PATH) as conn:
+        conn.execute("DELETE FROM ts_entries")
+        conn.execute("DELETE FROM ts_sections")
+        for table_name, headers, rows in tables:
+            insert_section(conn, table_name, headers, rows)
+
+    search.index_tables(tables)
+
+# 저장된 표 목록 조회 (id, 이름)
+def list_sections():
+    return storage.query(DB_PATH, "SELECT id, name FROM ts_sections ORDER BY id")
+
+# 표 목록 (ts_sections 테이블 버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_sections(version):
+    return list_sections()
+
+# 현재 표 목록 (다른 세션에서 올리거나 지운 표도 바로 반영)
+def current_sections():
+    return cached_sections(storage.table_version(DB_PATH, "ts_sections"))
+
+# 표의 열 목록과 변경 버전 조회
+def section_info(section_id):
+    columns, version = storage.query_one(DB_PATH, "SELECT columns, version FROM ts_sections WHERE id = ?", (section_id,))
+    return json.loads(columns), version
+
+# (행 번호, 열 이름, 값) 목록을 넓은 형태의 표로 변환
+def build_frame(columns, entries):
+    rows = {}
+    for row_no, column_name, value in entries:
+        rows.setdefault(row_no, {})[column_name] = value
+    df = pd.DataFrame.from_dict(rows, orient="index").reindex(index=sorted(rows), columns=columns)
+    return df.fillna("")
+
+# 표를 넓은 형태로 만든 결과 (버전이 바뀔 때까지 모든 세션이 같은 결과를 사용)
+@st.cache_data(max_entries=64, show_spinner=False)
+def materialized_frame(section_id, version):
+    columns, _ = section_info(section_id)
+    entries = storage.query(DB_PATH, "SELECT row_no, column_name, value FROM ts_entries WHERE section_id = ?", (section_id,))
+    return build_frame(columns, entries)
+
+# 표 하나를 넓은 형태로 조회 (index는 행 번호)
+def section_frame(section_id):
+    return materialized_frame(section_id, section_info(section_id)[1])
+
+# 표의 텍스트 행 목록 (검색 색인용)
+def section_rows(section_id):
+    return [list(row) for row in section_frame(section_id).itertuples(index=False, name=None)]
+
+# 모든 표에서 열 이름과 내용으로 찾기 (예: 모든 장비의 '원인' 중 "Flame"이 들어간 칸)
+def find_entries(text, column_name=None):
+    sql = '''SELECT s.name, e.row_no, e.column_name, e.value
+             FROM ts_entries e JOIN ts_sections s ON s.id = e.section_id
+             WHERE e.value LIKE ?'''
+    params = [f"%{text}%"]
+    if column_name:
+        sql += " AND e.column_name = ?"
+        params.append(column_name)
+    return storage.query(DB_PATH, sql + " ORDER BY e.section_id, e.row_no", params)
+
+# 저장된 열 이름 목록 (인덱스만 읽음)
+def column_names():
+    return [row[0] for row in storage.query(DB_PATH, "SELECT DISTINCT column_name FROM ts_entries ORDER BY column_name")]
+
+# 편집기의 변경 내용 저장 (바뀐 칸만 반영, 빈 값은 칸 삭제)
+def save_section_changes(section_id, changes):
+    with storage.transaction(DB_PATH) as conn:
+        upserts, removals = [], []
+        for row_no, values in changes.updated.items():
+            for column_name, value in values.items():
+                value = table_changes.sql_value(value)
+                if value is None or str(value) == "":
+                    removals.append((section_id, int(row_no), column_name))
+                else:
+                    upserts.append((section_id, int(row_no), column_name, str(value)))
+
+        next_row = conn.execute("SELECT COALESCE(MAX(row_no), 0) + 1 FROM ts_entries WHERE section_id = ?", (section_id,)).fetchone()[0]
+        for values in changes.added:
+            for column_name, value in values.items():
+                value = table_changes.sql_value(value)
+                if value is not None and str(value) != "":
+                    upserts.append((section_id, next_row, column_name, str(value)))
+            next_row += 1
+
+        conn.executemany('''INSERT INTO ts_entries (section_id, row_no, column_name, value) VALUES (?, ?, ?, ?)
+                            ON CONFLICT (section_id, row_no, column_name) DO UPDATE SET value = excluded.value''', upserts)
+        conn.executemany("DELETE FROM ts_entries WHERE section_id = ? AND row_no = ? AND column_name = ?", removals)
+        conn.executemany("DELETE FROM ts_entries WHERE section_id = ? AND row_no = ?",
+                         [(section_id, int(row_no)) for row_no in changes.deleted])
+        conn.execute("UPDATE ts_sections SET version = version + 1 WHERE id = ?", (section_id,))
+
+# 표 삭제 (칸은 외래 키로 함께 삭제)
+def drop_section(section_id, name):
+    storage.execute(DB_PATH, "DELETE FROM ts_sections WHERE id = ?", (section_id,))
+    search.remove_document("troubleshooting", name)
+
+# 표 검색 색인 갱신
+def index_section(section_id, name):
+    columns, _ = section_info(section_id)
+    search.index_table(name, columns, section_rows(section_id))
+
+# 업로드 파일 읽기 (ingest 프로세스에서 실행, python-docx 대신 본문 XML을 바로 읽음)
+# file: 파일 경로 또는 읽기용 파일 객체
+@metrics.timed("parse upload troubleshooting")
+def parse_upload(file):
+    return list(word_tables.iter_tables(file))
+
+# 업로드 작업 저장 (ingest 작업 스레드에서 실행, tables는 미리 읽은 표 목록)
+def store_upload(file_name, file_data, tables):
+    import_tables(tables)
+    return f"표 {len(tables)}개"
+
+# Word 파일에서 표 데이터를 읽어오는 함수 (python-docx 사용, tests/test_word_tables.py에서 word_tables.iter_tables와 결과 비교)
+@metrics.timed("parse word troubleshooting")
 def read_word_table(file):
     document = Document(file)
     tables_data = []
@@ -80,15 +186,7 @@ def read_word_table(file):
             header = [cell.text.strip() for cell in table.rows[1].cells]  # 두 번째 행을 헤더로 사용
 
             # 중복된 헤더가 있을 경우 번호를 붙여서 고유하게 만듦
-            unique_header = []
-            header_count = {}
-            for col in header:
-                if col in header_count:
-                    header_count[col] += 1
-                    unique_header.append(f"{col}_{header_count[col]}")  # 중복된 경우 번호를 추가
-                else:
-                    header_count[col] = 1
-                    unique_header.append(col)
+            unique_header = word_tables.unique_header(header)
 
             table_data = []
             for row in table.rows[2:]:  # 나머지 행을 데이터로 사용
@@ -104,104 +202,69 @@ def app():
     st.title("Troubleshooting")
 
     # 관리자 모드 체크박스
-    is_admin = st.sidebar.checkbox("관리자 모드 활성화")
-
-    # 데이터 저장 여부를 추적하기 위한 세션 상태
-    if 'data_saved' not in st.session_state:
-        st.session_state['data_saved'] = False
+    is_admin = st.sidebar.checkbox("관리자 모드 활성화", key="is_admin")
 
     # Word 파일 업로드 (관리자 모드에서만 가능)
     if is_admin:
         uploaded_file = st.file_uploader("Word 파일을 업로드하세요", type=["docx"])
 
-        # 파일 업로드된 경우 처리
-        if uploaded_file is not None:
-            # 데이터베이스의 기존 데이터 삭제
-            conn = get_connection()
-            c = conn.cursor()
-            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence';")
-            tables_in_db = c.fetchall()
-
-            # 기존 테이블의 데이터를 삭제
-            for table_name_tuple in tables_in_db:
-                table_name = table_name_tuple[0]
-                clear_table(table_name)
-
-            # Word 파일에서 표 읽기
-            tables = read_word_table(uploaded_file)
-
-            # 각 표의 이름과 내용을 저장하고 표시
-            for table_name, header, table in tables:
-                # 테이블 생성 (헤더를 기반으로)
-                create_table(table_name, header)
-
-                # 데이터 삽입
-                for row in table:
-                    insert_data(table_name, header, row)
-
-            st.session_state['data_saved'] = True
-            st.success("파일이 업로드되고 데이터베이스에 저장되었습니다.")
-
-    # 데이터베이스에 저장된 테이블 목록을 불러오기
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence';")
-    tables_in_db = c.fetchall()
-    conn.close()
-
-    # 저장된 테이블들 중에서 선택할 수 있도록 표시
-    if tables_in_db:
-        table_names = [table_name_tuple[0] for table_name_tuple in tables_in_db]
-
-        # 관리자 모드에서만 사이드바에 저장된 파일 목록과 삭제 기능 추가
+        # 업로드한 파일은 백그라운드에서 읽고 기존 표를 한 번에 교체 (실패하면 기존 데이터 유지)
+        if ingest.submit_upload("troubleshooting", uploaded_file):
+            st.success("파일을 읽어서 저장하는 중입니다.")
+        ingest.show_jobs(["troubleshooting"])
+
+    # 데이터베이스에 저장된 표 목록을 불러오기
+    sections = current_sections()
+
+    # 저장된 표들 중에서 선택할 수 있도록 표시
+    if sections:
+
+        # 관리자 모드에서만 사이드바에 저장된 표 목록과 삭제 기능 추가
         if is_admin:
             st.sidebar.title("저장된 파일 목록")
-            for table_name in table_names:
-                if st.sidebar.button(f"{table_name} 삭제"):
-                    conn = get_connection()
-                    c = conn.cursor()
-                    c.execute(f'DROP TABLE "{table_name}"')
-                    conn.commit()
-                    conn.close()
-                    st.sidebar.success(f"{table_name} 테이블이 삭제되었습니다.")
-
-        selected_table = st.selectbox("Troubleshooting을 선택하시오: ", table_names)
-
-        # 선택한 테이블의 저장된 데이터를 조회하고 화면에 표시
-        if selected_table:
-            c = get_connection().cursor()
-            c.execute(f'PRAGMA table_info("{selected_table}")')
-            headers_info = c.fetchall()
-            headers = [header_info[1] for header_info in headers_info[1:]]  # id 필드를 제외한 헤더 목록
-
-            stored_data = view_data(selected_table, headers)
-            if stored_data:
-                st.subheader(f"{selected_table}")
-                df = pd.DataFrame(stored_data, columns=headers)  # ID 필드를 제외하고 데이터프레임 생성
+            for section_id, name in sections:
+                if st.sidebar.button(f"{name} 삭제", key=f"drop_section_{section_id}"):
+                    drop_section(section_id, name)
+                    st.sidebar.success(f"{name} 표가 삭제되었습니다.")
+
+        selected = st.selectbox("Troubleshooting을 선택하시오: ", sections, format_func=lambda x: x[1])
+
+        # 선택한 표의 저장된 데이터를 조회하고 화면에 표시
+        if selected:
+            section_id, name = selected
+            df = section_frame(section_id)  # 행 번호는 index로 사용
+            if not df.empty:
+                st.subheader(f"{name}")
 
                 # 데이터 편집 가능하게 표시 (키보드로 값 수정 가능, 관리자 모드에서만 가능)
                 if is_admin:
-                    edited_df = st.data_editor(df, num_rows="dynamic", key=f'editable_table_{selected_table}')
-
-                    # "변경 사항 저장" 버튼을 통해 수정된 값들을 데이터베이스에 업데이트
-                    if st.button(f"변경 사항 저장 ({selected_table})"):
-                        conn = get_connection()
-                        c = conn.cursor()
-
-                        # 업데이트 쿼리 실행
-                        for index, row in edited_df.iterrows():
-                            placeholders = ', '.join([f'"{header}" = ?' for header in headers])
-                            query = f'UPDATE "{selected_table}" SET {placeholders} WHERE id = ?'
-                            values = [row[header] for header in headers] + [row['id']]
-                            c.execute(query, values)
-
-                        conn.commit()
-                        conn.close()
-                        st.success(f"모든 변경 사항이 {selected_table}에 저장되었습니다.")
+                    editor_name = f'editable_section_{section_id}'
+                    st.data_editor(table_changes.editor_frame(df), num_rows="dynamic", hide_index=True, key=table_changes.editor_key(editor_name))
+
+                    # "변경 사항 저장" 버튼을 통해 수정된 칸만 데이터베이스에 반영
+                    if st.button(f"변경 사항 저장 ({name})"):
+                        changes = table_changes.editor_changes(editor_name, df)
+                        if table_changes.has_changes(changes):
+                            save_section_changes(section_id, changes)
+                            table_changes.reset_editor(editor_name)
+                            index_section(section_id, name)
+                            st.success(f"변경 사항이 {name}에 저장되었습니다.")
+                        else:
+                            st.info("변경된 내용이 없습니다.")
                 else:
-                    st.write(df)
+                    st.write(df.reset_index(drop=True))
             else:
-                st.write("선택한 테이블에 저장된 데이터가 없습니다.")
+                st.write("선택한 표에 저장된 데이터가 없습니다.")
+
+        # 모든 장비의 표에서 한 번에 찾기
+        st.subheader("전체 표에서 찾기")
+        col_text, col_column = st.columns(2)
+        text = col_text.text_input("찾을 내용 (예: Flame)")
+        column_name = col_column.selectbox("열", [None] + column_names(), format_func=lambda x: "전체 열" if x is None else x)
+        if text:
+            found = find_entries(text, column_name)
+            st.caption(f"{len(found)}건")
+            st.dataframe(pd.DataFrame(found, columns=["표", "행", "열", "내용"]), hide_index=True, use_container_width=True)
     else:
         st.write("저장된 데이터가 없습니다. Word 파일을 업로드하여 데이터를 추가하세요.")
 
@@ -0,0 +1,140 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Word(.docx) 파일의 표를 python-docx 없이 읽기
+# 본문 XML을 zip에서 바로 열어 앞에서부터 읽고, 본문의 표가 끝날 때마다 그 표만 처리하고 버림 (문서 전체를 메모리에 올리지 않음)
+# 칸 나누기와 텍스트는 python-docx의 table.rows[i].cells, cell.text와 같게 맞춤 (tests/test_word_tables.py에서 troubleshooting.read_word_table과 결과 비교)
+
+# WordprocessingML 이름공간과 패키지 관계 요소
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+RELATIONSHIP = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+
+# 관계 파일에서 본문을 찾지 못했을 때의 본문 경로
+DEFAULT_DOCUMENT = "word/document.xml"
+
+# 실행(run) 안의 요소별 텍스트 (w:t는 내용, w:br은 줄바꿈 종류에 따라 따로 처리)
+RUN_CHARACTERS = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+# 본문 XML 경로 (패키지 관계 파일의 officeDocument 대상)
+def document_name(archive):
+    try:
+        relationships = ET.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return DEFAULT_DOCUMENT
+    for relationship in relationships.iter(RELATIONSHIP):
+        if relationship.get("Type", "").endswith("/officeDocument"):
+            return posixpath.normpath(relationship.get("Target").lstrip("/"))
+    return DEFAULT_DOCUMENT
+
+# 실행 하나의 텍스트 (쪽/단 나누기는 빈 문자열, 줄바꿈은 "\n")
+def run_text(run):
+    parts = []
+    for child in run:
+        if child.tag == W + "t":
+            parts.append(child.text or "")
+        elif child.tag == W + "br":
+            if child.get(W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif child.tag in RUN_CHARACTERS:
+            parts.append(RUN_CHARACTERS[child.tag])
+    return "".join(parts)
+
+# 문단 하나의 텍스트 (바로 아래의 실행과 하이퍼링크 안의 실행만 사용)
+def paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == W + "r":
+            parts.append(run_text(child))
+        elif child.tag == W + "hyperlink":
+            parts.extend(run_text(run) for run in child.findall(W + "r"))
+    return "".join(parts)
+
+# 칸 하나의 텍스트 (문단마다 한 줄, 칸 안의 표는 제외)
+def cell_text(tc):
+    return "\n".join(paragraph_text(paragraph) for paragraph in tc.findall(W + "p"))
+
+# 칸의 (가로로 차지하는 열 수, 세로 병합 값), 세로 병합 요소만 있고 값이 없으면 "continue"
+def cell_merge(tc):
+    properties = tc.find(W + "tcPr")
+    if properties is None:
+        return 1, None
+    span = properties.find(W + "gridSpan")
+    merge = properties.find(W + "vMerge")
+    return (1 if span is None else int(span.get(W + "val")),
+            None if merge is None else merge.get(W + "val", "continue"))
+
+# 행 앞의 비어 있는 열 수
+def grid_before(tr):
+    properties = tr.find(W + "trPr")
+    before = None if properties is None else properties.find(W + "gridBefore")
+    return 0 if before is None else int(before.get(W + "val"))
+
+# 행의 칸 텍스트 목록
+# 가로 병합 칸은 차지하는 열 수만큼 반복, 세로 병합이 이어지는 칸은 위 행의 같은 시작 열에 있는 칸 내용을 사용
+# above: 위 행의 {시작 열: (열 수, 텍스트)}, (칸 텍스트 목록, 이 행의 {시작 열: (열 수, 텍스트)}) 반환
+def row_cells(tr, above):
+    offset = grid_before(tr)
+    cells, starts = [], {}
+    for tc in tr.findall(W + "tc"):
+        span, merge = cell_merge(tc)
+        if merge == "continue":
+            if above is None or offset not in above:
+                raise ValueError(f"세로 병합 칸 위에 시작 칸이 없습니다 (열 {offset})")
+            source = above[offset]
+        else:
+            source = (span, cell_text(tc))
+        starts[offset] = source
+        cells.extend([source[1]] * source[0])
+        offset += span
+    return cells, starts
+
+# 표의 행별 칸 텍스트 목록
+def table_rows(tbl):
+    rows, above = [], None
+    for tr in tbl.findall(W + "tr"):
+        cells, above = row_cells(tr, above)
+        rows.append(cells)
+    return rows
+
+# 중복된 헤더에 번호를 붙여서 고유하게 만듦 (두 번째부터 "_2", "_3")
+def unique_header(header):
+    unique, counts = [], {}
+    for column in header:
+        if column in counts:
+            counts[column] += 1
+            unique.append(f"{column}_{counts[column]}")
+        else:
+            counts[column] = 1
+            unique.append(column)
+    return unique
+
+# 표 하나를 (표 제목, 헤더, 데이터 행)으로 변환 (첫 행의 첫 칸은 제목, 둘째 행은 헤더), 데이터 행이 없으면 None
+def read_table(tbl):
+    rows = table_rows(tbl)
+    if not rows:
+        return None
+    table_name = rows[0][0].strip()
+    header = unique_header([text.strip() for text in rows[1]])
+    table_data = [[text.strip() for text in row] for row in rows[2:]]
+    return (table_name, header, table_data) if table_data else None
+
+# 본문의 표를 하나씩 읽어서 (표 제목, 헤더, 데이터 행) 반환 (다음 표는 요청할 때 읽음)
+# python-docx의 document.tables처럼 본문 바로 아래의 표만 읽음 (칸 안의 표, 다른 요소로 감싼 표는 제외)
+# file: 파일 경로 또는 읽기용 파일 객체
+def iter_tables(file):
+    with zipfile.ZipFile(file) as archive, archive.open(document_name(archive)) as xml:
+        depth, body = 0, None
+        for event, element in ET.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 2 and element.tag == W + "body":
+                    body = element
+                continue
+            if depth == 3 and body is not None:
+                if element.tag == W + "tbl":
+                    table = read_table(element)
+                    if table is not None:
+                        yield table
+                body.clear()  # 처리한 본문 요소는 버림
+            depth -= 1